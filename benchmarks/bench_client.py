@@ -0,0 +1,109 @@
+"""
+End-to-end benchmarks for RETSConnection against a local mock RETS server
+
+Runs paged searches, streamed searches and bulk object downloads against a
+retsdk.mockserver.MockRETSServer, with a simulated network latency, and
+reports the throughput of each:
+
+    python benchmarks/bench_client.py
+    python benchmarks/bench_client.py --listings 20000 --latency 0.05
+
+Faults can be injected to see how the client copes with them:
+
+    python benchmarks/bench_client.py --error-rate 0.01 --truncate-rate 0.05
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retsdk.client import RETSConnection
+from retsdk.exceptions import RequestError
+from retsdk.mockserver import MockRETSServer
+
+
+def search_pages(rets, args):
+    rows = rets.get_all_data('Property', 'Listing', '(ListingID=*)',
+                             ['ListingID', 'ListPrice', 'Status'])
+    return sum(1 for row in rows)
+
+
+def search_prefetch(rets, args):
+    rows = rets.get_all_data('Property', 'Listing', '(ListingID=*)',
+                             ['ListingID', 'ListPrice', 'Status'],
+                             prefetch=True)
+    return sum(1 for row in rows)
+
+
+def search_stream(rets, args):
+    rows = rets.get_data_iter('Property', 'Listing', '(ListingID=*)',
+                              ['ListingID', 'ListPrice', 'Status'],
+                              limit=args.max_rows)
+    return sum(1 for row in rows)
+
+
+def download(rets, args):
+    directory = tempfile.mkdtemp()
+    try:
+        jobs = [('Property', 'Photo', 'L{0:07d}'.format(i + 1), 1,
+                 os.path.join(directory, '{0}.jpg'.format(i)))
+                for i in range(args.objects)]
+        summary = rets.download_objects(jobs, max_workers=args.workers)
+        return summary['succeeded']
+    finally:
+        shutil.rmtree(directory)
+
+
+BENCHMARKS = [
+    ('search (paged)', search_pages),
+    ('search (prefetch)', search_prefetch),
+    ('search (stream)', search_stream),
+    ('download_objects', download),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--listings', type=int, default=5000)
+    parser.add_argument('--max-rows', type=int, default=500)
+    parser.add_argument('--objects', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='seconds of simulated latency per request')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--truncate-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockRETSServer(listings=args.listings, max_rows=args.max_rows,
+                            latency=args.latency, error_rate=args.error_rate,
+                            rate_limit_rate=args.rate_limit_rate,
+                            truncate_rate=args.truncate_rate)
+
+    with server:
+        rets = RETSConnection(server.username, server.password,
+                              server.login_url, pool_size=args.workers)
+        print('{0:<20} {1:>10} {2:>10} {3:>12}'.format(
+            'benchmark', 'items', 'seconds', 'items/sec'))
+
+        for name, func in BENCHMARKS:
+            start = time.perf_counter()
+            try:
+                items = func(rets, args)
+            except RequestError as e:
+                print('{0:<20} failed: {1}'.format(name, e))
+                continue
+            elapsed = time.perf_counter() - start
+            print('{0:<20} {1:>10} {2:>10.3f} {3:>12.1f}'.format(
+                name, items, elapsed, items / elapsed))
+
+        rets.logout()
+        print('requests: {0}'.format(server.requests))
+
+
+if __name__ == '__main__':
+    main()
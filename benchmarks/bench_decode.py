@@ -0,0 +1,189 @@
+"""
+Benchmarks for the Search response decoding path
+
+Times (and measures the peak memory of) parse_response, extract_values,
+split_line, map_fields and cast separately, over synthetic responses of
+different sizes. Results can be saved as a baseline and later runs compared
+against it:
+
+    python benchmarks/bench_decode.py --save benchmarks/baseline.json
+    python benchmarks/bench_decode.py --compare benchmarks/baseline.json
+
+Comparisons exit with status 1 if anything got slower, or its peak memory
+grew, by more than the tolerance.
+Baselines record the machine and Python version they were made on, since
+timings from different machines can't be compared.
+
+The default sizes run in about a minute. The largest response the decoder
+is tuned for, 100,000 rows of 300 columns, takes well over ten minutes and
+several GB of memory, so it has to be asked for:
+
+    python benchmarks/bench_decode.py --sizes 100000x300 \
+        --compare benchmarks/baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retsdk.utilities import (parse_response, extract_values, split_line,
+                              map_fields, cast)
+from synthetic import search_response
+
+
+DEFAULT_SIZES = ['1000x20', '1000x300', '100000x20']
+
+
+def cases(body):
+    """
+    Returns the (name, function) pairs to benchmark for a response body
+    """
+    xml = ET.fromstring(body)
+    data_text = [child.text for child in xml if child.tag == 'DATA']
+    columns = split_line(xml.find('COLUMNS').text)
+    lines = [split_line(text) for text in data_text]
+    values = [value for line in lines for value in line]
+
+    return [
+        ('parse_response', lambda: parse_response(ET.fromstring(body))),
+        ('extract_values', lambda: extract_values(xml)),
+        ('split_line', lambda: [split_line(text) for text in data_text]),
+        ('map_fields', lambda: [map_fields(columns, line) for line in lines]),
+        ('cast', lambda: [cast(value) for value in values]),
+    ]
+
+
+def measure(func, repeat):
+    """
+    Returns the best time (in seconds) and the peak memory (in bytes) of func
+    """
+    timings = []
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return min(timings), peak
+
+
+def run(sizes, repeat, only=None):
+    """
+    Runs every benchmark for every size and returns the results
+    """
+    results = {}
+    for size in sizes:
+        rows, columns = (int(n) for n in size.split('x'))
+        body = search_response(rows, columns)
+        for name, func in cases(body):
+            if only and name not in only:
+                continue
+            seconds, peak = measure(func, repeat)
+            key = '{0}[{1}]'.format(name, size)
+            results[key] = {'seconds': seconds, 'peak_bytes': peak}
+            print('{0:<32} {1:>10.4f} s {2:>12,d} bytes'.format(
+                key, seconds, peak
+            ))
+    return results
+
+
+def machine():
+    """
+    Describes the machine and Python version the benchmarks run on
+    """
+    return {
+        'python': '{0} {1}'.format(platform.python_implementation(),
+                                   platform.python_version()),
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def change(result, before, metric):
+    """
+    Returns the relative change of a metric (0.25 = 25% more than before)
+    """
+    if not before.get(metric):
+        return 0.0
+    return (result[metric] - before[metric]) / before[metric]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints a comparison to a baseline and returns the names of regressions
+
+    A benchmark regressed if its time or its peak memory grew by more than
+    tolerance.
+    """
+    regressions = []
+    print('\n{0:<32} {1:>10} {2:>10} {3:>10}'.format('benchmark', 'baseline',
+                                                   'time', 'memory'))
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        slower = change(result, baseline[key], 'seconds')
+        bigger = change(result, baseline[key], 'peak_bytes')
+        flag = ''
+        if slower > tolerance or bigger > tolerance:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print('{0:<32} {1:>10.4f} {2:>+9.1%} {3:>+9.1%}{4}'.format(
+            key, baseline[key]['seconds'], slower, bigger, flag
+        ))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help='response sizes as ROWSxCOLUMNS')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timed runs per benchmark (the best is kept)')
+    parser.add_argument('--only', nargs='+',
+                        help='only run these benchmarks')
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument('--compare', help='compare to a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown or memory growth before '
+                             'failing (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.only)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'machine': machine(), 'results': results}, f,
+                      indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        # Baselines saved before the machine was recorded are plain results
+        recorded = baseline.get('machine')
+        baseline = baseline.get('results', baseline)
+        if recorded is not None and recorded != machine():
+            print('\nNote: the baseline was recorded on a different machine '
+                  '({0}, {1}); timings may not be comparable.'.format(
+                      recorded['python'], recorded['platform']))
+        if compare(results, baseline, args.tolerance):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
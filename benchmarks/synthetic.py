@@ -0,0 +1,67 @@
+"""
+Synthetic RETS responses for benchmarks
+"""
+import random
+from datetime import datetime, timedelta
+
+
+def value_makers(rng):
+    """
+    Returns functions that make realistic values for listing fields
+    """
+    start = datetime(2015, 1, 1)
+
+    def timestamp():
+        moment = start + timedelta(seconds=rng.randrange(10 ** 8),
+                                   milliseconds=rng.randrange(1000))
+        return moment.isoformat(timespec='milliseconds')
+
+    def date():
+        return (start + timedelta(days=rng.randrange(3000))).date().isoformat()
+
+    return [
+        lambda: str(rng.randrange(10 ** 6, 10 ** 7)),             # IDs
+        lambda: str(rng.randrange(50, 5000) * 1000),              # prices
+        lambda: '{0:.2f}'.format(rng.random() * 10),              # acres
+        lambda: '0{0:04d}'.format(rng.randrange(10000)),          # zips
+        timestamp,                                                 # modified
+        date,                                                      # dates
+        lambda: rng.choice(['Active', 'Pending', 'Sold', 'Expired']),
+        lambda: rng.choice(['Y', 'N', '1', '0']),                 # booleans
+        lambda: 'MLS{0:07d}'.format(rng.randrange(10 ** 7)),      # MLS #s
+        lambda: '',                                                # empties
+        lambda: rng.choice(['', '', 'Pool,Deck', 'Garage']),       # sparse
+    ]
+
+
+def search_response(rows, columns, seed=0):
+    """
+    Builds a COMPACT-DECODED Search response body
+
+    :param rows: the number of <DATA> rows
+    :type rows: int
+    :param columns: the number of columns per row
+    :type columns: int
+    :param seed: a seed for the value generator (for repeatable runs)
+    :type seed: int
+    :rtype: bytes
+    :return: the XML body of a RETS Search response
+    """
+    rng = random.Random(seed)
+    makers = value_makers(rng)
+    column_makers = [makers[i % len(makers)] for i in range(columns)]
+    names = ['Field{0}'.format(i) for i in range(columns)]
+
+    parts = [
+        '<?xml version="1.0"?>\n',
+        '<RETS ReplyCode="0" ReplyText="Operation Success.">\n',
+        '<COUNT Records="{0}" />\n'.format(rows),
+        '<DELIMITER value="09"/>\n',
+        '<COLUMNS>\t{0}\t</COLUMNS>\n'.format('\t'.join(names)),
+    ]
+    for i in range(rows):
+        values = '\t'.join(make() for make in column_makers)
+        parts.append('<DATA>\t{0}\t</DATA>\n'.format(values))
+    parts.append('</RETS>\n')
+
+    return ''.join(parts).encode('utf-8')
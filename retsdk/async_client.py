@@ -0,0 +1,293 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from retsdk.client import RETSConnection
+from retsdk.scheduler import RequestScheduler
+
+
+class AsyncRETSConnection(object):
+    """
+    An asyncio counterpart to RETSConnection
+
+    Transactions are sent by a RETSConnection on a worker thread, so the
+    event loop is never blocked and the response dictionaries are exactly
+    the ones RETSConnection returns. At most max_outstanding transactions
+    are in flight at once, which should be set to the number of concurrent
+    queries the RETS server allows. Unless a scheduler is given, the
+    connection's RequestScheduler enforces the same limit, which also
+    covers methods that send several transactions at once (get_schema,
+    get_sharded_data...).
+
+    Methods that yield rows or objects (get_all_data, get_data_iter,
+    get_sharded_data, get_objects) are async iterators here. Each holds
+    one of the max_outstanding slots until it's exhausted or closed.
+
+    Account info such as metadata_version or search_url can be read from the
+    async connection directly once it has logged in; methods can't, so that
+    a blocking call can't be made on the event loop by mistake.
+    """
+    def __init__(self, username='', password='', login_url='',
+                 auth_type='digest', rets_version='RETS/1.7.2',
+                 user_agent='RETSDK/1.0', pool_size=4, metadata_cache=None,
+                 scheduler=None, metrics=None, max_outstanding=1,
+                 executor=None, parallel_decoder=None):
+        self.connection = None
+        self.max_outstanding = max_outstanding
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_outstanding
+        )
+        self.__connection_args = {
+            'username': username,
+            'password': password,
+            'login_url': login_url,
+            'auth_type': auth_type,
+            'rets_version': rets_version,
+            'user_agent': user_agent,
+            'pool_size': max(pool_size, max_outstanding),
+            'metadata_cache': metadata_cache,
+            'scheduler': scheduler or RequestScheduler(
+                max_outstanding=max_outstanding
+            ),
+            'metrics': metrics,
+            'parallel_decoder': parallel_decoder,
+        }
+        self.__semaphore = None
+
+    def __getattr__(self, name):
+        connection = self.__dict__.get('connection')
+        if connection is None or name.startswith('_'):
+            raise AttributeError(name)
+        value = getattr(connection, name)
+        if callable(value):
+            # Calling it here would block the event loop
+            raise AttributeError(
+                '{0} is a blocking RETSConnection method; use '
+                'connection.{0} on a thread of your own'.format(name)
+            )
+        return value
+
+    async def __aenter__(self):
+        return await self.login()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.logout()
+
+    async def __run(self, func, *args, **kwargs):
+        """
+        Runs a blocking call on the executor within the concurrency limit
+        """
+        if self.__semaphore is None:
+            # Created lazily so that it belongs to the running event loop
+            self.__semaphore = asyncio.Semaphore(self.max_outstanding)
+
+        loop = asyncio.get_running_loop()
+        async with self.__semaphore:
+            return await loop.run_in_executor(
+                self.executor, partial(func, *args, **kwargs)
+            )
+
+    async def __iterate(self, func, *args, batch_size=100, **kwargs):
+        """
+        Runs a blocking generator on the executor, batch_size items at a
+        time, within the concurrency limit
+
+        The limit is only held while a batch is fetched, not while the
+        caller's loop runs, so transactions awaited from inside an async for
+        don't wait on the loop itself.
+        """
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.max_outstanding)
+
+        loop = asyncio.get_running_loop()
+        async with self.__semaphore:
+            items = await loop.run_in_executor(
+                self.executor, partial(func, *args, **kwargs)
+            )
+        try:
+            while True:
+                async with self.__semaphore:
+                    batch = await loop.run_in_executor(
+                        self.executor, list, islice(items, batch_size)
+                    )
+                if not batch:
+                    break
+                for item in batch:
+                    yield item
+        finally:
+            await loop.run_in_executor(self.executor, items.close)
+
+    async def login(self):
+        """
+        Logs in to the RETS server and loads account options
+
+        :rtype: AsyncRETSConnection
+        :return: this connection (so it can be awaited inline)
+        """
+        self.connection = await self.__run(RETSConnection,
+                                           **self.__connection_args)
+        return self
+
+    async def logout(self):
+        """
+        Closes a session with a RETS server
+        """
+        return await self.__run(self.connection.logout)
+
+    async def get_resource_metadata(self):
+        """
+        Gets the metadata for what resources are available on the RETS server
+        """
+        return await self.__run(self.connection.get_resource_metadata)
+
+    async def get_class_metadata(self, resource='Property'):
+        """
+        Gets top-level metadata for the classes within a resource
+        """
+        return await self.__run(self.connection.get_class_metadata,
+                                resource=resource)
+
+    async def get_table_metadata(self, resource='Property',
+                                 class_name='Listing'):
+        """
+        Gets the detailed field metadata for a specific class
+        """
+        return await self.__run(self.connection.get_table_metadata,
+                                resource=resource, class_name=class_name)
+
+    async def get_lookup_type_metadata(self, resource='Property',
+                                       lookup_name=''):
+        """
+        Gets the lookup values for a specific field within a class
+        """
+        return await self.__run(self.connection.get_lookup_type_metadata,
+                                resource=resource, lookup_name=lookup_name)
+
+    async def get_metadata(self, metadata_type, metadata_id='*'):
+        """
+        Gets any type of metadata, for any ID
+        """
+        return await self.__run(self.connection.get_metadata, metadata_type,
+                                metadata_id=metadata_id)
+
+    async def get_schema(self, max_workers=4):
+        """
+        Loads the server's whole metadata into an indexed Schema
+        """
+        return await self.__run(self.connection.get_schema,
+                                max_workers=max_workers)
+
+    async def get_lookup(self, resource='Property', lookup_name=''):
+        """
+        Gets the codes of a lookup and the long values they stand for
+        """
+        return await self.__run(self.connection.get_lookup,
+                                resource=resource, lookup_name=lookup_name)
+
+    async def get_decoder(self, resource='Property', class_name='Listing',
+                          lookups=False):
+        """
+        Gets a TableDecoder for the fields of a specific class
+        """
+        return await self.__run(self.connection.get_decoder,
+                                resource=resource, class_name=class_name,
+                                lookups=lookups)
+
+    async def get_object(self, resource, obj_type, obj_id,
+                         order_no=0, path=None, write=False, etag=None):
+        """
+        Performs a getObject transaction
+        """
+        return await self.__run(self.connection.get_object, resource,
+                                obj_type, obj_id, order_no=order_no,
+                                path=path, write=write, etag=etag)
+
+    async def get_count(self, resource, class_name, query):
+        """
+        Performs the Search transaction and returns the record count only
+        """
+        return await self.__run(self.connection.get_count, resource,
+                                class_name, query)
+
+    async def get_data(self, resource, class_name, query, fields,
+                       data_format='COMPACT-DECODED', limit=None,
+                       offset=None, typed=False, row_format='dict'):
+        """
+        Performs the Search transaction and returns data
+        """
+        return await self.__run(self.connection.get_data, resource,
+                                class_name, query, fields,
+                                data_format=data_format, limit=limit,
+                                offset=offset, typed=typed,
+                                row_format=row_format)
+
+    async def export_data(self, resource, class_name, query, fields, sink,
+                          data_format='COMPACT-DECODED', page_size=None,
+                          typed=False):
+        """
+        Streams every matching row into a sink, without collecting them
+        """
+        return await self.__run(self.connection.export_data, resource,
+                                class_name, query, fields, sink,
+                                data_format=data_format, page_size=page_size,
+                                typed=typed)
+
+    def get_objects(self, resource, obj_type, obj_ids, path=None,
+                    chunk_size=65536):
+        """
+        Performs one getObject transaction for many objects at once
+
+        :rtype: async iterator
+        """
+        return self.__iterate(self.connection.get_objects, resource,
+                              obj_type, obj_ids, path=path,
+                              chunk_size=chunk_size, batch_size=1)
+
+    async def download_objects(self, jobs, max_workers=4,
+                               skip_existing=True):
+        """
+        Downloads many objects to disk using a pool of worker threads
+        """
+        return await self.__run(self.connection.download_objects, jobs,
+                                max_workers=max_workers,
+                                skip_existing=skip_existing)
+
+    def get_all_data(self, resource, class_name, query, fields,
+                     data_format='COMPACT-DECODED', page_size=None,
+                     prefetch=False, typed=False):
+        """
+        Pages through a Search transaction and yields every matching row
+
+        :rtype: async iterator
+        """
+        return self.__iterate(self.connection.get_all_data, resource,
+                              class_name, query, fields,
+                              data_format=data_format, page_size=page_size,
+                              prefetch=prefetch, typed=typed)
+
+    def get_sharded_data(self, resource, class_name, query, fields,
+                         shard_field, low, high, key_field='ListingID',
+                         max_rows=2500, max_outstanding=4, typed=False):
+        """
+        Splits a Search into range shards and yields their merged rows
+
+        :rtype: async iterator
+        """
+        return self.__iterate(self.connection.get_sharded_data, resource,
+                              class_name, query, fields, shard_field, low,
+                              high, key_field=key_field, max_rows=max_rows,
+                              max_outstanding=max_outstanding, typed=typed)
+
+    def get_data_iter(self, resource, class_name, query, fields,
+                      data_format='COMPACT-DECODED', limit=None, offset=None,
+                      response=None, typed=False):
+        """
+        Performs the Search transaction and yields rows as they arrive
+
+        :rtype: async iterator
+        """
+        return self.__iterate(self.connection.get_data_iter, resource,
+                              class_name, query, fields,
+                              data_format=data_format, limit=limit,
+                              offset=offset, response=response, typed=typed)
@@ -0,0 +1,138 @@
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class MetadataCache(object):
+    """
+    Keeps GetMetadata responses so they don't have to be downloaded again
+
+    Responses are stored by server, metadata type, metadata ID (which holds
+    the resource, class or lookup name) and the metadata version that the
+    server reported at login. A cached response is only used while the
+    server is still on the same metadata version.
+
+    If a path is given, responses are stored in a SQLite database at that
+    path so they survive between processes. Recently used responses are
+    also kept in memory (up to maxsize of them) so repeated lookups don't
+    touch the database at all. Both keep responses pickled, so every get()
+    returns a fresh copy that callers are free to change.
+    """
+    def __init__(self, path=None, maxsize=128):
+        self.path = path
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS metadata ('
+                    'server TEXT, type TEXT, id TEXT, version TEXT, '
+                    'response BLOB, PRIMARY KEY (server, type, id))'
+                )
+
+    def get(self, server, metadata_type, metadata_id, version):
+        """
+        Returns a cached response, or None if there isn't a current one
+
+        :param server: identifies the RETS server (and account)
+        :type server: str
+        :param metadata_type: the GetMetadata Type (ex. 'METADATA-TABLE')
+        :type metadata_type: str
+        :param metadata_id: the GetMetadata ID (ex. 'Property:Listing')
+        :type metadata_id: str
+        :param version: the server's current metadata version
+        :type version: str
+        :rtype: dict or None
+        :return: the cached response dictionary
+        """
+        key = (server, metadata_type, str(metadata_id))
+
+        with self._lock:
+            if key in self._memory:
+                cached_version, blob = self._memory[key]
+                if cached_version == version:
+                    self._memory.move_to_end(key)
+                    return pickle.loads(blob)
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                'SELECT response FROM metadata WHERE server=? AND type=? '
+                'AND id=? AND version=?', key + (version,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        self.__remember(key, version, row[0])
+        return pickle.loads(row[0])
+
+    def set(self, server, metadata_type, metadata_id, version, response):
+        """
+        Stores a response (replacing any older version of it)
+
+        :param server: identifies the RETS server (and account)
+        :type server: str
+        :param metadata_type: the GetMetadata Type (ex. 'METADATA-TABLE')
+        :type metadata_type: str
+        :param metadata_id: the GetMetadata ID (ex. 'Property:Listing')
+        :type metadata_id: str
+        :param version: the server's current metadata version
+        :type version: str
+        :param response: a GetMetadata response dictionary
+        :type response: dict
+        """
+        key = (server, metadata_type, str(metadata_id))
+        blob = pickle.dumps(response)
+        self.__remember(key, version, blob)
+
+        if self._db is not None:
+            with self._lock, self._db:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?)',
+                    key + (version, blob)
+                )
+
+    def invalidate(self, server, version):
+        """
+        Drops every response for server that isn't from the given version
+
+        :param server: identifies the RETS server (and account)
+        :type server: str
+        :param version: the server's current metadata version
+        :type version: str
+        """
+        with self._lock:
+            for key, (cached_version, blob) in list(self._memory.items()):
+                if key[0] == server and cached_version != version:
+                    del self._memory[key]
+
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        'DELETE FROM metadata WHERE server=? AND version!=?',
+                        (server, version)
+                    )
+
+    def clear(self):
+        """
+        Drops every cached response
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute('DELETE FROM metadata')
+
+    def __remember(self, key, version, blob):
+        with self._lock:
+            self._memory[key] = (version, blob)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
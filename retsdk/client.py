@@ -5,20 +5,53 @@ from urllib.error import HTTPError, URLError
 from socket import timeout
 from http.client import IncompleteRead
 from http.cookiejar import CookieJar
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import mimetypes
+import os
 import time
 import sys
 
 from retsdk.exceptions import *
-from retsdk.utilities import parse_response
+from retsdk.decoders import MetadataDecoder, TableDecoder, lookup_table
+from retsdk.scheduler import RequestScheduler, retry_after_seconds
+from retsdk.schema import MetadataLoader
+from retsdk.sharding import ShardedSearch
+from retsdk.utilities import (parse_response, iter_response, iter_multipart,
+                              read_chunks, write_atomic, is_xml, parse_xml)
+from retsdk.transport import (ConnectionPool, KeepAliveHTTPHandler,
+                              KeepAliveHTTPSHandler, DecompressionHandler,
+                              PreemptiveDigestAuthHandler)
 
 
 class RETSConnection(object):
 
     def __init__(self, username='', password='', login_url='', 
                  auth_type='digest', rets_version='RETS/1.7.2',
-                                       user_agent='RETSDK/1.0'):
+                                       user_agent='RETSDK/1.0', pool_size=4,
+                 metadata_cache=None, scheduler=None, metrics=None,
+                 compression=True, parallel_decoder=None):
         """
         Sets up a connection to a RETS server and loads account options
+
+        Requests are sent over persistent (keep-alive) connections, and up to
+        pool_size idle connections per host are kept open for reuse. Unless
+        compression is False, gzip/deflate compressed responses are asked
+        for and decompressed as they're read.
+
+        If a retsdk.cache.MetadataCache is given as metadata_cache, metadata
+        responses are kept in it until the server's metadata version changes.
+
+        Transactions are paced by a retsdk.scheduler.RequestScheduler, which
+        handles rate limit backoff; pass in your own as scheduler to limit
+        concurrency or request rates as well.
+
+        Pass a retsdk.metrics.Metrics (such as a MetricsCollector) as metrics
+        to have the timings, sizes, rows, retries and rate limits of every
+        transaction recorded.
+
+        Pass a retsdk.parallel.ParallelDecoder as parallel_decoder to have
+        large Search responses decoded on every core.
         """
         self.headers = {'User-Agent': user_agent, 
                         'RETS-Version': rets_version}
@@ -36,31 +69,53 @@ class RETSConnection(object):
         pw_mgr.add_password(None, self.base_url, username, password)
 
         if auth_type == 'digest':
-            auth_handler = request.HTTPDigestAuthHandler(pw_mgr)
+            auth_handler = PreemptiveDigestAuthHandler(pw_mgr)
         elif auth_type == 'basic':
             auth_handler = request.HTTPBasicAuthHandler(pw_mgr)
         else:
             raise AuthenticationError("auth_type must be 'basic' or 'digest'")
 
         # Setup a cookie handler (for systems that use session auth)
-        cookiejar = CookieJar()
-        cookie_handler = request.HTTPCookieProcessor(cookiejar)
+        self.cookiejar = CookieJar()
+        cookie_handler = request.HTTPCookieProcessor(self.cookiejar)
 
-        # Build an opener with the auth/cookie handlers
-        opener = request.build_opener(auth_handler, cookie_handler)
-        request.install_opener(opener)
+        # Setup keep-alive handlers that share a pool of open connections
+        self.pool = ConnectionPool(maxsize=pool_size)
+        http_handler = KeepAliveHTTPHandler(self.pool)
+        https_handler = KeepAliveHTTPSHandler(self.pool)
+
+        # Build an opener with the auth/cookie/connection handlers. It is
+        # kept on the instance (not installed globally) so that several
+        # connections can hold separate sessions in the same process.
+        handlers = [auth_handler, cookie_handler, http_handler, https_handler]
+        if compression:
+            handlers.append(DecompressionHandler())
+        self.opener = request.build_opener(*handlers)
+
+        # Every transaction (from any thread) is paced by one scheduler
+        self.scheduler = scheduler or RequestScheduler()
+        self.metrics = metrics
+        self.parallel_decoder = parallel_decoder
+
+        # Table decoders are built once per class (see get_decoder), and
+        # lookups once per lookup name (see get_lookup)
+        self.__decoders = {}
+        self.__lookups = {}
 
         # Perform a login request to get server & account info
         login_response = self.__login(login_url)
+        self.metadata_version = None
+        self.metadata_cache = metadata_cache
+        self.__cache_server = '{0}@{1}'.format(username, self.base_url)
 
         for option in login_response['rows']:
             for key, val in option.items():
                 if key == 'MetadataVersion':
-                    self.metadata_version = self.__set_url(path=val)
+                    self.metadata_version = val
                 if key == 'MetadataTimestamp':
-                    self.metadata_timestamp = self.__set_url(path=val)
+                    self.metadata_timestamp = val
                 if key == 'MinMetadataTimestamp':
-                    self.min_metadata_timestamp = self.__set_url(path=val)
+                    self.min_metadata_timestamp = val
                 if key == 'Login':
                     self.login_url = self.__set_url(path=val)
                 if key == 'Logout':
@@ -76,6 +131,11 @@ class RETSConnection(object):
                 if key == 'PostObject':
                     self.post_object_url = self.__set_url(path=val)
 
+        if self.metadata_cache and self.metadata_version:
+            # Anything cached from an older metadata version is stale now
+            self.metadata_cache.invalidate(self.__cache_server,
+                                           self.metadata_version)
+
     def __set_url(self, path):
         """
         Assembles a complete URL from base and path, if necessary
@@ -104,6 +164,7 @@ class RETSConnection(object):
         """
         logout_request = request.Request(self.logout_url, headers=self.headers)
         response = self.__make_request(logout_request)[1]
+        self.pool.clear()
 
         return response
 
@@ -120,8 +181,7 @@ class RETSConnection(object):
             'Format': 'COMPACT',
         }
 
-        encoded_parameters = urlencode(get_metadata_params)
-        response = self.__get_metadata(encoded_parameters)
+        response = self.__get_metadata(get_metadata_params)
         return response
 
     def get_class_metadata(self, resource='Property'):
@@ -139,8 +199,7 @@ class RETSConnection(object):
             'Format': 'COMPACT',
         }
 
-        encoded_parameters = urlencode(get_metadata_params)
-        response = self.__get_metadata(encoded_parameters)
+        response = self.__get_metadata(get_metadata_params)
         return response
 
     def get_table_metadata(self, resource='Property', class_name='Listing'):
@@ -163,8 +222,7 @@ class RETSConnection(object):
             'Format': 'COMPACT',
         }
 
-        encoded_parameters = urlencode(get_metadata_params)
-        response = self.__get_metadata(encoded_parameters)
+        response = self.__get_metadata(get_metadata_params)
         return response
 
     def get_lookup_type_metadata(self, resource='Property', lookup_name=''):
@@ -189,30 +247,146 @@ class RETSConnection(object):
             'Format': 'COMPACT',
         }
 
-        encoded_parameters = urlencode(get_metadata_params)
-        response = self.__get_metadata(encoded_parameters)
+        response = self.__get_metadata(get_metadata_params)
+        return response
+
+    def get_metadata(self, metadata_type, metadata_id='*'):
+        """
+        Gets any type of metadata, for any ID
+
+        Responses to ID=* (everything of a type, or everything at all for
+        METADATA-SYSTEM) come in a block per resource, class or lookup.
+        Each block is listed in the response's 'metadata', with its 'type'
+        (ex. 'METADATA-TABLE'), 'attributes' (ex. Resource and Class) and
+        'rows'.
+
+        :param metadata_type: a metadata type (ex. 'METADATA-TABLE')
+        :type metadata_type: str
+        :param metadata_id: the ID of the metadata (ex. 'Property:Listing')
+        :type metadata_id: str
+        :rtype: dict
+        :return: Response dictionary with rows of metadata
+        """
+        get_metadata_params = {
+            'Type': metadata_type,
+            'ID': metadata_id,
+            'Format': 'COMPACT',
+        }
+
+        response = self.__get_metadata(get_metadata_params)
         return response
 
+    def get_schema(self, max_workers=4):
+        """
+        Loads the server's whole metadata into an indexed Schema
+
+        As few transactions as the server allows are used (see
+        retsdk.schema.MetadataLoader), max_workers at a time.
+
+        :param max_workers: the number of metadata transactions to run at once
+        :type max_workers: int
+        :rtype: retsdk.schema.Schema
+        """
+        return MetadataLoader(self, max_workers=max_workers).load()
+
+    def get_lookup(self, resource='Property', lookup_name=''):
+        """
+        Gets the codes of a lookup and the long values they stand for
+
+        The lookup's metadata is downloaded the first time it is asked for,
+        and the dict is reused after that.
+
+        :param resource: The name of a resource on a RETS server
+        :type resource: str
+        :param lookup_name: the 'LookupName' of a specific field
+        :type lookup_name: str
+        :rtype: dict
+        :return: {code: long value} (codes as they appear in COMPACT data)
+        """
+        key = (resource, lookup_name)
+        if key not in self.__lookups:
+            response = self.get_lookup_type_metadata(resource, lookup_name)
+            if not response['ok']:
+                raise ResponseError(response=response['reply_text'])
+            self.__lookups[key] = lookup_table(response['rows'])
+
+        return self.__lookups[key]
+
+    def get_decoder(self, resource='Property', class_name='Listing',
+                    lookups=False):
+        """
+        Gets a TableDecoder for the fields of a specific class
+
+        The decoder is built from the class's table metadata the first time
+        it is asked for, and reused after that.
+
+        With lookups=True, the decoder also expands the lookup codes sent
+        in the COMPACT format into their long values (see get_lookup).
+
+        :param resource: The name of a specific resource on a RETS server
+        :type resource: str
+        :param class_name: The ClassName/SystemName of a class within resource
+        :type class_name: str
+        :param lookups: True to expand lookup codes client-side
+        :type lookups: bool
+        :rtype: retsdk.decoders.TableDecoder
+        :return: a decoder for Search data from the class
+        """
+        key = (resource, class_name, lookups)
+        if key not in self.__decoders:
+            response = self.get_table_metadata(resource, class_name)
+            if not response['ok']:
+                raise ResponseError(response=response['reply_text'])
+
+            def get_lookup(lookup_name):
+                return self.get_lookup(resource, lookup_name)
+
+            self.__decoders[key] = TableDecoder(
+                response['rows'], get_lookup if lookups else None
+            )
+
+        return self.__decoders[key]
+
     def __get_metadata(self, parameters):
         """
         Handles the GetMetadata transaction for all of the metadata methods
 
-        :param parameters: A string of encoded GetMetadata URL parameters
-        :type parameters: str
+        Successful responses are served from (and saved to) the metadata
+        cache, if this connection has one. Lookup values are left as the
+        server sent them (see retsdk.decoders.MetadataDecoder).
+
+        :param parameters: GetMetadata URL parameters (Type, ID and Format)
+        :type parameters: dict
         :rtype: dict
         :return: Response dictionary for GetMetadata requests
         """
         if not self.get_metadata_url:
             raise TransactionError(transaction_type='GetMetadata')
         else:
-            url = self.get_metadata_url + '?' + parameters
+            use_cache = self.metadata_cache and self.metadata_version
+            if use_cache:
+                response = self.metadata_cache.get(self.__cache_server,
+                                                   parameters['Type'],
+                                                   parameters['ID'],
+                                                   self.metadata_version)
+                if response is not None:
+                    return response
+
+            url = self.get_metadata_url + '?' + urlencode(parameters)
             metadata_request = request.Request(url, headers=self.headers)
-            response = self.__make_request(metadata_request)[1]
+            response = self.__make_request(metadata_request,
+                                           MetadataDecoder())[1]
+
+            if use_cache and response and response['ok']:
+                self.metadata_cache.set(self.__cache_server,
+                                        parameters['Type'],
+                                        parameters['ID'],
+                                        self.metadata_version, response)
 
             return response
 
     def get_object(self, resource, obj_type, obj_id,
-                   order_no=0, path=None, write=False):
+                   order_no=0, path=None, write=False, etag=None):
         """
         Performs a getObject transaction. 
 
@@ -226,6 +400,16 @@ class RETSConnection(object):
         to the file specified in 'path' and 'object_data' will not be included
         in the response dictionary.
 
+        Written objects are streamed to disk in chunks (through a temporary
+        file that is renamed into place), so they are never held in memory.
+        The response dictionary then includes the 'path', 'size' (in bytes),
+        'content_type' and 'etag' of the object instead.
+
+        When writing, the ETag of a previously downloaded copy of the object
+        can be passed in as etag. If the server reports that the object has
+        not changed since, the file is left alone and the response dictionary
+        has 'not_modified' set to True.
+
         :param resourse: The name of a resource on a RETS server
         :type resource: str
         :param obj_type: the Object Type (ex. "Photo")
@@ -240,11 +424,13 @@ class RETSConnection(object):
                       by path); False if you just want to return the object
                       data in the response dictionary
         :type write: bool
+        :param etag: the ETag of an already downloaded copy of the object
+        :type etag: str
         :rtype: dict
         :return: response dictionary that includes 'object_data'
         """
         if self.get_object_url:
-            obj_id = obj_id + ':' + order_no
+            obj_id = str(obj_id) + ':' + str(order_no)
 
             get_object_params = {
                 'Type': obj_type,
@@ -255,34 +441,293 @@ class RETSConnection(object):
             url_params = urlencode(get_object_params)
             full_url = self.get_object_url + '?' + url_params
             r = request.Request(full_url, headers=self.headers)
-            successful = False
-            retry_counter = 3
+            if write and etag:
+                r.add_header('If-None-Match', etag)
 
-            while retry_counter > 0 and successful == False:
-                successful, response = self.__make_request(r)
-                retry_counter -= 1
+            for attempt in range(self.scheduler.retries('GetObject')):
+                if attempt:
+                    self.__count('GetObject', 'retries')
+                try:
+                    if write:
+                        successful, response = self.__download(r, path)
+                    else:
+                        successful, response = self.__make_request(r)
+                except RateLimitError as e:
+                    self.__backoff('GetObject', attempt, e.retry_after)
+                    continue
 
                 # Pause/retry if rate limit exceeded 
                 if successful and response['reply_text'] == 'Too many outstanding requests':
-                    successful = False
-                    print('Rate limit exceeded. Pausing for 60 seconds...', file=sys.stdout)
-                    time.sleep(60)
-
-            if not successful:
-                # Ran out of retries without a successful response
-                raise RequestError('The RETS request could not be completed')
+                    self.__backoff('GetObject', attempt)
+                    continue
 
-            if write:
-                if response['ok']:
-                    with open(path, 'wb') as f:
-                        f.write(response['object_data'])
-                    del response['object_data']
+                if successful:
+                    return response
 
-            return response
+            # Ran out of retries without a successful response
+            raise RequestError('The RETS request could not be completed')
         else:
             # No GetObject transaction access on this account
             raise TransactionError(transaction_type='GetObject')
 
+    def get_objects(self, resource, obj_type, obj_ids, path=None,
+                    chunk_size=65536):
+        """
+        Performs one getObject transaction for many objects at once
+
+        obj_ids can be a list of record IDs (every object for each record is
+        requested) or a dict that maps record IDs to lists of order numbers.
+        The server sends everything back in one multipart response, which is
+        read one part at a time. A response dictionary is yielded for each
+        part, with its 'content_id', 'object_id' and 'content_type' (and its
+        'location', if the server sent one) along with 'object_data'.
+
+        If path is a directory, each object is written there as it is read,
+        named <content_id>-<object_id><extension>, and the file's 'path' is
+        included in the response dictionary instead of 'object_data'.
+
+        :param resource: The name of a resource on a RETS server
+        :type resource: str
+        :param obj_type: the Object Type (ex. "Photo")
+        :type obj_type: str
+        :param obj_ids: record IDs, or a dict of record IDs to order numbers
+        :type obj_ids: list or dict
+        :param path: A directory where object data can be written
+        :type path: str
+        :param chunk_size: the maximum number of bytes to read at a time
+        :type chunk_size: int
+        :rtype: generator
+        :return: a generator of response dictionaries (one per object)
+        """
+        if not self.get_object_url:
+            # No GetObject transaction access on this account
+            raise TransactionError(transaction_type='GetObject')
+
+        ids = []
+        if isinstance(obj_ids, dict):
+            for obj_id, order_nos in obj_ids.items():
+                order_nos = [str(n) for n in order_nos] or ['*']
+                ids.append(str(obj_id) + ':' + ':'.join(order_nos))
+        else:
+            ids = [str(obj_id) + ':*' for obj_id in obj_ids]
+
+        get_object_params = {
+            'Type': obj_type,
+            'Resource': resource,
+            'Id': ','.join(ids),
+        }
+
+        url_params = urlencode(get_object_params)
+        full_url = self.get_object_url + '?' + url_params
+        object_request = request.Request(full_url, headers=self.headers)
+
+        for attempt in range(self.scheduler.retries('GetObject')):
+            if attempt:
+                self.__count('GetObject', 'retries')
+            yielded = False
+
+            try:
+                with self.__send(object_request) as r:
+                    content_type = r.headers.get_content_type()
+
+                    if content_type.startswith('multipart/'):
+                        boundary = r.headers.get_param('boundary')
+                        parts = iter_multipart(r, boundary, chunk_size)
+                        for headers, chunks in parts:
+                            yielded = True
+                            yield self.__object_part(headers, chunks, path)
+                        return
+
+                    if not is_xml(content_type):
+                        # Only one object was sent back
+                        chunks = read_chunks(r, chunk_size)
+                        yielded = True
+                        yield self.__object_part(r.headers, chunks, path)
+                        return
+
+                    xml = parse_xml(r.read(), r.headers.get_content_charset())
+                    response = parse_response(xml)
+            except (IncompleteRead, timeout):
+                if yielded:
+                    # Objects were already handed out, so this can't be retried
+                    raise RequestError('The RETS response was cut short')
+                print('Interrupted download. Retrying...', file=sys.stderr)
+                continue
+            except RateLimitError as e:
+                self.__backoff('GetObject', attempt, e.retry_after)
+                continue
+
+            # Pause/retry if rate limit exceeded
+            if response['reply_text'] == 'Too many outstanding requests':
+                self.__backoff('GetObject', attempt)
+                continue
+
+            yield response
+            return
+
+        # Ran out of retries without a successful response
+        raise RequestError('The RETS request could not be completed')
+
+    def __object_part(self, headers, chunks, path=None):
+        """
+        Builds a response dictionary for one object in a getObject response
+
+        :param headers: the headers sent with the object
+        :type headers: http.client.HTTPMessage
+        :param chunks: the object data, in pieces
+        :type chunks: iterable
+        :param path: A directory where object data can be written
+        :type path: str
+        :rtype: dict
+        :return: response dictionary for the object
+        """
+        content_type = headers.get_content_type()
+
+        if is_xml(content_type):
+            # Errors for individual objects are sent as RETS XML
+            xml = parse_xml(b''.join(chunks), headers.get_content_charset())
+            response = parse_response(xml)
+        else:
+            response = dict()
+            response['ok'] = True
+            response['reply_code'] = '0'
+            response['reply_text'] = 'Operation Success.'
+
+        response['content_id'] = headers.get('Content-ID')
+        response['object_id'] = headers.get('Object-ID')
+        response['content_type'] = content_type
+        if headers.get('Location'):
+            response['location'] = headers.get('Location')
+
+        if response['ok']:
+            if path:
+                extension = mimetypes.guess_extension(content_type) or ''
+                file_name = '{0}-{1}{2}'.format(response['content_id'],
+                                                response['object_id'],
+                                                extension)
+                response['path'] = os.path.join(path, file_name)
+                response['size'] = write_atomic(chunks, response['path'])
+            else:
+                response['object_data'] = b''.join(chunks)
+
+        return response
+
+    def download_objects(self, jobs, max_workers=4, skip_existing=True):
+        """
+        Downloads many objects to disk using a pool of worker threads
+
+        Each job is a (resource, obj_type, obj_id, order_no, path) tuple, and
+        can have the ETag from an earlier download of the object added as a
+        sixth item, and the object's size in bytes as a seventh (the ETag
+        can be None). If a job's file already exists and has data (exactly
+        size bytes of it, if a size was given), it is skipped when
+        skip_existing is True, unless an ETag was given; then the object is
+        only downloaded again if it has changed on the server. A file of the
+        wrong size (ex. left behind by an interrupted copy) is always
+        downloaded again in full.
+
+        Workers share this connection, so a rate limit reply to any one of
+        them pauses all of them.
+
+        The summary dictionary that is returned has counts of objects that
+        'succeeded', were 'skipped' or 'failed', the total 'bytes' written,
+        the 'elapsed' seconds, 'objects_per_second' and 'bytes_per_second',
+        a list of 'errors' as (job, message) tuples, and dicts of the
+        'etags' and 'sizes' of the objects that were downloaded or found
+        unchanged (by a not modified reply), keyed by path. Both can be
+        passed back in the jobs of a later run.
+
+        :param jobs: (resource, obj_type, obj_id, order_no, path[, etag[,
+                     size]]) tuples
+        :type jobs: iterable
+        :param max_workers: the number of objects to download at once
+        :type max_workers: int
+        :param skip_existing: True to skip jobs whose files already exist
+        :type skip_existing: bool
+        :rtype: dict
+        :return: a summary of the downloads
+        """
+        summary = {
+            'succeeded': 0,
+            'skipped': 0,
+            'failed': 0,
+            'bytes': 0,
+            'errors': [],
+            'etags': {},
+            'sizes': {},
+        }
+
+        def download(job):
+            resource, obj_type, obj_id, order_no, path = job[:5]
+            etag = job[5] if len(job) > 5 else None
+            size = job[6] if len(job) > 6 else None
+
+            existing = os.path.getsize(path) if os.path.exists(path) else 0
+            if existing > 0 and size in (None, existing):
+                if etag is None and skip_existing:
+                    return {'ok': True, 'not_modified': True}
+            else:
+                # Nothing (complete) on disk to compare the ETag against
+                etag = None
+
+            response = self.get_object(resource, obj_type, obj_id,
+                                       order_no=order_no, path=path,
+                                       write=True, etag=etag)
+            if response.get('not_modified'):
+                # The copy on disk is still current, and so is its ETag
+                response['etag'] = etag
+                response['size'] = existing
+            return response
+
+        def record(job, future):
+            try:
+                response = future.result()
+            except (RequestError, TransactionError, ResponseError, OSError,
+                    ET.ParseError) as e:
+                # One bad job (ex. a path that can't be written) is counted,
+                # rather than losing the summary of the others
+                summary['failed'] += 1
+                summary['errors'].append((job, str(e)))
+                return
+
+            if not response['ok']:
+                summary['failed'] += 1
+                summary['errors'].append((job, response['reply_text']))
+            elif response.get('not_modified'):
+                summary['skipped'] += 1
+                if response.get('etag'):
+                    summary['etags'][response['path']] = response['etag']
+                    summary['sizes'][response['path']] = response['size']
+            else:
+                summary['succeeded'] += 1
+                summary['bytes'] += response['size']
+                summary['sizes'][response['path']] = response['size']
+                if response['etag']:
+                    summary['etags'][response['path']] = response['etag']
+
+        start = time.time()
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for job in jobs:
+                if len(pending) >= max_workers * 2:
+                    # Keep the queue short so jobs can be a lazy iterable
+                    done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(pending.pop(future), future)
+
+                pending[executor.submit(download, job)] = job
+
+            for future in wait(pending).done:
+                record(pending[future], future)
+
+        summary['elapsed'] = time.time() - start
+        elapsed = summary['elapsed'] or 1e-9
+        summary['objects_per_second'] = summary['succeeded'] / elapsed
+        summary['bytes_per_second'] = summary['bytes'] / elapsed
+
+        return summary
+
     def get_count(self, resource, class_name, query):
         """
         Performs the Search transaction and returns the record count only
@@ -297,7 +742,7 @@ class RETSConnection(object):
         :return: the number of rows that query would return
         """
         query_data = {
-            'FORMAT': 'COMPACT-DECODED', 
+            'FORMAT': 'COMPACT', 
             'SearchType': resource, 
             'Class': class_name,
             'StandardNames': '0', 
@@ -312,10 +757,25 @@ class RETSConnection(object):
         return response['record_count']
 
     def get_data(self, resource, class_name, query, fields,
-                 data_format='COMPACT-DECODED', limit=None, offset=None):
+                 data_format='COMPACT-DECODED', limit=None, offset=None,
+                 typed=False, row_format='dict'):
         """
         Performs the Search transaction and returns data
 
+        By default, each value's type is guessed by cast(). With typed=True,
+        values are decoded according to the class's table metadata instead
+        (see get_decoder).
+
+        With row_format='columnar', 'rows' is a retsdk.results.ColumnarRows
+        instead of a list of dictionaries, which takes far less memory for
+        large results. With row_format='lazy', the rows are
+        retsdk.results.LazyRow objects, which only decode the values that
+        are looked up.
+
+        With data_format='COMPACT', the server sends lookup codes instead
+        of their (much longer) display values. Combined with typed=True,
+        the codes are expanded client-side from cached lookup metadata.
+
         :param resource: A Resource on a RETS server
         :type resource: str
         :param class_name: A class within resource
@@ -330,11 +790,306 @@ class RETSConnection(object):
         :type limit: int
         :param offset: the number of records to offset in the response
         :type offset: int
+        :param typed: True to decode values using the class's metadata
+        :type typed: bool
+        :param row_format: 'dict' (the default), 'lazy' or 'columnar'
+        :type row_format: str
         :rtype: dict
         :return: Response dictionary
         """
+        decoder = self.__search_decoder(resource, class_name, fields,
+                                        data_format, typed)
+        url_params = self.__data_parameters(resource, class_name, query,
+                                            fields, data_format, limit,
+                                            offset)
+        response = self.__search(url_params, decoder, row_format)
+
+        return response
+
+    def get_all_data(self, resource, class_name, query, fields,
+                     data_format='COMPACT-DECODED', page_size=None,
+                     prefetch=False, typed=False):
+        """
+        Pages through a Search transaction and yields every matching row
+
+        Search transactions are repeated with an advancing Offset for as long
+        as the server reports that there are more rows (<MAXROWS/>). Rows are
+        yielded lazily, so only one page (two when prefetching) is ever held
+        in memory.
+
+        :param resource: A Resource on a RETS server
+        :type resource: str
+        :param class_name: A class within resource
+        :type class_name: str
+        :param query: A DMQL query to request rows of data from the class
+        :type query: str
+        :param fields: a list of the fields to be returned for each record
+        :type: fields: list
+        :param data_format: the data format for response data
+        :type data_format: str
+        :param page_size: the number of records to request per Search (if
+                          None, the server's own maximum is used)
+        :type page_size: int
+        :param prefetch: True to request the next page in the background
+                         while the rows of the current page are consumed
+        :type prefetch: bool
+        :param typed: True to decode values using the class's metadata
+        :type typed: bool
+        :rtype: generator
+        :return: a generator of row dictionaries
+        """
+        def fetch(offset):
+            return self.get_data(resource, class_name, query, fields,
+                                 data_format=data_format, limit=page_size,
+                                 offset=offset, typed=typed)
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        offset = 1  # RETS offsets start at 1
+
+        try:
+            response = fetch(offset)
+            while True:
+                if not response['ok']:
+                    if response['reply_code'] == '20201':
+                        # No records found
+                        return
+                    raise ResponseError(response=response['reply_text'])
+
+                rows = response['rows']
+                next_page = None
+                has_next = response['more_rows'] and len(rows) > 0
+
+                if has_next:
+                    offset += len(rows)
+                    if executor:
+                        next_page = executor.submit(fetch, offset)
+
+                for row in rows:
+                    yield row
+
+                if not has_next:
+                    return
+
+                if next_page:
+                    response = next_page.result()
+                else:
+                    response = fetch(offset)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+    def export_data(self, resource, class_name, query, fields, sink,
+                    data_format='COMPACT-DECODED', page_size=None,
+                    typed=False):
+        """
+        Streams every matching row into a sink, without collecting them
+
+        Pages are requested like get_all_data's, but each one is streamed
+        (see get_data_iter) straight into sink, which writes the rows out
+        in batches. The sink gets its columns from the COLUMNS header, and
+        is closed once every row has been written.
+
+        :param resource: A Resource on a RETS server
+        :type resource: str
+        :param class_name: A class within resource
+        :type class_name: str
+        :param query: A DMQL query to request rows of data from the class
+        :type query: str
+        :param fields: a list of the fields to be returned for each record
+        :type: fields: list
+        :param sink: where to write the rows (ex. a retsdk.sinks.CSVSink)
+        :type sink: retsdk.sinks.Sink
+        :param data_format: the data format for response data
+        :type data_format: str
+        :param page_size: the number of records to request per Search (if
+                          None, the server's own maximum is used)
+        :type page_size: int
+        :param typed: True to decode values using the class's metadata
+        :type typed: bool
+        :rtype: dict
+        :return: the sink's stats() (rows, batches, rows_per_second, ...)
+        """
+        offset = 1  # RETS offsets start at 1
+
+        with sink:
+            while True:
+                response = {}
+                rows = self.get_data_iter(resource, class_name, query,
+                                          fields, data_format=data_format,
+                                          limit=page_size, offset=offset,
+                                          response=response, typed=typed)
+                count = 0
+                for row in rows:
+                    if count == 0:
+                        sink.open(response['columns'])
+                    sink.write(row)
+                    count += 1
+
+                if not response.get('ok'):
+                    if response.get('reply_code') == '20201':
+                        # No (more) records found
+                        break
+                    raise ResponseError(response=response.get('reply_text'))
+                if response.get('columns'):
+                    sink.open(response['columns'])
+                if not response['more_rows'] or count == 0:
+                    break
+                offset += count
+
+        return sink.stats()
+
+    def get_sharded_data(self, resource, class_name, query, fields,
+                         shard_field, low, high, key_field='ListingID',
+                         max_rows=2500, max_outstanding=4, typed=False):
+        """
+        Splits a Search into range shards and yields their merged rows
+
+        The range low-high of shard_field is split into shards that each
+        hold no more than max_rows rows (sized with get_count), and the
+        shards are searched max_outstanding at a time. Rows are yielded as
+        their shards finish, with duplicate keys left out. See
+        retsdk.sharding.ShardedSearch.
+
+        :param resource: A Resource on a RETS server
+        :type resource: str
+        :param class_name: A class within resource
+        :type class_name: str
+        :param query: A DMQL query to request rows of data from the class
+        :type query: str
+        :param fields: a list of the fields to be returned for each record
+        :type: fields: list
+        :param shard_field: the field to split the search on (ex. ListingID
+                            or ModificationTimestamp)
+        :type shard_field: str
+        :param low: the lowest value of shard_field to search for
+        :type low: int, datetime or str
+        :param high: the highest value of shard_field to search for
+        :type high: int, datetime or str
+        :param key_field: the field that uniquely identifies a record
+        :type key_field: str
+        :param max_rows: the most rows the server returns for one Search
+        :type max_rows: int
+        :param max_outstanding: the number of Searches to run at once
+        :type max_outstanding: int
+        :param typed: True to decode values using the class's metadata
+        :type typed: bool
+        :rtype: generator
+        :return: a generator of row dictionaries
+        """
+        search = ShardedSearch(self, resource, class_name, query, fields,
+                               shard_field, low, high, key_field=key_field,
+                               max_rows=max_rows,
+                               max_outstanding=max_outstanding, typed=typed)
+        return search.rows()
+
+    def get_data_iter(self, resource, class_name, query, fields,
+                      data_format='COMPACT-DECODED', limit=None, offset=None,
+                      response=None, typed=False):
+        """
+        Performs the Search transaction and yields rows as they arrive
+
+        This works like get_data, but rows are parsed straight off of the
+        HTTP response and yielded one at a time instead of being collected
+        into a list, so memory use stays flat for very large results.
+
+        Pass in a dict as 'response' to have it filled in with the reply
+        code/text, record count, more_rows and column names for the search.
+
+        :param resource: A Resource on a RETS server
+        :type resource: str
+        :param class_name: A class within resource
+        :type class_name: str
+        :param query: A DMQL query to request rows of data from the class
+        :type query: str
+        :param fields: a list of the fields to be returned for each record
+        :type: fields: list
+        :param data_format: the data format for response data
+        :type data_format: str
+        :param limit: the maximum number of records that should be returned
+        :type limit: int
+        :param offset: the number of records to offset in the response
+        :type offset: int
+        :param response: an optional dict to be filled with response info
+        :type response: dict
+        :param typed: True to decode values using the class's metadata
+        :type typed: bool
+        :rtype: generator
+        :return: a generator of row dictionaries
+        """
+        if not self.search_url:
+            raise TransactionError(transaction_type="Search")
+
+        decoder = self.__search_decoder(resource, class_name, fields,
+                                        data_format, typed)
+
+        url_params = self.__data_parameters(resource, class_name, query,
+                                            fields, data_format, limit,
+                                            offset)
+        full_url = self.search_url + '?' + url_params
+        search_request = request.Request(full_url, headers=self.headers)
+        if response is None:
+            response = {}
+
+        for attempt in range(self.scheduler.retries('Search')):
+            if attempt:
+                self.__count('Search', 'retries')
+            yielded = False
+
+            rows = 0
+            try:
+                with self.__send(search_request) as r:
+                    for row in iter_response(r, response, decoder=decoder):
+                        yielded = True
+                        rows += 1
+                        yield row
+                    self.__observe('Search', 'rows', rows)
+            except (IncompleteRead, timeout):
+                if yielded:
+                    # Rows were already handed out, so this can't be retried
+                    raise RequestError('The RETS response was cut short')
+                print('Interrupted download. Retrying...', file=sys.stderr)
+                continue
+            except RateLimitError as e:
+                self.__backoff('Search', attempt, e.retry_after)
+                continue
+
+            if response['reply_text'] == 'Too many outstanding queries':
+                self.__backoff('Search', attempt)
+                continue
+
+            return
+
+        raise RequestError('The RETS request could not be completed')
+
+    def __search_decoder(self, resource, class_name, fields, data_format,
+                         typed):
+        """
+        Returns the decoder for a data Search (None unless typed)
+
+        COMPACT data has lookup codes, which typed decoding expands. The
+        lookups for fields are fetched here, before the Search is sent: a
+        streamed response is decoded while the Search still holds its
+        scheduler slot, and a GetMetadata then could wait on it forever.
+        """
+        if not typed:
+            return None
+        lookups = data_format == 'COMPACT'
+        decoder = self.get_decoder(resource, class_name, lookups=lookups)
+        if lookups:
+            decoder.compile(fields or list(decoder.lookup_fields))
+        return decoder
+
+    def __data_parameters(self, resource, class_name, query, fields,
+                          data_format='COMPACT-DECODED', limit=None,
+                          offset=None):
+        """
+        Encodes the URL parameters for a data Search transaction
+
+        :rtype: str
+        :return: a string of encoded Search URL parameters
+        """
         query_data = {
-            'FORMAT': 'COMPACT-DECODED', 
+            'FORMAT': data_format, 
             'SearchType': resource, 
             'Class': class_name,
             'StandardNames': '0', 
@@ -348,18 +1103,19 @@ class RETSConnection(object):
             query_data['Limit'] = str(limit)
         if offset:
             query_data['Offset'] = str(offset)
-        
-        url_params = urlencode(query_data)
-        response = self.__search(url_params)
 
-        return response
+        return urlencode(query_data)
 
-    def __search(self, parameters):
+    def __search(self, parameters, decoder=None, row_format='dict'):
         """
         Handles the Search transaction for get_count and get_data
 
         :param parameters: A string of encoded URL parameters for search
         :type parameters: str
+        :param decoder: decodes values by field (cast() is used by default)
+        :type decoder: retsdk.decoders.TableDecoder
+        :param row_format: 'dict', 'lazy' or 'columnar'
+        :type row_format: str
         :rtype: dict
         :return: response dictionary
         """
@@ -368,27 +1124,29 @@ class RETSConnection(object):
         else:
             full_url = self.search_url + '?' + parameters
             search_request = request.Request(full_url, headers=self.headers)
-            success = False
-            retry_counter = 10
-            response = {}
 
-            while retry_counter > 0 and success == False:
-                success, response = self.__make_request(search_request)
-                retry_counter -= 1
+            for attempt in range(self.scheduler.retries('Search')):
+                if attempt:
+                    self.__count('Search', 'retries')
+                try:
+                    success, response = self.__make_request(search_request,
+                                                            decoder,
+                                                            row_format)
+                except RateLimitError as e:
+                    self.__backoff('Search', attempt, e.retry_after)
+                    continue
 
                 if success and \
                 response['reply_text'] == 'Too many outstanding queries':
-                    success = False
-                    print('Rate limit exceeded. Pausing for 60 seconds...', 
-                                                            file=sys.stdout)
-                    time.sleep(60)
+                    self.__backoff('Search', attempt)
+                    continue
 
-            if not success:
-                raise RequestError('The RETS request could not be completed')
+                if success:
+                    return response
 
-            return response
+            raise RequestError('The RETS request could not be completed')
 
-    def __make_request(self, rets_request):
+    def __make_request(self, rets_request, decoder=None, row_format='dict'):
         """
         Makes a transaction request to the RETS server.
         
@@ -396,6 +1154,10 @@ class RETSConnection(object):
 
         :param request: a request to a RETS server
         :type request: urllib.request.Request
+        :param decoder: decodes values by field (cast() is used by default)
+        :type decoder: retsdk.decoders.TableDecoder
+        :param row_format: 'dict', 'lazy' or 'columnar'
+        :type row_format: str
         :rtype: bool, dict
         :return: boolean success value, response dict
         """
@@ -403,18 +1165,31 @@ class RETSConnection(object):
         response = None
 
         try:
-            r = request.urlopen(rets_request)
-            content_type = r.headers['Content-Type'].lower().replace(' ', '')
-            payload = r.read()
-
-            if content_type == 'text/xml;charset=utf-8':
-                xml = ET.fromstring(payload)
-                response = parse_response(xml)
-            elif content_type == 'image/jpeg':
+            with self.__send(rets_request) as r:
+                content_type = r.headers.get_content_type()
+                charset = r.headers.get_content_charset()
+                payload = r.read()
+                r.bytes_read = len(payload)
+
+            if is_xml(content_type, payload):
+                transaction = self.__transaction_type(rets_request)
+                start = time.perf_counter()
+                xml = parse_xml(payload, charset)
+                parsed = time.perf_counter()
+                response = parse_response(xml, decoder, row_format,
+                                          self.parallel_decoder)
+                decoded = time.perf_counter()
+
+                self.__observe(transaction, 'parse_time', parsed - start)
+                self.__observe(transaction, 'decode_time', decoded - parsed)
+                self.__observe(transaction, 'rows', len(response['rows']))
+            else:
+                # Objects (photos, documents, ...) are returned as-is
                 response = dict()
                 response['ok'] = True
                 response['reply_code'] = '0'
                 response['reply_text'] = 'Operation Success.'
+                response['content_type'] = content_type
                 response['object_data'] = payload
 
             success = True
@@ -423,14 +1198,193 @@ class RETSConnection(object):
             print('Incomplete read during download', file=sys.stderr)
         except timeout:
             print('The RETS request has timed out', file=sys.stderr)
-        except HTTPError as e:
-            msg = 'The RETS request caused HTTP Error {0}: {1}'.format(e.code, e.reason)
-            raise RequestError(msg)
-        except URLError as e:
-            msg = 'The RETS request caused URL Error: '.format(e.reason)
-            raise RequestError(msg)
         except ET.ParseError as e:
             # Something in an XML response could not be read
             raise
         
         return success, response
+
+    def __download(self, rets_request, path, chunk_size=65536):
+        """
+        Makes a getObject request and streams the object into a file
+
+        :param rets_request: a getObject request to a RETS server
+        :type rets_request: urllib.request.Request
+        :param path: the file path the object should be written to
+        :type path: str
+        :param chunk_size: the number of bytes to read/write at a time
+        :type chunk_size: int
+        :rtype: bool, dict
+        :return: boolean success value, response dict
+        """
+        success = False
+        response = None
+
+        try:
+            with self.__send(rets_request) as r:
+                content_type = r.headers.get_content_type()
+
+                if r.code == 304:
+                    # The copy we already have is still current
+                    response = dict()
+                    response['ok'] = True
+                    response['reply_code'] = '0'
+                    response['reply_text'] = 'Not Modified'
+                    response['not_modified'] = True
+                    response['path'] = path
+                elif is_xml(content_type):
+                    xml = parse_xml(r.read(), r.headers.get_content_charset())
+                    response = parse_response(xml)
+                else:
+                    chunks = read_chunks(r, chunk_size)
+                    response = dict()
+                    response['ok'] = True
+                    response['reply_code'] = '0'
+                    response['reply_text'] = 'Operation Success.'
+                    response['content_type'] = content_type
+                    response['etag'] = r.headers.get('ETag')
+                    response['path'] = path
+                    response['size'] = write_atomic(chunks, path)
+                    r.bytes_read = response['size']
+
+            success = True
+
+        except IncompleteRead:
+            print('Incomplete read during download', file=sys.stderr)
+        except timeout:
+            print('The RETS request has timed out', file=sys.stderr)
+
+        return success, response
+
+    @contextmanager
+    def __send(self, rets_request):
+        """
+        Sends a transaction request through the scheduler
+
+        The transaction holds its place with the scheduler (and the response
+        is kept open) until the with block is done with the response. Slots
+        are re-entrant per thread, so transactions sent while reading it
+        don't wait on it.
+
+        :param rets_request: a request to a RETS server
+        :type rets_request: urllib.request.Request
+        :rtype: http.client.HTTPResponse
+        :return: the HTTP response, with its body not yet read
+        """
+        transaction = self.__transaction_type(rets_request)
+        queued = time.perf_counter()
+
+        with self.scheduler.slot(transaction):
+            started = time.perf_counter()
+            try:
+                r = self.__open(rets_request)
+            except RequestError:
+                self.__count(transaction, 'errors')
+                raise
+            opened = time.perf_counter()
+
+            with closing(r):
+                try:
+                    yield r
+                except Exception:
+                    self.__count(transaction, 'errors')
+                    raise
+
+        if self.metrics is None:
+            return
+
+        self.__count(transaction, 'requests')
+        self.__observe(transaction, 'queue_time', started - queued)
+        for name, value in getattr(r, 'timings', {}).items():
+            self.__observe(transaction, name, value)
+        self.__observe(transaction, 'download_time',
+                       time.perf_counter() - opened)
+
+        size = getattr(r, 'bytes_read', None)
+        if size is None and r.headers.get('Content-Length'):
+            size = int(r.headers['Content-Length'])
+        if size is not None:
+            self.__observe(transaction, 'bytes', size)
+
+    def __transaction_type(self, rets_request):
+        """
+        Works out the transaction type (ex. 'Search') of a request
+        """
+        url = rets_request.full_url.split('?')[0]
+        transaction_urls = (
+            ('Search', 'search_url'),
+            ('GetObject', 'get_object_url'),
+            ('GetMetadata', 'get_metadata_url'),
+            ('Logout', 'logout_url'),
+        )
+        for transaction, attribute in transaction_urls:
+            if getattr(self, attribute, None) == url:
+                return transaction
+        return 'Login'
+
+    def __open(self, rets_request):
+        """
+        Sends a transaction request and returns the unread HTTP response
+
+        Timeouts are left for the caller to handle (they can be retried), but
+        HTTP and URL errors are raised as RequestErrors. HTTP 429 and 503
+        responses are raised as RateLimitErrors, with the server's
+        Retry-After (in seconds) if it sent one.
+
+        :param rets_request: a request to a RETS server
+        :type rets_request: urllib.request.Request
+        :rtype: http.client.HTTPResponse
+        :return: the HTTP response, with its body not yet read
+        """
+        try:
+            return self.opener.open(rets_request)
+        except HTTPError as e:
+            if e.code == 304:
+                # Not Modified (for conditional requests) isn't an error
+                return e
+            msg = 'The RETS request caused HTTP Error {0}: {1}'.format(e.code, e.reason)
+            if e.code in (429, 503):
+                retry_after = retry_after_seconds(e.headers.get('Retry-After'))
+                e.close()
+                raise RateLimitError(msg, retry_after)
+            raise RequestError(msg)
+        except URLError as e:
+            if isinstance(e.reason, timeout):
+                raise e.reason
+            msg = 'The RETS request caused URL Error: {0}'.format(e.reason)
+            raise RequestError(msg)
+
+    def __backoff(self, transaction, attempt, retry_after=None):
+        """
+        Holds back every transaction on this connection after a rate limit
+
+        The scheduler decides how long to pause for (and the pause is
+        shared, so other threads using this connection wait it out too
+        instead of piling more requests onto the server).
+
+        :param transaction: the type of the transaction that was rate limited
+        :type transaction: str
+        :param attempt: how many times the transaction has been tried before
+        :type attempt: int
+        :param retry_after: the delay the server asked for, in seconds
+        :type retry_after: float
+        """
+        delay = self.scheduler.backoff(transaction, attempt, retry_after)
+        self.__count(transaction, 'rate_limits')
+        self.__observe(transaction, 'rate_limit_wait', delay)
+        print('Rate limit exceeded. Pausing for {0:.1f} seconds...'.format(
+            delay), file=sys.stdout)
+
+    def __observe(self, transaction, name, value):
+        """
+        Passes a measurement on to the connection's metrics (if any)
+        """
+        if self.metrics is not None:
+            self.metrics.observe(transaction, name, value)
+
+    def __count(self, transaction, name, value=1):
+        """
+        Passes a count on to the connection's metrics (if any)
+        """
+        if self.metrics is not None:
+            self.metrics.increment(transaction, name, value)
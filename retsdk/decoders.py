@@ -0,0 +1,286 @@
+import threading
+from datetime import time
+
+from retsdk.utilities import cast, convert_boolean, unrets_date
+
+
+def to_int(value):
+    """
+    Decodes an Int/Small/Tiny/Long value
+    """
+    if value == '':
+        return None
+    return int(value)
+
+
+def to_float(value):
+    """
+    Decodes a Decimal value
+    """
+    if value == '':
+        return None
+    return float(value)
+
+
+def decimal_converter(precision):
+    """
+    Returns a function that decodes Decimal values, rounded to precision
+    decimal places (servers sometimes send more than a field has)
+
+    :param precision: the number of decimal places (the field's Precision)
+    :type precision: int
+    :rtype: function
+    """
+    def to_decimal(value):
+        if value == '':
+            return None
+        return round(float(value), precision)
+
+    return to_decimal
+
+
+def to_boolean(value):
+    """
+    Decodes a Boolean value (1/0 as well as the y/yes/n/no variants)
+    """
+    if value == '':
+        return None
+    if value == '1':
+        return True
+    if value == '0':
+        return False
+    return convert_boolean(value)
+
+
+def to_string(value):
+    """
+    Decodes a Character value
+    """
+    if value == '':
+        return None
+    return value
+
+
+def to_date(value):
+    """
+    Decodes a Date value (YYYY-MM-DD, with or without a time part)
+    """
+    if value == '':
+        return None
+    return unrets_date(value[:10]).date()
+
+
+def to_datetime(value):
+    """
+    Decodes a DateTime value (ISO 8601, with or without fractional seconds)
+    """
+    if value == '':
+        return None
+    return unrets_date(value)
+
+
+def to_time(value):
+    """
+    Decodes a Time value (HH:MM:SS, with or without fractional seconds)
+    """
+    if value == '':
+        return None
+    return time.fromisoformat(value.rstrip('Z'))
+
+
+def to_list(value):
+    """
+    Decodes a LookupMulti value into a list of its (comma-separated) values
+    """
+    if value == '':
+        return None
+    return value.split(',')
+
+
+DATA_TYPES = {
+    'Boolean': to_boolean,
+    'Character': to_string,
+    'Date': to_date,
+    'DateTime': to_datetime,
+    'Time': to_time,
+    'Tiny': to_int,
+    'Small': to_int,
+    'Int': to_int,
+    'Long': to_int,
+    'Decimal': to_float,
+}
+
+
+def lookup_table(rows):
+    """
+    Builds a lookup's {code: long value} dict from its metadata rows
+
+    :param rows: rows of METADATA-LOOKUP_TYPE (Value, LongValue, ...)
+    :type rows: list
+    :rtype: dict
+    :return: the long value of each code (codes as they appear in COMPACT
+             data, long values as they appear in COMPACT-DECODED data)
+    """
+    lookup = {}
+    for row in rows:
+        if row and row.get('Value') is not None:
+            long_value = row.get('LongValue')
+            if long_value is None:
+                long_value = row['Value']
+            lookup[str(row['Value'])] = str(long_value)
+    return lookup
+
+
+def lookup_converter(lookup, multi=False):
+    """
+    Returns a function that expands lookup codes into their long values
+
+    Codes that aren't in the lookup are left as they are.
+
+    :param lookup: maps the field's lookup codes to their long values
+    :type lookup: dict
+    :param multi: True for a LookupMulti (comma-separated) field
+    :type multi: bool
+    :rtype: function
+    """
+    get = lookup.get
+
+    def expand(value):
+        if value == '':
+            return None
+        return get(value, value)
+
+    def expand_all(value):
+        if value == '':
+            return None
+        return [get(code, code) for code in value.split(',')]
+
+    return expand_all if multi else expand
+
+
+def field_converter(field, lookup=None):
+    """
+    Returns a function that decodes values of a field in a RETS class
+
+    The converter is chosen from the field's DataType and Interpretation
+    (from the class's table metadata), and Decimal values are rounded to
+    the field's Precision. Values that don't match the field's DataType
+    (servers aren't always consistent) fall back to cast().
+
+    :param field: a row of table metadata for the field
+    :type field: dict
+    :param lookup: for Lookup/LookupMulti fields, a dict of the field's
+                   lookup codes and their long values, to expand codes
+                   (as sent in the COMPACT format)
+    :type lookup: dict
+    :rtype: function
+    :return: a function that decodes a single value of the field
+    """
+    interpretation = field.get('Interpretation')
+    if lookup is not None and interpretation in ('Lookup', 'LookupMulti'):
+        return lookup_converter(lookup, interpretation == 'LookupMulti')
+
+    if interpretation == 'LookupMulti':
+        convert = to_list
+    elif interpretation == 'Lookup':
+        convert = to_string
+    elif field.get('DataType') == 'Decimal' and \
+            str(field.get('Precision')).isdigit():
+        convert = decimal_converter(int(field['Precision']))
+    else:
+        convert = DATA_TYPES.get(field.get('DataType'), cast)
+
+    def converter(value):
+        try:
+            return convert(value)
+        except ValueError:
+            return cast(value)
+
+    return converter
+
+
+class MetadataDecoder(object):
+    """
+    Decodes GetMetadata data
+
+    Everything is cast() like it would be without a decoder, except for the
+    Value, ShortValue and LongValue of lookups. Those are codes and labels,
+    and are kept exactly as the server sent them: cast() would turn codes
+    like '0.50' or '007' into 0.5 and 7, which never match the codes in
+    COMPACT Search data.
+    """
+    text_columns = ('Value', 'ShortValue', 'LongValue')
+
+    def compile(self, columns):
+        """
+        Returns a list of converters that lines up with a list of columns
+
+        :param columns: the column names of a metadata block
+        :type columns: list
+        :rtype: list
+        :return: a converter function for each column
+        """
+        return [to_string if name in self.text_columns else cast
+                for name in columns]
+
+
+class TableDecoder(object):
+    """
+    Decodes Search data using the table metadata of a RETS class
+
+    cast() has to guess at the type of every value it sees, which is slow
+    and can give different types for the same field from row to row. A
+    TableDecoder works out a converter for each field once, from the
+    field's metadata, so every value of a field is decoded the same way
+    with a single call. Fields missing from the metadata fall back to cast().
+
+    If lookups is given, it is called with a LookupName to get that
+    lookup's {code: long value} dict (see RETSConnection.get_lookup), and
+    the codes of Lookup and LookupMulti fields are expanded client-side,
+    like the server would for COMPACT-DECODED. A lookup is only asked for
+    the first time one of its fields shows up in a response.
+    """
+    def __init__(self, table_rows, lookups=None):
+        self.table_rows = list(table_rows)
+        self.lookups = lookups
+        self.converters = {}
+        self.lookup_fields = {}
+        self.resolved = {}
+        self._lock = threading.Lock()
+        for field in self.table_rows:
+            if field:
+                name = str(field['SystemName'])
+                self.converters[name] = field_converter(field)
+                if lookups and field.get('LookupName') and \
+                        field.get('Interpretation') in ('Lookup',
+                                                        'LookupMulti'):
+                    self.lookup_fields[name] = field
+
+    def compile(self, columns):
+        """
+        Returns a list of converters that lines up with a list of columns
+
+        :param columns: the column names of a RETS response
+        :type columns: list
+        :rtype: list
+        :return: a converter function for each column
+        """
+        if self.lookup_fields:
+            with self._lock:
+                for name in columns:
+                    field = self.lookup_fields.get(name)
+                    if field is not None:
+                        lookup_name = str(field['LookupName'])
+                        lookup = self.lookups(lookup_name)
+                        self.resolved[lookup_name] = lookup
+                        self.converters[name] = field_converter(field, lookup)
+                        del self.lookup_fields[name]
+
+        return [self.converters.get(name, cast) for name in columns]
+
+    def __reduce__(self):
+        # Converters are closures, so a pickled decoder (ex. one sent to a
+        # worker process) is rebuilt from its metadata, with the lookups
+        # that have been resolved so far
+        lookups = self.resolved.get if self.lookups else None
+        return (TableDecoder, (self.table_rows, lookups))
@@ -27,3 +27,8 @@ class TransactionError(Exception):
         msg = "The transaction '{0}' is not available".format(self.transaction_type)
         return msg
 
+
+class RateLimitError(RequestError):
+    def __init__(self, message, retry_after=None):
+        self.message = message
+        self.retry_after = retry_after
@@ -0,0 +1,205 @@
+import socket
+import threading
+from collections import deque
+
+
+class Metrics(object):
+    """
+    Receives measurements of a connection's transactions
+
+    RETSConnection calls observe() for measurements that vary from request
+    to request (times in seconds, bytes, rows) and increment() for counts
+    (requests, retries, rate limits), each tagged with the transaction type
+    (ex. 'Search'). This base class ignores everything; subclass it to send
+    measurements somewhere, or use MetricsCollector.
+    """
+    def observe(self, transaction, name, value):
+        """
+        Records one measurement
+
+        :param transaction: a transaction type (ex. 'Search')
+        :type transaction: str
+        :param name: what was measured (ex. 'ttfb')
+        :type name: str
+        :param value: the measurement
+        :type value: float
+        """
+        pass
+
+    def increment(self, transaction, name, value=1):
+        """
+        Adds to a count
+
+        :param transaction: a transaction type (ex. 'Search')
+        :type transaction: str
+        :param name: what was counted (ex. 'retries')
+        :type name: str
+        :param value: how much to add
+        :type value: int
+        """
+        pass
+
+
+class MetricsCollector(Metrics):
+    """
+    Keeps measurements in memory and summarizes them with percentiles
+
+    The latest 'window' measurements of each kind are kept for percentiles
+    (sums and counts cover every measurement). Everything is also passed on
+    to any exporters, such as a StatsDExporter.
+    """
+    def __init__(self, exporters=None, window=10000):
+        self.exporters = list(exporters or [])
+        self.window = window
+        self._values = {}
+        self._totals = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, transaction, name, value):
+        key = (transaction, name)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = deque(maxlen=self.window)
+                self._totals[key] = [0, 0]
+            self._values[key].append(value)
+            self._totals[key][0] += 1
+            self._totals[key][1] += value
+
+        for exporter in self.exporters:
+            exporter.observe(transaction, name, value)
+
+    def increment(self, transaction, name, value=1):
+        key = (transaction, name)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+        for exporter in self.exporters:
+            exporter.increment(transaction, name, value)
+
+    def count(self, transaction, name):
+        """
+        Returns a count (0 if nothing was counted)
+        """
+        return self._counters.get((transaction, name), 0)
+
+    def percentile(self, transaction, name, percent):
+        """
+        Returns a percentile of the recent measurements (or None if none)
+
+        :param transaction: a transaction type (ex. 'Search')
+        :type transaction: str
+        :param name: what was measured (ex. 'ttfb')
+        :type name: str
+        :param percent: the percentile (ex. 99)
+        :type percent: float
+        :rtype: float
+        """
+        with self._lock:
+            values = sorted(self._values.get((transaction, name), ()))
+        if not values:
+            return None
+        rank = int(round(percent / 100.0 * (len(values) - 1)))
+        return values[rank]
+
+    def summary(self):
+        """
+        Summarizes everything by transaction type
+
+        Counts are given as plain numbers. Measurements are given as dicts
+        with their 'count', 'sum', 'mean', 'min', 'max', 'p50', 'p90' and
+        'p99'.
+
+        :rtype: dict
+        :return: {transaction: {name: summary}}
+        """
+        with self._lock:
+            values = {key: sorted(v) for key, v in self._values.items()}
+            totals = {key: list(v) for key, v in self._totals.items()}
+            counters = dict(self._counters)
+
+        summary = {}
+        for (transaction, name), total in counters.items():
+            summary.setdefault(transaction, {})[name] = total
+
+        for (transaction, name), window in values.items():
+            count, total = totals[(transaction, name)]
+            stats = {'count': count, 'sum': total, 'mean': total / count,
+                     'min': window[0], 'max': window[-1]}
+            for percent in (50, 90, 99):
+                rank = int(round(percent / 100.0 * (len(window) - 1)))
+                stats['p{0}'.format(percent)] = window[rank]
+            summary.setdefault(transaction, {})[name] = stats
+
+        return summary
+
+    def to_prometheus(self, prefix='retsdk'):
+        """
+        Returns the summary in the Prometheus text exposition format
+
+        :param prefix: prepended to every metric name
+        :type prefix: str
+        :rtype: str
+        """
+        lines = []
+        for transaction, metrics in sorted(self.summary().items()):
+            label = 'transaction="{0}"'.format(transaction)
+            for name, stats in sorted(metrics.items()):
+                metric = '{0}_{1}'.format(prefix, name)
+                if not isinstance(stats, dict):
+                    lines.append('{0}_total{{{1}}} {2}'.format(metric, label,
+                                                               stats))
+                    continue
+                for percent in (50, 90, 99):
+                    lines.append('{0}{{{1},quantile="{2}"}} {3}'.format(
+                        metric, label, percent / 100.0,
+                        stats['p{0}'.format(percent)]
+                    ))
+                lines.append('{0}_sum{{{1}}} {2}'.format(metric, label,
+                                                         stats['sum']))
+                lines.append('{0}_count{{{1}}} {2}'.format(metric, label,
+                                                           stats['count']))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """
+        Drops every measurement and count
+        """
+        with self._lock:
+            self._values.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+
+class StatsDExporter(Metrics):
+    """
+    Sends measurements to a StatsD server over UDP
+
+    Metrics are named <prefix>.<transaction>.<name>. Times (names ending in
+    '_time', and 'ttfb') are sent as timers in milliseconds, other
+    measurements as histograms and counts as counters.
+    """
+    def __init__(self, host='127.0.0.1', port=8125, prefix='retsdk'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def observe(self, transaction, name, value):
+        if name.endswith('_time') or name == 'ttfb':
+            self.send(transaction, name, value * 1000, 'ms')
+        else:
+            self.send(transaction, name, value, 'h')
+
+    def increment(self, transaction, name, value=1):
+        self.send(transaction, name, value, 'c')
+
+    def send(self, transaction, name, value, metric_type):
+        """
+        Sends one StatsD packet (errors are ignored, as is usual for StatsD)
+        """
+        packet = '{0}.{1}.{2}:{3:g}|{4}'.format(self.prefix, transaction,
+                                                name, value, metric_type)
+        try:
+            self._socket.sendto(packet.encode('ascii'), self.address)
+        except OSError:
+            pass
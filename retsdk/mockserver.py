@@ -0,0 +1,561 @@
+import gzip
+import hashlib
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from urllib.request import parse_http_list, parse_keqv_list
+
+
+FIELDS = [
+    # SystemName, DataType, Interpretation, LookupName
+    ('ListingID', 'Character', None, None),
+    ('ListPrice', 'Int', 'Currency', None),
+    ('Status', 'Character', 'Lookup', 'Status'),
+    ('PostalCode', 'Character', None, None),
+    ('Acres', 'Decimal', 'Number', None),
+    ('ListDate', 'Date', None, None),
+    ('ModificationTimestamp', 'DateTime', None, None),
+]
+
+STATUSES = [('A', 'Active'), ('P', 'Pending'), ('S', 'Sold')]
+
+CLAUSE = re.compile(r'\((\w+)=([^)]*)\)')
+
+
+def make_listings(count, seed=0):
+    """
+    Builds a list of synthetic listing rows for the mock server
+
+    :param count: the number of listings
+    :type count: int
+    :param seed: a seed for the value generator (for repeatable data)
+    :type seed: int
+    :rtype: list
+    :return: a list of listing dicts (all values are strings)
+    """
+    rng = random.Random(seed)
+    start = datetime(2019, 1, 1)
+    listings = []
+
+    for i in range(count):
+        listed = start + timedelta(days=rng.randrange(365))
+        modified = listed + timedelta(seconds=rng.randrange(10 ** 7))
+        listings.append({
+            'ListingID': 'L{0:07d}'.format(i + 1),
+            'ListPrice': str(rng.randrange(50, 2000) * 1000),
+            'Status': rng.choice(STATUSES)[1],
+            'PostalCode': '0{0:04d}'.format(rng.randrange(10000)),
+            'Acres': '{0:.2f}'.format(rng.random() * 5),
+            'ListDate': listed.date().isoformat(),
+            'ModificationTimestamp': modified.isoformat(timespec='milliseconds'),
+        })
+
+    return listings
+
+
+def matches(listing, query):
+    """
+    Returns True if a listing matches a (very small subset of) DMQL query
+
+    Supported: comma-separated (AND) clauses of the forms (Field=value),
+    (Field=a|b), (Field=low+), (Field=high-) and (Field=low-high). A value of
+    '*' matches everything.
+    """
+    for field, criteria in CLAUSE.findall(query):
+        value = listing.get(field)
+        if value is None:
+            return False
+        if criteria in ('*', '.ANY.'):
+            continue
+        if criteria.endswith('+'):
+            ok = compare(value, criteria[:-1]) >= 0
+        elif criteria.endswith('-'):
+            ok = compare(value, criteria[:-1]) <= 0
+        elif '|' in criteria:
+            ok = value in criteria.split('|')
+        elif '-' in criteria and split_range(criteria):
+            low, high = split_range(criteria)
+            ok = compare(value, low) >= 0 and compare(value, high) <= 0
+        else:
+            ok = value == criteria
+        if not ok:
+            return False
+    return True
+
+
+def split_range(criteria):
+    """
+    Splits 'low-high' into (low, high), allowing dashes inside dates
+    """
+    positions = [i for i, c in enumerate(criteria) if c == '-']
+    for i in positions:
+        if len(criteria[:i]) == len(criteria[i + 1:]):
+            return criteria[:i], criteria[i + 1:]
+    if len(positions) == 1:
+        i = positions[0]
+        return criteria[:i], criteria[i + 1:]
+    return None
+
+
+def compare(value, other):
+    """
+    Compares values numerically if both are numbers, otherwise as strings
+    """
+    try:
+        a, b = float(value), float(other)
+    except ValueError:
+        a, b = value, other
+    return (a > b) - (a < b)
+
+
+class MockRETSServer(object):
+    """
+    A local stand-in for a RETS server, for testing and benchmarking
+
+    It implements the Login, Logout, GetMetadata, Search and GetObject
+    transactions with digest authentication and session cookies, over a
+    set of synthetic listings. Searches are capped at max_rows rows per
+    response (with <MAXROWS/> sent when there are more), and GetObject
+    requests for several objects get a multipart/parallel response.
+
+    Faults can be injected to see how a client copes with them:
+
+    * latency: seconds to wait before answering each request
+    * error_rate: the fraction of requests that get an HTTP 500
+    * rate_limit_rate: the fraction of requests that get a RETS
+      "Too many outstanding queries/requests" reply
+    * truncate_rate: the fraction of responses that are cut short, so the
+      client sees an IncompleteRead
+    * busy_rate: the fraction of requests that get an HTTP 503 with a
+      Retry-After of retry_after seconds
+
+    inject() queues up faults for the next requests instead, for tests that
+    need them to happen exactly when expected.
+
+    XML responses are gzip compressed for clients that accept it, unless
+    compression is False ('compressed' counts how many were).
+
+    GetMetadata answers ID=* (every resource/class/lookup at once, or the
+    whole system for METADATA-SYSTEM) unless bulk_metadata is False, in
+    which case it replies "Invalid Identifier" like servers that don't.
+
+    Use it as a context manager (or call start() and stop()):
+
+        with MockRETSServer(listings=5000, max_rows=500) as server:
+            rets = RETSConnection(server.username, server.password,
+                                  server.login_url)
+    """
+    def __init__(self, host='127.0.0.1', port=0, username='joe',
+                 password='joe123', listings=1000, max_rows=500,
+                 photos_per_listing=3, photo_size=20000, latency=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, truncate_rate=0.0,
+                 busy_rate=0.0, retry_after=1, compression=True,
+                 bulk_metadata=True, seed=0):
+        self.username = username
+        self.password = password
+        self.realm = 'rets@mockserver'
+        self.nonce = uuid.uuid4().hex
+        self.max_rows = max_rows
+        self.photos_per_listing = photos_per_listing
+        self.photo_size = photo_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.truncate_rate = truncate_rate
+        self.busy_rate = busy_rate
+        self.retry_after = retry_after
+        self.compression = compression
+        self.compressed = 0
+        self.bulk_metadata = bulk_metadata
+        self.listings = make_listings(listings, seed)
+        self.sessions = set()
+        self.requests = {}
+        self.faults = []
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), MockRETSHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.rets = self
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    @property
+    def login_url(self):
+        return self.base_url + '/rets/Login'
+
+    def start(self):
+        """
+        Starts serving requests on a background thread
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server and closes its socket
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def inject(self, fault, count=1):
+        """
+        Queues a fault for the next requests
+
+        :param fault: 'error', 'rate_limit', 'truncate' or 'busy'
+        :type fault: str
+        :param count: the number of requests that should get the fault
+        :type count: int
+        """
+        with self._lock:
+            self.faults.extend([fault] * count)
+
+    def next_fault(self):
+        """
+        Picks the fault (if any) for a request
+        """
+        with self._lock:
+            if self.faults:
+                return self.faults.pop(0)
+            roll = self._random.random()
+
+        for fault, rate in (('error', self.error_rate),
+                            ('rate_limit', self.rate_limit_rate),
+                            ('truncate', self.truncate_rate),
+                            ('busy', self.busy_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    def count(self, transaction):
+        """
+        Counts a request for a transaction
+        """
+        with self._lock:
+            self.requests[transaction] = self.requests.get(transaction, 0) + 1
+
+    def check_authorization(self, method, header):
+        """
+        Returns True if a digest Authorization header is valid
+        """
+        if not header or not header.startswith('Digest '):
+            return False
+
+        auth = parse_keqv_list(parse_http_list(header[7:]))
+        if auth.get('nonce') != self.nonce:
+            return False
+
+        def md5(text):
+            return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+        ha1 = md5('{0}:{1}:{2}'.format(self.username, self.realm,
+                                       self.password))
+        ha2 = md5('{0}:{1}'.format(method, auth.get('uri')))
+        expected = md5('{0}:{1}:{2}:{3}:{4}:{5}'.format(
+            ha1, self.nonce, auth.get('nc'), auth.get('cnonce'),
+            auth.get('qop'), ha2
+        ))
+        return auth.get('username') == self.username and \
+            auth.get('response') == expected
+
+    def photo(self, listing_id, order_no):
+        """
+        Returns the bytes of a (fake) photo
+        """
+        label = '{0}:{1}'.format(listing_id, order_no).encode('ascii')
+        filler = self.photo_size - len(label) - 4
+        return b'\xff\xd8' + label + b'\x00' * max(filler, 0) + b'\xff\xd9'
+
+
+class MockRETSHandler(BaseHTTPRequestHandler):
+    """
+    Handles requests to a MockRETSServer
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def rets(self):
+        return self.server.rets
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        transaction = url.path.rsplit('/', 1)[-1]
+
+        if self.rets.latency:
+            time.sleep(self.rets.latency)
+
+        if not self.rets.check_authorization('GET', self.headers.get(
+                'Authorization')):
+            challenge = 'Digest realm="{0}", nonce="{1}", qop="auth", ' \
+                        'opaque="{2}"'.format(self.rets.realm,
+                                              self.rets.nonce, 'mock')
+            self.send_body(401, b'', 'text/plain',
+                           {'WWW-Authenticate': challenge})
+            return
+
+        self.rets.count(transaction)
+        fault = self.rets.next_fault()
+        if fault == 'error':
+            self.send_body(500, b'Internal Server Error', 'text/plain')
+            return
+        if fault == 'busy':
+            self.send_body(503, b'Service Unavailable', 'text/plain',
+                           {'Retry-After': str(self.rets.retry_after)})
+            return
+        if fault == 'rate_limit':
+            text = 'Too many outstanding queries' if transaction == 'Search' \
+                else 'Too many outstanding requests'
+            self.send_reply('20502', text)
+            return
+
+        session = self.session()
+        if transaction == 'Login':
+            self.login()
+        elif session not in self.rets.sessions:
+            self.send_reply('20701', 'Not logged in.')
+        elif transaction == 'Logout':
+            self.rets.sessions.discard(session)
+            self.send_reply('0', 'Operation Success.',
+                            '<RETS-RESPONSE>\nSignOffMessage=Goodbye\n'
+                            '</RETS-RESPONSE>')
+        elif transaction == 'GetMetadata':
+            self.get_metadata(params)
+        elif transaction == 'Search':
+            self.search(params, truncate=fault == 'truncate')
+        elif transaction == 'GetObject':
+            self.get_object(params, truncate=fault == 'truncate')
+        else:
+            self.send_body(404, b'Not Found', 'text/plain')
+
+    def session(self):
+        for cookie in self.headers.get_all('Cookie') or []:
+            for part in cookie.split(';'):
+                name, _, value = part.strip().partition('=')
+                if name == 'RETS-Session-ID':
+                    return value
+        return None
+
+    def send_body(self, code, body, content_type, headers=None,
+                  truncate=False):
+        headers = dict(headers or {})
+        accepted = self.headers.get('Accept-Encoding', '')
+        if self.rets.compression and content_type.startswith('text/xml') \
+                and 'gzip' in accepted:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+            with self.rets._lock:
+                self.rets.compressed += 1
+
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, val in headers.items():
+            self.send_header(key, val)
+        if truncate:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+            body = body[:len(body) // 2]
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_reply(self, code, text, content='', headers=None,
+                   truncate=False):
+        body = '<?xml version="1.0"?>\n<RETS ReplyCode="{0}" ' \
+               'ReplyText="{1}">\n{2}</RETS>\n'.format(code, text, content)
+        self.send_body(200, body.encode('utf-8'), 'text/xml;charset=utf-8',
+                       headers, truncate)
+
+    def login(self):
+        session = uuid.uuid4().hex
+        self.rets.sessions.add(session)
+        options = [
+            'MemberName=Mock Member',
+            'MetadataVersion=1.00.00001',
+            'MetadataTimestamp=2019-01-01T00:00:00Z',
+            'MinMetadataTimestamp=2019-01-01T00:00:00Z',
+            'Login=/rets/Login',
+            'Logout=/rets/Logout',
+            'Search=/rets/Search',
+            'GetMetadata=/rets/GetMetadata',
+            'GetObject=/rets/GetObject',
+        ]
+        content = '<RETS-RESPONSE>\n{0}\n</RETS-RESPONSE>\n'.format(
+            '\n'.join(options)
+        )
+        cookie = 'RETS-Session-ID={0}; Path=/'.format(session)
+        self.send_reply('0', 'Operation Success.', content,
+                        {'Set-Cookie': cookie})
+
+    def get_metadata(self, params):
+        metadata_type = params.get('Type')
+        if params.get('ID') == '*' and not self.rets.bulk_metadata:
+            self.send_reply('20502', 'Invalid Identifier.')
+            return
+
+        if metadata_type == 'METADATA-SYSTEM':
+            types = ['METADATA-SYSTEM']
+            if params.get('ID') == '*':
+                types += ['METADATA-RESOURCE', 'METADATA-CLASS',
+                          'METADATA-TABLE', 'METADATA-LOOKUP_TYPE']
+        elif metadata_type in ('METADATA-RESOURCE', 'METADATA-CLASS',
+                               'METADATA-TABLE', 'METADATA-LOOKUP_TYPE'):
+            types = [metadata_type]
+        else:
+            self.send_reply('20501', 'Invalid Type.')
+            return
+
+        content = ''.join(self.metadata_block(t) for t in types)
+        self.send_reply('0', 'Operation Success.', content)
+
+    def metadata_block(self, metadata_type):
+        attributes = ''
+        if metadata_type == 'METADATA-SYSTEM':
+            return '<METADATA-SYSTEM Version="1.00.00001">\n' \
+                   '<SYSTEM SystemID="MOCK" SystemDescription="Mock RETS ' \
+                   'Server"/>\n</METADATA-SYSTEM>\n'
+        elif metadata_type == 'METADATA-RESOURCE':
+            columns = ['ResourceID', 'StandardName', 'KeyField']
+            rows = [['Property', 'Property', 'ListingID']]
+        elif metadata_type == 'METADATA-CLASS':
+            attributes = ' Resource="Property"'
+            columns = ['ClassName', 'StandardName', 'Description']
+            rows = [['Listing', 'ResidentialProperty', 'Listings']]
+        elif metadata_type == 'METADATA-TABLE':
+            attributes = ' Resource="Property" Class="Listing"'
+            columns = ['SystemName', 'StandardName', 'LongName', 'DataType',
+                       'Interpretation', 'LookupName']
+            # LongNames are spaced out (ListPrice is 'List Price')
+            rows = [[name, name, re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', name),
+                     data_type, interpretation or '', lookup or '']
+                    for name, data_type, interpretation, lookup in FIELDS]
+        else:
+            attributes = ' Resource="Property" Lookup="Status"'
+            columns = ['Value', 'ShortValue', 'LongValue']
+            rows = [[value, value, long_value]
+                    for value, long_value in STATUSES]
+
+        return '<{0}{1} Version="1.00.00001">\n{2}</{0}>\n'.format(
+            metadata_type, attributes, self.compact(columns, rows)
+        )
+
+    def search(self, params, truncate=False):
+        query = params.get('Query', '')
+        matching = [l for l in self.rets.listings if matches(l, query)]
+        count = '<COUNT Records="{0}" />\n'.format(len(matching))
+
+        if params.get('Count') == '2':
+            self.send_reply('0', 'Operation Success.', count)
+            return
+        if not matching:
+            self.send_reply('20201', 'No Records Found.')
+            return
+
+        offset = max(int(params.get('Offset', 1)), 1) - 1
+        limit = self.rets.max_rows
+        if params.get('Limit', 'NONE') != 'NONE':
+            limit = min(int(params['Limit']), limit)
+        page = matching[offset:offset + limit]
+
+        fields = [name for name, _, _, _ in FIELDS]
+        if params.get('Select'):
+            fields = params['Select'].split(',')
+
+        rows = [[l.get(f, '') for f in fields] for l in page]
+        if params.get('FORMAT') == 'COMPACT':
+            # Lookup fields are sent as their codes rather than long values
+            codes = {long_value: code for code, long_value in STATUSES}
+            lookups = set(name for name, _, _, lookup in FIELDS if lookup)
+            rows = [[codes.get(value, value) if f in lookups else value
+                     for f, value in zip(fields, row)] for row in rows]
+
+        content = ''
+        if params.get('Count') == '1':
+            content += count
+        content += '<DELIMITER value="09"/>\n'
+        content += self.compact(fields, rows)
+        if offset + limit < len(matching):
+            content += '<MAXROWS/>\n'
+
+        self.send_reply('0', 'Operation Success.', content,
+                        truncate=truncate)
+
+    def get_object(self, params, truncate=False):
+        objects = []
+        known = set(l['ListingID'] for l in self.rets.listings)
+
+        for item in params.get('Id', '').split(','):
+            listing_id, _, order_nos = item.partition(':')
+            if order_nos in ('*', ''):
+                order_nos = range(1, self.rets.photos_per_listing + 1)
+            else:
+                order_nos = [int(n) for n in order_nos.split(':')]
+            for order_no in order_nos:
+                objects.append((listing_id, order_no))
+
+        def exists(listing_id, order_no):
+            return listing_id in known and \
+                1 <= order_no <= self.rets.photos_per_listing
+
+        if len(objects) == 1:
+            listing_id, order_no = objects[0]
+            if not exists(listing_id, order_no):
+                self.send_reply('20403', 'No Object Found.')
+                return
+            etag = '"{0}-{1}"'.format(listing_id, order_no)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_body(304, b'', 'image/jpeg', {'ETag': etag})
+                return
+            headers = {'Content-ID': listing_id, 'Object-ID': str(order_no),
+                       'ETag': etag}
+            self.send_body(200, self.rets.photo(listing_id, order_no),
+                           'image/jpeg', headers, truncate)
+            return
+
+        boundary = uuid.uuid4().hex
+        parts = []
+        for listing_id, order_no in objects:
+            part = '--{0}\r\nContent-ID: {1}\r\nObject-ID: {2}\r\n'.format(
+                boundary, listing_id, order_no
+            ).encode('ascii')
+            if exists(listing_id, order_no):
+                part += b'Content-Type: image/jpeg\r\n\r\n'
+                part += self.rets.photo(listing_id, order_no)
+            else:
+                part += b'Content-Type: text/xml\r\n\r\n'
+                part += b'<RETS ReplyCode="20403" ' \
+                        b'ReplyText="No Object Found."></RETS>'
+            parts.append(part + b'\r\n')
+        body = b''.join(parts) + '--{0}--\r\n'.format(boundary).encode()
+
+        content_type = 'multipart/parallel; boundary="{0}"'.format(boundary)
+        self.send_body(200, body, content_type, truncate=truncate)
+
+    def compact(self, columns, rows):
+        lines = ['<COLUMNS>\t{0}\t</COLUMNS>\n'.format('\t'.join(columns))]
+        for row in rows:
+            lines.append('<DATA>\t{0}\t</DATA>\n'.format('\t'.join(row)))
+        return ''.join(lines)
@@ -0,0 +1,113 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from retsdk.utilities import decode_lines
+
+
+def decode_chunk(columns, texts, delimiter, decoder, row_format):
+    """
+    Decodes a chunk of <DATA> texts (runs in a worker process)
+    """
+    converters = decoder.compile(columns) if decoder else None
+    return decode_lines(columns, texts, delimiter, converters, row_format)
+
+
+class ParallelDecoder(object):
+    """
+    Decodes large Search responses on every core, in worker processes
+
+    Decoding (splitting, mapping and converting values) is pure Python, so
+    it runs on one core however many there are. A ParallelDecoder splits
+    the <DATA> texts of a response into chunks, which are decoded by a
+    pool of max_workers processes (one per core by default) and put back
+    together in order.
+
+    Sending the texts to the workers and the rows back costs time too, so
+    responses with fewer than min_values values (rows x columns) are
+    decoded in-process as usual. Columnar rows are cheaper to send back
+    than row dictionaries.
+
+    The pool is started when it is first needed; call shutdown() (or use
+    the decoder as a context manager) to stop it.
+
+    :param max_workers: the number of worker processes (default: cores)
+    :type max_workers: int
+    :param min_values: the smallest response (rows x columns) to split up
+    :type min_values: int
+    :param chunks_per_worker: how many chunks to give each worker
+    :type chunks_per_worker: int
+    """
+    def __init__(self, max_workers=None, min_values=500000,
+                 chunks_per_worker=2):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_values = min_values
+        self.chunks_per_worker = chunks_per_worker
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def worthwhile(self, rows, columns):
+        """
+        Returns True if a response of this size should be split up
+        """
+        return self.max_workers > 1 and rows > 1 and \
+            rows * columns >= self.min_values
+
+    def decode(self, columns, texts, delimiter, decoder=None,
+               row_format='dict'):
+        """
+        Decodes <DATA> texts in the worker processes
+
+        Takes the same arguments (and gives the same result) as
+        retsdk.utilities.decode_lines, except that a TableDecoder is given
+        instead of its converters.
+
+        :rtype: list or retsdk.results.ColumnarRows
+        """
+        size = -(-len(texts) // (self.max_workers * self.chunks_per_worker))
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+
+        executor = self.executor()
+        futures = [executor.submit(decode_chunk, columns, chunk, delimiter,
+                                   decoder, row_format) for chunk in chunks]
+        results = [future.result() for future in futures]
+
+        if row_format == 'columnar':
+            rows = results[0]
+            for part in results[1:]:
+                for values, more in zip(rows.data, part.data):
+                    values.extend(more)
+                rows.length += part.length
+                rows.mismatched += part.mismatched
+            return rows
+
+        rows = results[0]
+        for part in results[1:]:
+            rows.extend(part)
+        return rows
+
+    def executor(self):
+        """
+        Returns the process pool, starting it if needed
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers
+                )
+            return self._executor
+
+    def shutdown(self):
+        """
+        Stops the worker processes
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,200 @@
+from array import array
+from collections.abc import Mapping
+
+
+class ColumnarRows(object):
+    """
+    Rows of Search data, stored column by column
+
+    A list of row dictionaries repeats every column name in every row. Here
+    the column names are kept once, and the values of each column are kept
+    together in a list (or, after compact(), an array), which takes much
+    less memory for large results.
+
+    Indexing or iterating gives RowView objects, which work like read-only
+    row dictionaries. Rows that couldn't be mapped to the columns are left
+    out, and counted in 'mismatched'.
+    """
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.data = [[] for name in self.columns]
+        self.mismatched = 0
+        self.length = 0
+
+    def append(self, values):
+        """
+        Adds a row of (already decoded) values
+
+        :param values: a value for each column, in column order
+        :type values: list
+        """
+        if len(values) != len(self.columns):
+            self.mismatched += 1
+            return
+
+        for column, value in zip(self.data, values):
+            column.append(value)
+        self.length += 1
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError('row index out of range')
+        return RowView(self, position)
+
+    def __iter__(self):
+        for position in range(self.length):
+            yield RowView(self, position)
+
+    def column(self, name):
+        """
+        Returns all of the values of a column
+
+        :param name: a column name
+        :type name: str
+        :rtype: list or array.array
+        :return: the column's values, in row order
+        """
+        return self.data[self.index[name]]
+
+    def compact(self):
+        """
+        Packs columns of plain integers or floats into arrays
+
+        Columns with any other values (including None) are left as lists.
+        Integers that don't fit in 64 bits are left as lists too.
+        """
+        for i, values in enumerate(self.data):
+            if not values or isinstance(values, array):
+                continue
+            types = set(map(type, values))
+            try:
+                if types == {int}:
+                    self.data[i] = array('q', values)
+                elif types == {float}:
+                    self.data[i] = array('d', values)
+            except OverflowError:
+                pass
+
+    def to_tuples(self):
+        """
+        Returns the rows as a list of tuples (in column order)
+        """
+        return list(zip(*self.data))
+
+    def to_dicts(self):
+        """
+        Returns the rows as a list of dictionaries (like get_data's rows)
+        """
+        return [dict(zip(self.columns, values)) for values in zip(*self.data)]
+
+    def to_pandas(self):
+        """
+        Returns the rows as a pandas DataFrame (requires pandas)
+        """
+        import pandas
+        return pandas.DataFrame(
+            {name: list(values)
+             for name, values in zip(self.columns, self.data)},
+            columns=self.columns
+        )
+
+    def to_arrow(self):
+        """
+        Returns the rows as a pyarrow Table (requires pyarrow)
+        """
+        import pyarrow
+        return pyarrow.table(
+            [pyarrow.array(list(values)) for values in self.data],
+            names=self.columns
+        )
+
+
+class RowView(Mapping):
+    """
+    A read-only, dictionary-like view of one row of a ColumnarRows
+    """
+    __slots__ = ('rows', 'position')
+
+    def __init__(self, rows, position):
+        self.rows = rows
+        self.position = position
+
+    def __getitem__(self, name):
+        return self.rows.data[self.rows.index[name]][self.position]
+
+    def __iter__(self):
+        return iter(self.rows.columns)
+
+    def __len__(self):
+        return len(self.rows.columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class LazyColumns(object):
+    """
+    The column index and converters shared by the LazyRows of a response
+
+    :param columns: the column names
+    :type columns: list
+    :param converters: a converter per column
+    :type converters: list
+    """
+    __slots__ = ('columns', 'index', 'converters')
+
+    def __init__(self, columns, converters):
+        self.columns = list(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.converters = list(converters)
+
+
+class LazyRow(Mapping):
+    """
+    A read-only row dictionary that decodes each value on first access
+
+    The row keeps the raw (split) values, and a value is only converted
+    the first time it's looked up; the result is remembered. Rows with
+    many columns, of which only a few are used, are much cheaper to decode
+    this way. materialize() decodes every value at once.
+    """
+    __slots__ = ('layout', 'values', 'decoded')
+
+    def __init__(self, layout, values):
+        self.layout = layout
+        self.values = values
+        self.decoded = {}
+
+    def __getitem__(self, name):
+        i = self.layout.index[name]
+        try:
+            return self.decoded[i]
+        except KeyError:
+            value = self.decoded[i] = self.layout.converters[i](self.values[i])
+            return value
+
+    def __contains__(self, name):
+        return name in self.layout.index
+
+    def __iter__(self):
+        return iter(self.layout.columns)
+
+    def __len__(self):
+        return len(self.layout.columns)
+
+    def __repr__(self):
+        return repr(self.materialize())
+
+    def materialize(self):
+        """
+        Decodes every value, and returns the row as a dictionary
+
+        :rtype: dict
+        """
+        return {name: self[name] for name in self.layout.columns}
@@ -0,0 +1,224 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+
+def retry_after_seconds(value):
+    """
+    Converts a Retry-After header into a number of seconds
+
+    :param value: a Retry-After header (seconds, or an HTTP date)
+    :type value: str
+    :rtype: float or None
+    :return: the number of seconds to wait, or None if value isn't valid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
+class RequestScheduler(object):
+    """
+    Decides when a connection's transactions may be sent
+
+    Every transaction on a RETSConnection (from any thread) goes through its
+    scheduler, which can hold it back for:
+
+    * max_outstanding: a limit on how many transactions are in flight at
+      once. When the server reports that its rate limit was hit the limit
+      is halved, and it grows back by one after every increase_after
+      transactions that go through without a rate limit reply.
+    * rate: a token bucket that allows rate transactions per second on
+      average, in bursts of up to burst at a time.
+    * budgets: limits on how many transactions of one type (ex. 'Search' or
+      'GetObject') can be in flight at once.
+    * rate limit pauses: when a transaction is rate limited, every
+      transaction waits out a backoff delay, which doubles with every retry
+      (from base_delay up to max_delay, with random jitter so that clients
+      don't all come back at once) or follows the server's Retry-After.
+
+    A streamed response (get_data_iter, get_objects...) holds its place
+    until the caller is done with it. Slots are re-entrant per thread: a
+    transaction sent by a thread that already holds a slot (ex. from inside
+    a get_data_iter loop) isn't held back by max_outstanding or budgets,
+    since it would otherwise wait on its own thread forever. Pauses and the
+    rate still apply.
+
+    max_retries maps transaction types to how many attempts are made before
+    giving up (defaults to 10 for Search and 3 for everything else).
+
+    By default there are no limits, only backoff.
+    """
+    def __init__(self, max_outstanding=None, rate=None, burst=None,
+                 budgets=None, base_delay=1.0, max_delay=60.0,
+                 max_retries=None, increase_after=20):
+        self.max_outstanding = max_outstanding
+        self.limit = max_outstanding
+        self.rate = rate
+        self.burst = burst or max(1, rate or 1)
+        self.budgets = dict(budgets or {})
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retries = {'Search': 10, 'GetObject': 3}
+        self.max_retries.update(max_retries or {})
+        self.increase_after = increase_after
+
+        self.in_flight = 0
+        self.in_flight_by_type = {}
+        self.holders = {}
+        self.resume_at = 0
+
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def retries(self, transaction):
+        """
+        Returns how many attempts to make at a transaction
+
+        :param transaction: a transaction type (ex. 'Search')
+        :type transaction: str
+        :rtype: int
+        """
+        return self.max_retries.get(transaction, 3)
+
+    @contextmanager
+    def slot(self, transaction):
+        """
+        Waits until a transaction may be sent, and holds its place while sent
+
+        :param transaction: a transaction type (ex. 'Search')
+        :type transaction: str
+        """
+        owner = self.acquire(transaction)
+        try:
+            yield
+        finally:
+            # A generator can be resumed (and closed) on another thread
+            self.release(transaction, owner)
+
+    def acquire(self, transaction):
+        """
+        Waits until a transaction may be sent and counts it as in flight
+
+        :param transaction: a transaction type (ex. 'Search')
+        :type transaction: str
+        :rtype: int
+        :return: the thread the slot is held by (to pass to release)
+        """
+        owner = threading.get_ident()
+        with self._condition:
+            nested = self.holders.get(owner, 0) > 0
+            while True:
+                delay = self.__delay(transaction, nested)
+                if delay == 0:
+                    break
+                self._condition.wait(delay)
+
+            if self.rate:
+                self._tokens -= 1
+            self.in_flight += 1
+            self.in_flight_by_type[transaction] = \
+                self.in_flight_by_type.get(transaction, 0) + 1
+            self.holders[owner] = self.holders.get(owner, 0) + 1
+        return owner
+
+    def release(self, transaction, owner=None):
+        """
+        Marks a transaction as no longer in flight
+
+        :param transaction: a transaction type (ex. 'Search')
+        :type transaction: str
+        :param owner: the thread acquire() returned (the current thread by
+                      default)
+        :type owner: int
+        """
+        if owner is None:
+            owner = threading.get_ident()
+        with self._condition:
+            self.in_flight -= 1
+            self.in_flight_by_type[transaction] -= 1
+            if self.holders.get(owner, 0) > 1:
+                self.holders[owner] -= 1
+            else:
+                self.holders.pop(owner, None)
+
+            self._successes += 1
+            if self.limit is not None and self.limit < self.max_outstanding \
+                    and self._successes >= self.increase_after:
+                self.limit += 1
+                self._successes = 0
+
+            self._condition.notify_all()
+
+    def backoff(self, transaction, attempt, retry_after=None):
+        """
+        Pauses every transaction after one was rate limited
+
+        The pause starts now, and is waited out by the next transactions to
+        be sent (including the retry).
+
+        :param transaction: the type of the transaction that was rate limited
+        :type transaction: str
+        :param attempt: how many times the transaction has been tried before
+        :type attempt: int
+        :param retry_after: the delay the server asked for, in seconds
+        :type retry_after: float
+        :rtype: float
+        :return: the length of the pause, in seconds
+        """
+        if retry_after is not None:
+            delay = min(max(retry_after, 0), self.max_delay)
+        else:
+            delay = min(self.base_delay * 2 ** attempt, self.max_delay)
+            delay = random.uniform(delay / 2, delay)
+
+        with self._condition:
+            self.resume_at = max(self.resume_at, time.monotonic() + delay)
+            self._successes = 0
+            if self.limit is not None:
+                self.limit = max(1, self.limit // 2)
+
+        return delay
+
+    def __delay(self, transaction, nested=False):
+        """
+        Returns how long to wait before a transaction may be sent (or 0)
+
+        Must be called with the condition held. None means to wait until
+        another transaction finishes. Nested transactions (from a thread
+        that holds a slot) don't wait for others to finish.
+        """
+        now = time.monotonic()
+        if self.resume_at > now:
+            return self.resume_at - now
+
+        if not nested and self.limit is not None and \
+                self.in_flight >= self.limit:
+            return None
+
+        budget = self.budgets.get(transaction)
+        if not nested and budget is not None and \
+                self.in_flight_by_type.get(transaction, 0) >= budget:
+            return None
+
+        if self.rate:
+            elapsed = now - self._refilled
+            self._tokens = min(self.burst,
+                               self._tokens + elapsed * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+
+        return 0
@@ -0,0 +1,228 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from retsdk.decoders import TableDecoder, lookup_table
+
+
+class Schema(object):
+    """
+    An indexed, in-memory copy of a RETS server's metadata
+
+    Fields can be found by their SystemName, StandardName or LongName, and
+    lookups by their LookupName, each with a single dict lookup. Build one
+    with MetadataLoader (or RETSConnection.get_schema).
+    """
+    def __init__(self):
+        self.system = {}
+        self.resources = {}
+        self.classes = {}
+        self.tables = {}
+        self.lookups = {}
+        self._fields = {}
+
+    def add_resources(self, rows):
+        """
+        Adds rows of METADATA-RESOURCE
+        """
+        for row in rows:
+            if row:
+                self.resources[str(row['ResourceID'])] = row
+
+    def add_classes(self, resource, rows):
+        """
+        Adds the rows of METADATA-CLASS for a resource
+        """
+        classes = self.classes.setdefault(resource, {})
+        for row in rows:
+            if row:
+                classes[str(row['ClassName'])] = row
+
+    def add_table(self, resource, class_name, rows):
+        """
+        Adds the rows of METADATA-TABLE for a class, and indexes its fields
+        """
+        fields = [row for row in rows if row]
+        index = {}
+        # SystemNames are added last, so they win over the other names
+        for key in ('LongName', 'StandardName', 'SystemName'):
+            for field in fields:
+                if field.get(key) is not None:
+                    index[str(field[key])] = field
+
+        self.tables[(resource, class_name)] = fields
+        self._fields[(resource, class_name)] = index
+
+    def add_lookup(self, resource, lookup_name, rows):
+        """
+        Adds the rows of METADATA-LOOKUP_TYPE for a lookup
+        """
+        self.lookups[(resource, lookup_name)] = lookup_table(rows)
+
+    def fields(self, resource, class_name):
+        """
+        Returns the field metadata rows of a class
+
+        :rtype: list
+        """
+        return self.tables[(resource, class_name)]
+
+    def field(self, resource, class_name, name):
+        """
+        Finds a field of a class by its SystemName, StandardName or LongName
+
+        :param resource: the ResourceID of a resource
+        :type resource: str
+        :param class_name: the ClassName of a class within resource
+        :type class_name: str
+        :param name: the field's SystemName, StandardName or LongName
+        :type name: str
+        :rtype: dict
+        :return: the field's metadata row (KeyError if there's no such field)
+        """
+        return self._fields[(resource, class_name)][name]
+
+    def lookup(self, resource, lookup_name):
+        """
+        Returns a lookup as a {code: long value} dict
+
+        :param resource: the ResourceID of a resource
+        :type resource: str
+        :param lookup_name: the LookupName of a lookup in resource
+        :type lookup_name: str
+        :rtype: dict
+        """
+        return self.lookups[(resource, lookup_name)]
+
+    def lookup_names(self):
+        """
+        Returns the (resource, LookupName) of every lookup the fields use
+
+        :rtype: set
+        """
+        names = set()
+        for (resource, class_name), fields in self.tables.items():
+            for field in fields:
+                if field.get('LookupName') and field.get('Interpretation') \
+                        in ('Lookup', 'LookupMulti'):
+                    names.add((resource, str(field['LookupName'])))
+        return names
+
+    def decoder(self, resource, class_name, lookups=False):
+        """
+        Returns a TableDecoder for a class, without any more transactions
+
+        :param lookups: True to expand lookup codes (for COMPACT data)
+        :type lookups: bool
+        :rtype: retsdk.decoders.TableDecoder
+        """
+        def get_lookup(lookup_name):
+            return self.lookup(resource, lookup_name)
+
+        return TableDecoder(self.fields(resource, class_name),
+                            get_lookup if lookups else None)
+
+
+class MetadataLoader(object):
+    """
+    Loads a RETS server's whole metadata into a Schema in few transactions
+
+    The whole system is asked for at once (METADATA-SYSTEM with ID=*). If
+    the server won't send it that way, each type of metadata is asked for
+    with ID=* instead, all at the same time. Whatever is still missing
+    after that (for servers that don't support ID=* at all) is asked for
+    one resource, class or lookup at a time, max_workers at once.
+
+    :param connection: a logged in RETSConnection
+    :type connection: retsdk.client.RETSConnection
+    :param max_workers: the number of metadata transactions to run at once
+    :type max_workers: int
+    """
+    TYPES = ('METADATA-RESOURCE', 'METADATA-CLASS', 'METADATA-TABLE',
+             'METADATA-LOOKUP_TYPE')
+
+    def __init__(self, connection, max_workers=4):
+        self.connection = connection
+        self.max_workers = max_workers
+
+    def fetch(self, metadata_type, metadata_id):
+        """
+        Returns the metadata blocks of one GetMetadata transaction
+
+        :rtype: list
+        :return: the response's blocks (see parse_response), or an empty
+                 list if the server couldn't send them
+        """
+        response = self.connection.get_metadata(metadata_type, metadata_id)
+        if not response['ok']:
+            return []
+        return response.get('metadata', [])
+
+    def load(self):
+        """
+        Loads every resource, class, table and lookup
+
+        :rtype: retsdk.schema.Schema
+        """
+        schema = Schema()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            blocks = self.fetch('METADATA-SYSTEM', '*')
+            if not any(b['type'] == 'METADATA-TABLE' for b in blocks):
+                ids = ['0'] + ['*'] * (len(self.TYPES) - 1)
+                blocks = [block for type_blocks in executor.map(
+                    self.fetch, self.TYPES, ids
+                ) for block in type_blocks]
+            self.add(schema, blocks)
+
+            # What ID=* didn't cover is fetched one item at a time
+            missing = [r for r in schema.resources if r not in schema.classes]
+            self.fetch_each(executor, schema, 'METADATA-CLASS', missing)
+
+            missing = [(r, c) for r in schema.classes for c in
+                       schema.classes[r] if (r, c) not in schema.tables]
+            self.fetch_each(executor, schema, 'METADATA-TABLE', missing)
+
+            missing = [name for name in schema.lookup_names()
+                       if name not in schema.lookups]
+            self.fetch_each(executor, schema, 'METADATA-LOOKUP_TYPE', missing)
+
+        return schema
+
+    def fetch_each(self, executor, schema, metadata_type, keys):
+        """
+        Fetches metadata for each key (a resource, or a (resource, name)
+        pair) concurrently, and adds it to schema
+        """
+        def fetch(key):
+            if isinstance(key, tuple):
+                return self.fetch(metadata_type, ':'.join(key))
+            return self.fetch(metadata_type, key)
+
+        for key, blocks in zip(keys, executor.map(fetch, keys)):
+            if not isinstance(key, tuple):
+                key = (key,)
+            self.add(schema, blocks, *key)
+
+    def add(self, schema, blocks, resource=None, name=None):
+        """
+        Adds metadata blocks to schema
+
+        Blocks are placed by their Resource/Class/Lookup attributes, or by
+        the resource and name they were asked for, if they have none.
+        """
+        for block in blocks:
+            attributes = block['attributes']
+            resource_id = attributes.get('Resource', resource)
+            rows = block['rows']
+
+            if block['type'] == 'METADATA-SYSTEM':
+                schema.system.update(attributes)
+            elif block['type'] == 'METADATA-RESOURCE':
+                schema.add_resources(rows)
+            elif block['type'] == 'METADATA-CLASS':
+                schema.add_classes(resource_id, rows)
+            elif block['type'] == 'METADATA-TABLE':
+                schema.add_table(resource_id,
+                                 attributes.get('Class', name), rows)
+            elif block['type'] == 'METADATA-LOOKUP_TYPE':
+                schema.add_lookup(resource_id,
+                                  attributes.get('Lookup', name), rows)
@@ -0,0 +1,220 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+
+def numbering(low, high):
+    """
+    Maps the values of a shard range onto integers and back
+
+    Ranges can be of integers, of datetimes (numbered by millisecond, the
+    finest resolution RETS timestamps have) or of IDs made of a fixed prefix
+    and a zero-padded number (like 'L0000123').
+
+    :param low: the lowest value in the range
+    :type low: int, datetime or str
+    :param high: the highest value in the range
+    :type high: int, datetime or str
+    :rtype: tuple
+    :return: a (to_number, to_value) pair of functions, where to_value
+             returns the DMQL form of a value
+    """
+    if isinstance(low, datetime):
+        step = timedelta(milliseconds=1)
+
+        def to_number(value):
+            return (value - low) // step
+
+        def to_value(number):
+            return (low + number * step).isoformat(timespec='milliseconds')
+
+        return to_number, to_value
+
+    if isinstance(low, int):
+        return int, str
+
+    match = re.match(r'^(\D*)(\d+)$', str(low))
+    if match is None or not str(high).startswith(match.group(1)):
+        raise ValueError('Cannot split the range {0}-{1}'.format(low, high))
+
+    prefix, width = match.group(1), len(match.group(2))
+
+    def to_number(value):
+        return int(value[len(prefix):])
+
+    def to_value(number):
+        return prefix + str(number).zfill(width)
+
+    return to_number, to_value
+
+
+class ShardedSearch(object):
+    """
+    Splits a large Search into range shards and runs them concurrently
+
+    RETS servers cap the number of rows per Search and serve each one
+    slowly, so one Search over a whole class pages through the results one
+    capped response at a time. A ShardedSearch first counts the rows in
+    the range low-high of shard_field (a key like ListingID or a timestamp
+    like ModificationTimestamp) and keeps halving the range until every
+    shard fits in max_rows. The shards, which don't overlap, are then
+    searched max_outstanding at a time and their rows are merged into one
+    stream, with rows whose key_field was already seen left out (a record
+    can move between timestamp shards if it is modified mid-search).
+
+    Rows come out in the order their shards finish, not in key order.
+
+    :param connection: a logged in RETSConnection
+    :type connection: retsdk.client.RETSConnection
+    :param resource: A Resource on a RETS server
+    :type resource: str
+    :param class_name: A class within resource
+    :type class_name: str
+    :param query: A DMQL query to request rows of data from the class
+    :type query: str
+    :param fields: a list of the fields to be returned for each record
+    :type fields: list
+    :param shard_field: the field to split the search on
+    :type shard_field: str
+    :param low: the lowest value of shard_field to search for
+    :type low: int, datetime or str
+    :param high: the highest value of shard_field to search for
+    :type high: int, datetime or str
+    :param key_field: the field that uniquely identifies a record
+    :type key_field: str
+    :param max_rows: the most rows the server returns for one Search
+    :type max_rows: int
+    :param max_outstanding: the number of Searches to run at once
+    :type max_outstanding: int
+    :param typed: True to decode values using the class's metadata
+    :type typed: bool
+    """
+    def __init__(self, connection, resource, class_name, query, fields,
+                 shard_field, low, high, key_field='ListingID',
+                 max_rows=2500, max_outstanding=4, typed=False):
+        self.connection = connection
+        self.resource = resource
+        self.class_name = class_name
+        self.query = query
+        self.fields = list(fields)
+        self.shard_field = shard_field
+        self.low = low
+        self.high = high
+        self.key_field = key_field
+        self.max_rows = max_rows
+        self.max_outstanding = max_outstanding
+        self.typed = typed
+
+        if key_field not in self.fields:
+            self.fields.append(key_field)
+
+        self.to_number, self.to_value = numbering(low, high)
+
+    def shard_query(self, low, high):
+        """
+        Returns the DMQL query for the shard from low to high (inclusive)
+
+        :param low: the first number in the shard
+        :type low: int
+        :param high: the last number in the shard
+        :type high: int
+        :rtype: str
+        """
+        shard = '({0}={1}-{2})'.format(self.shard_field, self.to_value(low),
+                                       self.to_value(high))
+        if not self.query:
+            return shard
+        return '({0}),{1}'.format(self.query, shard)
+
+    def plan(self, executor=None):
+        """
+        Works out the shards to search
+
+        Each round of splitting counts all of the new shards concurrently.
+        A shard that still holds more than max_rows rows once it can't be
+        split any further is kept anyway (its Search is paged).
+
+        :rtype: list
+        :return: (low, high, count) tuples, with low and high as numbers
+        """
+        def count(shard):
+            low, high = shard
+            return int(self.connection.get_count(
+                self.resource, self.class_name, self.shard_query(low, high)
+            ) or 0)
+
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=self.max_outstanding)
+
+        shards = []
+        pending = [(self.to_number(self.low), self.to_number(self.high))]
+
+        try:
+            while pending:
+                splits = []
+                for (low, high), rows in zip(pending,
+                                             executor.map(count, pending)):
+                    if rows == 0:
+                        continue
+                    if rows <= self.max_rows or low >= high:
+                        shards.append((low, high, rows))
+                        continue
+                    middle = (low + high) // 2
+                    splits.append((low, middle))
+                    splits.append((middle + 1, high))
+                pending = splits
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        return sorted(shards)
+
+    def fetch(self, low, high):
+        """
+        Returns every row of one shard
+        """
+        return list(self.connection.get_all_data(
+            self.resource, self.class_name, self.shard_query(low, high),
+            self.fields, typed=self.typed
+        ))
+
+    def rows(self):
+        """
+        Searches every shard and yields the merged, deduplicated rows
+
+        Rows that couldn't be mapped to the columns are yielded as None, as
+        get_all_data() does; their keys can't be read, so they aren't
+        deduplicated.
+
+        :rtype: generator
+        :return: a generator of row dictionaries
+        """
+        seen = set()
+
+        def merge(futures):
+            for future in futures:
+                for row in future.result():
+                    if row is None:
+                        yield row
+                        continue
+                    key = row[self.key_field]
+                    if key not in seen:
+                        seen.add(key)
+                        yield row
+
+        with ThreadPoolExecutor(max_workers=self.max_outstanding) as executor:
+            pending = set()
+
+            for low, high, count in self.plan(executor):
+                pending.add(executor.submit(self.fetch, low, high))
+                if len(pending) >= self.max_outstanding:
+                    # Only max_outstanding shards are held in memory at once
+                    done, pending = wait(pending,
+                                         return_when=FIRST_COMPLETED)
+                    yield from merge(done)
+
+            yield from merge(wait(pending).done)
+
+    def __iter__(self):
+        return self.rows()
@@ -0,0 +1,314 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+from datetime import date, datetime, time as time_of_day
+
+
+def plain(value):
+    """
+    Converts a decoded value into one that files and databases can hold
+
+    Dates and times become ISO 8601 strings and lists (LookupMulti values)
+    become comma-separated strings; anything else is returned as it is.
+    """
+    if isinstance(value, (datetime, date, time_of_day)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ','.join(str(v) for v in value)
+    return value
+
+
+class Sink(object):
+    """
+    Writes a stream of Search rows somewhere, a batch at a time
+
+    Rows are buffered until batch_size of them have been written, and then
+    handed to write_batch() together, so at most batch_size rows are ever
+    held in memory. The columns come from the response's COLUMNS header
+    (through open()), or from the first row if open() isn't called.
+    Rows that couldn't be mapped to the columns (None) are skipped.
+
+    Subclasses implement start(), write_batch() and finish(). Use a sink as
+    a context manager (or call close()) to flush the last batch.
+
+    :param batch_size: the number of rows written at once
+    :type batch_size: int
+    """
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.columns = None
+        self.rows = 0
+        self.skipped = 0
+        self.batches = 0
+        self.started = None
+        self.closed = False
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self, columns):
+        """
+        Sets the columns and prepares the destination (if not done already)
+
+        :param columns: the column names, as in the COLUMNS header
+        :type columns: list
+        """
+        if self.columns is None:
+            self.columns = list(columns)
+            self.started = time.perf_counter()
+            self.start()
+
+    def write(self, row):
+        """
+        Adds a row dictionary (flushing the buffer when it's full)
+        """
+        if row is None:
+            self.skipped += 1
+            return
+        if self.columns is None:
+            self.open(row)
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, rows):
+        """
+        Writes every row of an iterable (like get_data_iter()'s)
+
+        :rtype: int
+        :return: the number of rows written
+        """
+        before = self.rows
+        for row in rows:
+            self.write(row)
+        self.flush()
+        return self.rows - before
+
+    def flush(self):
+        """
+        Writes out the buffered rows
+        """
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self.write_batch(batch)
+            self.rows += len(batch)
+            self.batches += 1
+
+    def close(self):
+        """
+        Flushes the buffer and finishes writing (once)
+        """
+        if not self.closed:
+            self.flush()
+            if self.columns is not None:
+                self.finish()
+            self.closed = True
+
+    def stats(self):
+        """
+        Returns throughput counters
+
+        :rtype: dict
+        :return: 'rows', 'skipped', 'batches', 'elapsed' (seconds since the
+                 sink was opened) and 'rows_per_second'
+        """
+        elapsed = time.perf_counter() - self.started if self.started else 0
+        return {
+            'rows': self.rows,
+            'skipped': self.skipped,
+            'batches': self.batches,
+            'elapsed': elapsed,
+            'rows_per_second': self.rows / elapsed if elapsed else 0,
+        }
+
+    def start(self):
+        """
+        Prepares the destination once the columns are known
+        """
+        pass
+
+    def write_batch(self, rows):
+        """
+        Writes a batch of row dictionaries
+        """
+        raise NotImplementedError
+
+    def finish(self):
+        """
+        Finishes writing (closes files, commits, ...)
+        """
+        pass
+
+
+class FileSink(Sink):
+    """
+    A Sink that writes to a path, or to a file object it's given
+
+    Files opened from a path are closed by close(); file objects are left
+    open. 'bytes' is added to stats() for files opened from a path.
+    """
+    mode = 'w'
+
+    def __init__(self, path_or_file, batch_size=1000):
+        super().__init__(batch_size)
+        self.path_or_file = path_or_file
+        self.file = None
+        self.owns_file = isinstance(path_or_file, str)
+
+    def start(self):
+        if self.owns_file:
+            self.file = open(self.path_or_file, self.mode, newline='',
+                             encoding='utf-8')
+        else:
+            self.file = self.path_or_file
+
+    def finish(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def stats(self):
+        stats = super().stats()
+        if self.owns_file and self.file is not None:
+            if not self.file.closed:
+                self.file.flush()
+            stats['bytes'] = os.path.getsize(self.path_or_file)
+        return stats
+
+
+class CSVSink(FileSink):
+    """
+    Writes rows to a CSV file, with the columns as its header row
+
+    Empty values (None) are written as empty fields.
+    """
+    def start(self):
+        super().start()
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.columns)
+
+    def write_batch(self, rows):
+        columns = self.columns
+        self.writer.writerows(
+            ['' if value is None else plain(value)
+             for value in map(row.get, columns)]
+            for row in rows
+        )
+
+
+class JSONLinesSink(FileSink):
+    """
+    Writes rows to a JSON Lines file (a JSON object per line)
+    """
+    def write_batch(self, rows):
+        dumps = json.JSONEncoder(ensure_ascii=False, default=plain).encode
+        self.file.write(''.join(dumps(row) + '\n' for row in rows))
+
+
+class SQLiteSink(Sink):
+    """
+    Upserts rows into a SQLite table, keyed on key_field
+
+    The table is created (with a column per field) if it doesn't exist.
+    Each batch is written with a single executemany() and committed, and
+    rows replace any earlier row with the same key_field value.
+
+    :param database: a path, or an open sqlite3 connection
+    :type database: str or sqlite3.Connection
+    :param table: the name of the table
+    :type table: str
+    :param key_field: the field that uniquely identifies a record
+    :type key_field: str
+    """
+    def __init__(self, database, table, key_field='ListingID',
+                 batch_size=1000):
+        super().__init__(batch_size)
+        self.database = database
+        self.table = table
+        self.key_field = key_field
+        self.db = None
+        self.owns_db = isinstance(database, str)
+
+    def start(self):
+        if self.owns_db:
+            self.db = sqlite3.connect(self.database)
+        else:
+            self.db = self.database
+
+        names = ', '.join(quote(column) for column in self.columns)
+        key = ''
+        if self.key_field in self.columns:
+            key = ', PRIMARY KEY ({0})'.format(quote(self.key_field))
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS {0} ({1}{2})'.format(
+                quote(self.table), names, key
+            ))
+
+        self.statement = 'INSERT OR REPLACE INTO {0} ({1}) ' \
+                         'VALUES ({2})'.format(
+                             quote(self.table), names,
+                             ', '.join('?' * len(self.columns)))
+
+    def write_batch(self, rows):
+        columns = self.columns
+        with self.db:
+            self.db.executemany(self.statement, (
+                [plain(value) for value in map(row.get, columns)]
+                for row in rows
+            ))
+
+    def finish(self):
+        if self.owns_db:
+            self.db.close()
+
+
+class ParquetSink(Sink):
+    """
+    Writes rows to a Parquet file, a row group per batch (requires pyarrow)
+
+    The Parquet schema is inferred from the first batch (columns with no
+    values in it are written as strings), so values should have the same
+    type from row to row: search with typed=True.
+
+    :param path: the path of the Parquet file
+    :type path: str
+    """
+    def __init__(self, path, batch_size=10000):
+        super().__init__(batch_size)
+        self.path = path
+        self.writer = None
+
+    def write_batch(self, rows):
+        import pyarrow
+        import pyarrow.parquet
+
+        data = {column: [row.get(column) for row in rows]
+                for column in self.columns}
+        if self.writer is None:
+            table = pyarrow.table(data)
+            schema = pyarrow.schema(
+                pyarrow.field(field.name, pyarrow.string())
+                if pyarrow.types.is_null(field.type) else field
+                for field in table.schema
+            )
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, schema)
+        table = pyarrow.table(data, schema=self.writer.schema)
+        self.writer.write_table(table)
+
+    def finish(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def quote(name):
+    """
+    Quotes a SQLite identifier
+    """
+    return '"{0}"'.format(str(name).replace('"', '""'))
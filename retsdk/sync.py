@@ -0,0 +1,290 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from retsdk.decoders import to_datetime
+from retsdk.utilities import rets_date
+
+
+class SyncState(object):
+    """
+    Remembers how far each (resource, class) has been synced
+
+    For each resource and class, the high-water mark (the latest
+    ModificationTimestamp seen so far) and the keys of every record that has
+    been synced are kept in a SQLite database at path. With the default
+    path of ':memory:' the state only lasts as long as the object does.
+    """
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sync_state ('
+                'resource TEXT, class TEXT, high_water TEXT, '
+                'PRIMARY KEY (resource, class))'
+            )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sync_keys ('
+                'resource TEXT, class TEXT, key TEXT, '
+                'PRIMARY KEY (resource, class, key))'
+            )
+
+    def get_high_water(self, resource, class_name):
+        """
+        Returns the high-water mark for a class, or None if never synced
+
+        :rtype: datetime.datetime or None
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT high_water FROM sync_state WHERE resource=? '
+                'AND class=?', (resource, class_name)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return datetime.fromisoformat(row[0])
+
+    def set_high_water(self, resource, class_name, high_water):
+        """
+        Stores the high-water mark for a class
+
+        :param high_water: the latest modification time that was synced
+        :type high_water: datetime.datetime
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)',
+                (resource, class_name, high_water.isoformat())
+            )
+
+    def get_keys(self, resource, class_name):
+        """
+        Returns the set of keys that have been synced for a class
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT key FROM sync_keys WHERE resource=? AND class=?',
+                (resource, class_name)
+            ).fetchall()
+        return set(row[0] for row in rows)
+
+    def add_keys(self, resource, class_name, keys):
+        """
+        Records keys as synced
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT OR IGNORE INTO sync_keys VALUES (?, ?, ?)',
+                [(resource, class_name, str(key)) for key in keys]
+            )
+
+    def remove_keys(self, resource, class_name, keys):
+        """
+        Forgets keys (of records that were deleted on the server)
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                'DELETE FROM sync_keys WHERE resource=? AND class=? AND key=?',
+                [(resource, class_name, str(key)) for key in keys]
+            )
+
+    def reset(self, resource, class_name):
+        """
+        Forgets everything about a class, so the next sync is a full pull
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'DELETE FROM sync_state WHERE resource=? AND class=?',
+                (resource, class_name)
+            )
+            self._db.execute(
+                'DELETE FROM sync_keys WHERE resource=? AND class=?',
+                (resource, class_name)
+            )
+
+
+class IncrementalSync(object):
+    """
+    Pulls only the records of a class that changed since the last sync
+
+    The first run pulls every record. Each run after that searches for
+    records with a timestamp_field at or after the stored high-water mark,
+    (ModificationTimestamp=<high-water>+), and pages through just those.
+    The high-water mark is only moved forward once every changed record
+    has been handed to upsert, so a failed run is simply repeated. Records
+    modified at exactly the high-water mark are pulled again, so upsert
+    should be idempotent. If any changed row couldn't be mapped to the
+    columns, the mark isn't moved at all, so it is pulled again next time.
+
+    RETS has no way to report deleted records, so deletions are found by
+    pulling just the key field of every record (all_query) and comparing
+    it to the keys that have been synced before.
+
+    :param connection: a logged in RETSConnection
+    :type connection: retsdk.client.RETSConnection
+    :param state: where high-water marks and keys are stored
+    :type state: SyncState
+    :param resource: A Resource on a RETS server
+    :type resource: str
+    :param class_name: A class within resource
+    :type class_name: str
+    :param fields: the fields to sync (key_field and timestamp_field are
+                   always included)
+    :type fields: list
+    :param key_field: the field that uniquely identifies a record
+    :type key_field: str
+    :param timestamp_field: the field holding a record's modification time
+    :type timestamp_field: str
+    :param all_query: a DMQL query that matches every record (used for the
+                      first run and for finding deletions)
+    :type all_query: str
+    :param page_size: the number of records to request per Search
+    :type page_size: int
+    :param typed: True to decode values using the class's metadata
+    :type typed: bool
+    """
+    def __init__(self, connection, state=None, resource='Property',
+                 class_name='Listing', fields=None, key_field='ListingID',
+                 timestamp_field='ModificationTimestamp', all_query=None,
+                 page_size=None, typed=False):
+        self.connection = connection
+        self.state = state or SyncState()
+        self.resource = resource
+        self.class_name = class_name
+        self.key_field = key_field
+        self.timestamp_field = timestamp_field
+        self.all_query = all_query or '({0}=*)'.format(key_field)
+        self.page_size = page_size
+        self.typed = typed
+
+        self.fields = [key_field, timestamp_field]
+        for field in fields or []:
+            if field not in self.fields:
+                self.fields.append(field)
+
+    def query(self):
+        """
+        Returns the DMQL query for the records that changed since last time
+
+        :rtype: str
+        """
+        high_water = self.state.get_high_water(self.resource, self.class_name)
+        if high_water is None:
+            return self.all_query
+        return '({0}={1}+)'.format(self.timestamp_field, rets_date(high_water))
+
+    def changes(self):
+        """
+        Yields every record that changed since the last sync
+
+        This doesn't move the high-water mark; run() does that.
+
+        :rtype: generator
+        :return: a generator of row dictionaries
+        """
+        return self.connection.get_all_data(self.resource, self.class_name,
+                                            self.query(), self.fields,
+                                            page_size=self.page_size,
+                                            typed=self.typed)
+
+    def deleted_keys(self, summary=None):
+        """
+        Returns the keys of synced records that are gone from the server
+
+        Rows that couldn't be mapped to the columns (None) are counted in
+        summary['skipped']. Since their keys can't be read, nothing can be
+        known to be deleted then, and an empty set is returned.
+
+        :param summary: a run() summary to count skipped rows in
+        :type summary: dict
+        :rtype: set
+        """
+        current = set()
+        skipped = 0
+        for row in self.connection.get_all_data(self.resource,
+                                                self.class_name,
+                                                self.all_query,
+                                                [self.key_field],
+                                                page_size=self.page_size):
+            if row is None:
+                skipped += 1
+            else:
+                current.add(str(row[self.key_field]))
+
+        if summary is not None:
+            summary['skipped'] = summary.get('skipped', 0) + skipped
+        if skipped:
+            return set()
+        return self.state.get_keys(self.resource, self.class_name) - current
+
+    def run(self, upsert, delete=None, batch_size=500):
+        """
+        Syncs the changes since the last run
+
+        :param upsert: called with lists of changed row dictionaries (at
+                       most batch_size of them at a time)
+        :type upsert: function
+        :param delete: called with a list of the keys of deleted records (if
+                       None, deletions aren't looked for)
+        :type delete: function
+        :param batch_size: the most rows to hand to upsert at once
+        :type batch_size: int
+        :rtype: dict
+        :return: a summary with the number of rows 'upserted', the number of
+                 keys 'deleted', the number of rows 'skipped' because they
+                 couldn't be mapped to the columns, the new 'high_water'
+                 mark and 'elapsed' time
+        """
+        start = time.time()
+        previous = self.state.get_high_water(self.resource, self.class_name)
+        high_water = previous
+        summary = {'upserted': 0, 'deleted': 0, 'skipped': 0}
+        batch = []
+
+        def flush():
+            upsert(batch)
+            self.state.add_keys(self.resource, self.class_name,
+                                [row[self.key_field] for row in batch])
+            summary['upserted'] += len(batch)
+            del batch[:]
+
+        for row in self.changes():
+            if row is None:
+                summary['skipped'] += 1
+                continue
+            modified = row.get(self.timestamp_field)
+            if isinstance(modified, str):
+                modified = to_datetime(modified)
+            if modified and (high_water is None or modified > high_water):
+                high_water = modified
+
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+
+        if summary['skipped']:
+            # Moving past rows that couldn't be read would lose them for good
+            high_water = previous
+
+        if delete is not None:
+            deleted = list(self.deleted_keys(summary))
+            if deleted:
+                delete(deleted)
+                self.state.remove_keys(self.resource, self.class_name,
+                                       deleted)
+            summary['deleted'] = len(deleted)
+
+        if high_water is not None:
+            self.state.set_high_water(self.resource, self.class_name,
+                                      high_water)
+
+        summary['high_water'] = high_water
+        summary['elapsed'] = time.time() - start
+        return summary
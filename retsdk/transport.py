@@ -0,0 +1,344 @@
+import http.client
+import io
+import socket
+import threading
+import time
+import zlib
+import urllib.request as request
+from collections import deque
+from urllib.error import URLError
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of persistent HTTP connections, kept separately per host
+
+    Connections are checked out for the length of a single request/response
+    and handed back once the response body has been read. At most 'maxsize'
+    idle connections are kept for each host; extras are closed on return.
+    """
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def get(self, http_class, host, **connection_args):
+        """
+        Checks out an idle connection to host, or creates a new one
+
+        :param http_class: http.client.HTTPConnection or HTTPSConnection
+        :type http_class: type
+        :param host: the host (and optional port) to connect to
+        :type host: str
+        :rtype: http.client.HTTPConnection, bool
+        :return: a connection, True if the connection has been used before
+        """
+        with self._lock:
+            idle = self._idle.get((http_class, host))
+            if idle:
+                return idle.pop(), True
+
+        return http_class(host, **connection_args), False
+
+    def put(self, http_class, host, connection):
+        """
+        Returns a connection to the pool (or closes it if the pool is full)
+
+        :param http_class: the class the connection was created with
+        :type http_class: type
+        :param host: the host the connection was made to
+        :type host: str
+        :param connection: a connection with no outstanding response
+        :type connection: http.client.HTTPConnection
+        """
+        with self._lock:
+            idle = self._idle.setdefault((http_class, host), deque())
+            if len(idle) < self.maxsize:
+                idle.append(connection)
+                return
+
+        connection.close()
+
+    def clear(self):
+        """
+        Closes every idle connection in the pool
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+class PooledResponse(http.client.HTTPResponse):
+    """
+    An HTTP response that hands its connection back once it has been read
+
+    If the response is closed before its body has been fully read, the
+    connection is discarded instead, since unread bytes are still waiting on
+    the socket.
+    """
+    release = None
+    discard = False
+
+    def close(self):
+        self.discard = self.fp is not None
+        super().close()
+
+    def _close_conn(self):
+        super()._close_conn()
+        release, self.release = self.release, None
+        if release:
+            release(self.discard or self.will_close)
+
+
+def timed_connection(timings):
+    """
+    Returns a replacement for HTTPConnection._create_connection that times
+    the DNS lookup (in timings['dns_time']) separately from the connection
+    """
+    def create_connection(address, *args, **kwargs):
+        host, port = address
+        start = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        timings['dns_time'] = time.perf_counter() - start
+
+        error = OSError('getaddrinfo returned an empty list')
+        for family, socktype, proto, canonname, sockaddr in addresses:
+            try:
+                return socket.create_connection(sockaddr[:2], *args, **kwargs)
+            except OSError as e:
+                error = e
+        raise error
+
+    return create_connection
+
+
+class KeepAliveMixin(object):
+    """
+    Replaces urllib's one-connection-per-request do_open with a pooled one
+
+    Responses are given a 'timings' dict with the 'ttfb' (seconds from
+    sending the request to having the response headers) and, for new
+    connections, the 'dns_time' and 'connect_time' (including any TLS
+    handshake), and 'reused' says whether the connection was reused.
+    """
+    def do_open(self, http_class, req, **http_conn_args):
+        if req._tunnel_host:
+            # Proxy tunnels are left to urllib's one-shot connections
+            return super().do_open(http_class, req, **http_conn_args)
+
+        host = req.host
+        if not host:
+            raise URLError('no host given')
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items()
+                        if k not in headers})
+        headers['Connection'] = 'keep-alive'
+        headers = {name.title(): val for name, val in headers.items()}
+
+        while True:
+            h, reused = self.pool.get(http_class, host, timeout=req.timeout,
+                                      **http_conn_args)
+            h.set_debuglevel(self._debuglevel)
+            h.response_class = PooledResponse
+            timings = {}
+
+            try:
+                if h.sock is None:
+                    h._create_connection = timed_connection(timings)
+                    start = time.perf_counter()
+                    h.connect()
+                    timings['connect_time'] = time.perf_counter() - start - \
+                        timings.get('dns_time', 0)
+
+                start = time.perf_counter()
+                h.request(req.get_method(), req.selector, req.data, headers,
+                          encode_chunked=req.has_header('Transfer-encoding'))
+                r = h.getresponse()
+                timings['ttfb'] = time.perf_counter() - start
+            except (OSError, http.client.HTTPException) as e:
+                h.close()
+                if reused:
+                    # The server dropped an idle connection; use a new one
+                    continue
+                if isinstance(e, OSError):
+                    raise URLError(e)
+                raise
+            break
+
+        def release(discard):
+            if discard:
+                h.close()
+            else:
+                self.pool.put(http_class, host, h)
+
+        if r.isclosed() or (r.length == 0 and not r.chunked):
+            # Body-less responses are finished as soon as they arrive
+            r.close()
+            release(r.will_close)
+        else:
+            r.release = release
+
+        r.timings = timings
+        r.reused = reused
+        r.url = req.get_full_url()
+        r.msg = r.reason
+        return r
+
+
+class KeepAliveHTTPHandler(KeepAliveMixin, request.HTTPHandler):
+    """
+    An HTTP handler that reuses persistent connections from a pool
+    """
+    def __init__(self, pool, debuglevel=0):
+        request.HTTPHandler.__init__(self, debuglevel=debuglevel)
+        self.pool = pool
+
+
+class KeepAliveHTTPSHandler(KeepAliveMixin, request.HTTPSHandler):
+    """
+    An HTTPS handler that reuses persistent connections from a pool
+    """
+    def __init__(self, pool, debuglevel=0, context=None):
+        request.HTTPSHandler.__init__(self, debuglevel=debuglevel,
+                                      context=context)
+        self.pool = pool
+
+
+class DecompressingStream(io.RawIOBase):
+    """
+    Decompresses a gzip or deflate encoded response body as it is read
+    """
+    def __init__(self, response, encoding, chunk_size=65536):
+        self.response = response
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.decompressor = None
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            data = self.response.read(self.chunk_size)
+            if not data:
+                missing = getattr(self.response, 'length', None)
+                if (isinstance(missing, int) and missing > 0) or \
+                        (self.decompressor and not self.decompressor.eof):
+                    # The compressed body was cut short
+                    raise http.client.IncompleteRead(b'', missing)
+                return 0
+            if self.decompressor is None:
+                self.decompressor = zlib.decompressobj(self.wbits(data))
+            self.pending = self.decompressor.decompress(data)
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def wbits(self, data):
+        """
+        Picks zlib's wbits for the body, from its first bytes
+        """
+        if self.encoding in ('gzip', 'x-gzip'):
+            return 16 + zlib.MAX_WBITS
+        # 'deflate' is meant to be zlib-wrapped, but some servers send it raw
+        if len(data) >= 2 and data[0] & 0x0f == 8 and \
+                (data[0] * 256 + data[1]) % 31 == 0:
+            return zlib.MAX_WBITS
+        return -zlib.MAX_WBITS
+
+    def close(self):
+        self.response.close()
+        super().close()
+
+
+class DecompressedResponse(io.BufferedReader):
+    """
+    A response whose body is decompressed as it is read
+
+    It reads like the response it wraps (read, readline, close), and any
+    other attributes (headers, code, length, ...) are those of the wrapped
+    response, so the remaining 'length' still shows if the (compressed)
+    body was cut short.
+    """
+    def __init__(self, response, encoding):
+        super().__init__(DecompressingStream(response, encoding))
+        self.response = response
+
+    def __getattr__(self, name):
+        response = self.__dict__.get('response')
+        if response is None:
+            raise AttributeError(name)
+        return getattr(response, name)
+
+    def info(self):
+        return self.response.info()
+
+    def geturl(self):
+        return self.response.geturl()
+
+    def getcode(self):
+        return self.response.getcode()
+
+
+class DecompressionHandler(request.BaseHandler):
+    """
+    Asks for gzip/deflate compressed responses and decompresses them
+
+    Bodies are decompressed incrementally as they're read, so streamed
+    responses stay streamed.
+    """
+    accept_encoding = 'gzip, deflate'
+
+    def http_request(self, req):
+        if not req.has_header('Accept-encoding'):
+            req.add_unredirected_header('Accept-Encoding',
+                                        self.accept_encoding)
+        return req
+
+    def http_response(self, req, response):
+        encoding = (response.headers.get('Content-Encoding') or '').lower()
+        if encoding.strip() in ('gzip', 'x-gzip', 'deflate'):
+            return DecompressedResponse(response, encoding.strip())
+        return response
+
+    https_request = http_request
+    https_response = http_response
+
+
+class PreemptiveDigestAuthHandler(request.HTTPDigestAuthHandler):
+    """
+    A digest auth handler that reuses the last challenge it was given
+
+    urllib only answers digest challenges after the server sends a 401, so
+    every request normally costs two round-trips. Once a challenge has been
+    seen, this handler signs later requests up front with the cached nonce
+    (and an incremented nonce count). If the server decides the nonce is
+    stale it sends a new challenge, which is answered and cached as usual.
+    """
+    def __init__(self, passwd=None):
+        super().__init__(passwd)
+        self.challenge = None
+        self._lock = threading.Lock()
+
+    def get_authorization(self, req, chal):
+        # The nonce count is shared state, so signing has to be serialized
+        with self._lock:
+            self.challenge = chal
+            return super().get_authorization(req, chal)
+
+    def http_request(self, req):
+        if self.challenge and not req.has_header(self.auth_header):
+            auth = self.get_authorization(req, self.challenge)
+            if auth:
+                req.add_unredirected_header(self.auth_header,
+                                            'Digest {0}'.format(auth))
+        return req
+
+    https_request = http_request
@@ -1,4 +1,13 @@
+import os
+import re
+import tempfile
+import xml.etree.ElementTree as ET
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
+from http.client import parse_headers, IncompleteRead
+
+from retsdk.results import ColumnarRows, LazyColumns, LazyRow
 
 
 def decode_reply(reply_code):
@@ -18,7 +27,48 @@ def decode_reply(reply_code):
     else:
         return False
 
-def parse_response(xml):
+def is_xml(content_type, payload=b''):
+    """
+    Returns True if a response should be read as RETS XML
+
+    Servers label XML in many ways (text/xml, application/xml, with or
+    without a charset, in any case), and some send it as text/plain or
+    text/html. Those are sniffed: if the payload starts with '<', it's XML.
+
+    :param content_type: the media type (ex. from get_content_type())
+    :type content_type: str
+    :param payload: the start of the response body, for sniffing
+    :type payload: bytes
+    :rtype: bool
+    """
+    content_type = content_type.lower()
+    if content_type in ('text/xml', 'application/xml') or \
+            content_type.endswith('+xml'):
+        return True
+    if content_type in ('text/plain', 'text/html'):
+        return payload.lstrip(b'\xef\xbb\xbf \t\r\n')[:1] == b'<'
+    return False
+
+def parse_xml(payload, charset=None):
+    """
+    Parses an XML payload, using the response's charset if it needs to
+
+    The XML declaration's encoding wins if there is one. Otherwise, the
+    charset from the Content-Type header is used instead of assuming UTF-8.
+
+    :param payload: an XML document
+    :type payload: bytes
+    :param charset: the charset from the Content-Type header
+    :type charset: str
+    :rtype: xml.etree.ElementTree.Element
+    """
+    parser = None
+    if charset and charset.lower() not in ('utf-8', 'utf8') and \
+            b'encoding=' not in payload[:200]:
+        parser = ET.XMLParser(encoding=charset)
+    return ET.fromstring(payload, parser)
+
+def parse_response(xml, decoder=None, row_format='dict', parallel=None):
     """
     Packages RETS server responses in a Python dict
 
@@ -29,6 +79,14 @@ def parse_response(xml):
 
     :param xml: the XML returned by a RETS server as a response
     :type xml: xml.etree.ElementTree.Element
+    :param decoder: decodes values by field (cast() is used by default)
+    :type decoder: retsdk.decoders.TableDecoder
+    :param row_format: 'dict' for a list of row dictionaries, 'lazy' for a
+                       list of retsdk.results.LazyRow (decoded on access),
+                       or 'columnar' for a retsdk.results.ColumnarRows
+    :type row_format: str
+    :param parallel: decodes large Search bodies in worker processes
+    :type parallel: retsdk.parallel.ParallelDecoder
     :rtype: dict
     :return: a response dictionary
     """
@@ -59,41 +117,599 @@ def parse_response(xml):
                 response['more_rows'] = True
 
             if 'METADATA-' in xml[0].tag:
-                # GetMetadata response data is nested
-                response['rows'] = extract_values(xml[0])
+                # GetMetadata response data is nested, in a block per
+                # resource/class/lookup when several are asked for (ID=*)
+                response['metadata'] = [
+                    {'type': block.tag, 'attributes': dict(block.attrib),
+                     'rows': extract_values(block, decoder, row_format)}
+                    for block in xml if 'METADATA-' in block.tag
+                ]
+                response['rows'] = response['metadata'][0]['rows']
             else:
-                response['rows'] = extract_values(xml)
+                response['rows'] = extract_values(xml, decoder, row_format,
+                                                  parallel)
 
     if not response['record_count']:
         response['record_count'] = len(response['rows'])
 
     return response
 
-def extract_values(xml):
+def iter_response(source, response=None, chunk_size=65536, decoder=None):
+    """
+    Yields mapped rows from a RETS response as it is read from source
+
+    Unlike parse_response, the payload is never held in memory all at once.
+    The XML is fed to a pull parser in chunks and each <DATA> element is
+    mapped, yielded, and then discarded, so memory use stays flat no matter
+    how many rows the server sends back.
+
+    If a response dictionary is passed in, it is filled in with the same
+    reply_code, reply_text, ok, record_count and more_rows keys that
+    parse_response returns (plus 'columns'), as soon as the corresponding
+    elements have been read. 'rows' is never populated.
+
+    :param source: a binary file-like object holding a RETS response
+    :type source: io.BufferedIOBase or http.client.HTTPResponse
+    :param response: an optional dict to be filled in with response info
+    :type response: dict
+    :param chunk_size: the number of bytes to read from source at a time
+    :type chunk_size: int
+    :param decoder: decodes values by field (cast() is used by default)
+    :type decoder: retsdk.decoders.TableDecoder
+    :rtype: generator
+    :return: a generator of dictionaries that represent rows of RETS data
+    """
+    if response is None:
+        response = {}
+
+    response['reply_code'] = None
+    response['reply_text'] = None
+    response['ok'] = False
+    response['record_count'] = 0
+    response['more_rows'] = False
+    response['columns'] = []
+
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    delimiter = '\t'
+    converters = None
+    parents = []
+    row_count = 0
+    finished = False
+
+    chunks = read_chunks(source, chunk_size)
+
+    while not finished:
+        chunk = next(chunks, b'')
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+            finished = True
+
+        for event, element in parser.read_events():
+            if event == 'start':
+                if not parents:
+                    # Reply info is available as soon as <RETS> opens
+                    response['reply_code'] = element.attrib['ReplyCode']
+                    response['reply_text'] = element.attrib['ReplyText']
+                    response['ok'] = decode_reply(element.attrib['ReplyCode'])
+                parents.append(element)
+                continue
+
+            parents.pop()
+            if element.tag == 'COUNT':
+                response['record_count'] = element.attrib['Records']
+            elif element.tag == 'MAXROWS':
+                response['more_rows'] = True
+            elif element.tag == 'DELIMITER':
+                delimiter = compact_delimiter(parents[-1])
+            elif element.tag == 'COLUMNS':
+                response['columns'] = split_compact(element.text or '',
+                                                    delimiter)
+                if decoder:
+                    converters = decoder.compile(response['columns'])
+            elif element.tag == 'DATA':
+                line = split_compact(element.text or '', delimiter)
+                if len(line) == len(response['columns']):
+                    mapped_row = map_fields(response['columns'], line,
+                                            converters)
+                else:
+                    # Row can't be mapped (column mismatch)
+                    mapped_row = None
+
+                row_count += 1
+                yield mapped_row
+
+            if parents:
+                # Drop consumed elements so the tree never grows
+                element.clear()
+                parents[-1].remove(element)
+
+    if not response['record_count']:
+        response['record_count'] = row_count
+
+def iter_multipart(source, boundary, chunk_size=65536):
+    """
+    Yields the parts of a multipart response body as they are read
+
+    Each part is yielded as a (headers, chunks) tuple, where chunks is a
+    generator of the part's body bytes. Bodies are read straight off of
+    source in pieces of at most chunk_size bytes, so a part never has to be
+    held in memory. A part's chunks must be used before moving on to the
+    next part (anything left over is skipped).
+
+    :param source: a binary file-like object that supports readline
+    :type source: io.BufferedIOBase or http.client.HTTPResponse
+    :param boundary: the boundary from the multipart Content-Type header
+    :type boundary: str
+    :param chunk_size: the maximum number of bytes to read at a time
+    :type chunk_size: int
+    :rtype: generator
+    :return: a generator of (http.client.HTTPMessage, generator) tuples
+    """
+    delimiter = b'--' + boundary.encode('ascii')
+    closing_delimiter = delimiter + b'--'
+
+    # Boundary lines have to be read whole to be recognized
+    chunk_size = max(chunk_size, len(closing_delimiter) + 2)
+
+    # Skip the preamble
+    while True:
+        line = source.readline(chunk_size)
+        if not line or line.rstrip() == closing_delimiter:
+            return
+        if line.rstrip() == delimiter:
+            break
+
+    state = {'last': False}
+
+    def read_body():
+        line_ending = b''
+        at_line_start = True
+        while True:
+            line = source.readline(chunk_size)
+            if not line:
+                # The body was cut short
+                state['last'] = True
+                return
+            if at_line_start and line.startswith(delimiter):
+                if line.rstrip() in (delimiter, closing_delimiter):
+                    # The line ending before a boundary belongs to it
+                    state['last'] = line.rstrip() == closing_delimiter
+                    return
+
+            if line_ending:
+                yield line_ending
+
+            at_line_start = line.endswith(b'\n')
+            if line.endswith(b'\r\n'):
+                line, line_ending = line[:-2], b'\r\n'
+            elif at_line_start:
+                line, line_ending = line[:-1], b'\n'
+            else:
+                line_ending = b''
+
+            if line:
+                yield line
+
+    while not state['last']:
+        headers = parse_headers(source)
+        chunks = read_body()
+        yield headers, chunks
+
+        # Skip whatever the caller didn't read
+        for chunk in chunks:
+            pass
+
+def read_chunks(source, chunk_size=65536):
+    """
+    Yields the body of a response in chunks of at most chunk_size bytes
+
+    HTTPResponse.read(amt) quietly returns what it got when the connection
+    closes early, so the body's remaining length is checked once the reads
+    run dry and an IncompleteRead is raised if anything is missing.
+
+    :param source: a binary file-like object holding a response body
+    :type source: io.BufferedIOBase or http.client.HTTPResponse
+    :param chunk_size: the maximum number of bytes to read at a time
+    :type chunk_size: int
+    :rtype: generator
+    :return: a generator of byte strings
+    """
+    for chunk in iter(lambda: source.read(chunk_size), b''):
+        yield chunk
+
+    missing = getattr(source, 'length', None)
+    if isinstance(missing, int) and missing > 0:
+        raise IncompleteRead(b'', missing)
+
+def write_atomic(chunks, path):
+    """
+    Writes chunks of bytes to a file without ever exposing a partial file
+
+    The chunks are written to a temporary file in the same directory as
+    path, which is renamed to path only once everything has been written.
+    If anything goes wrong along the way, the temporary file is removed and
+    any existing file at path is left as it was.
+
+    :param chunks: the data to be written, in pieces
+    :type chunks: iterable
+    :param path: the destination file path
+    :type path: str
+    :rtype: int
+    :return: the number of bytes written
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    size = 0
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return size
+
+def extract_values(xml, decoder=None, row_format='dict', parallel=None):
     """
     Processes the delimited rows of data returned by a RETS server
 
+    COMPACT bodies are decoded in bulk: the delimiter (from <DELIMITER>,
+    tab by default) and the column header are read once, then every <DATA>
+    row is split with that delimiter and mapped to the columns in a single
+    pass. Without a decoder, values are cast() through a CastMemo, so
+    values that repeat (statuses, cities, flags...) are only cast once.
+
     :param xml: the XML returned by a RETS server as a response
     :type xml: xml.etree.ElementTree.Element
-    :rtype: list
+    :param decoder: decodes values by field (cast() is used by default)
+    :type decoder: retsdk.decoders.TableDecoder
+    :param row_format: 'dict' for a list of row dictionaries, 'lazy' for a
+                       list of retsdk.results.LazyRow (decoded on access),
+                       or 'columnar' for a retsdk.results.ColumnarRows
+    :type row_format: str
+    :param parallel: decodes large bodies in worker processes
+    :type parallel: retsdk.parallel.ParallelDecoder
+    :rtype: list or retsdk.results.ColumnarRows
     :return: a list of dictionaries that represent rows of mapped RETS data 
     """
-    rows = []
-    columns = []
-    for child in xml:
-        if child.tag == 'COLUMNS':
-            columns = split_line(child.text)
-        if child.tag == 'DATA':
-            line = split_line(child.text)
-            if len(line) == len(columns):
-                mapped_row = map_fields(columns, line)
-            else:
-                # Row can't be mapped (column mismatch)
-                mapped_row = None
+    if row_format not in ('dict', 'lazy', 'columnar'):
+        raise ValueError("row_format must be 'dict', 'lazy' or 'columnar'")
+
+    d = compact_delimiter(xml)
+    header = xml.find('COLUMNS')
+    columns = split_compact(header.text or '', d) if header is not None \
+        else []
+    converters = decoder.compile(columns) if decoder else None
+    texts = [element.text or '' for element in xml.iterfind('DATA')]
+
+    # Lazy rows defer decoding, so there's nothing to hand to the workers
+    if parallel and row_format != 'lazy' and \
+            parallel.worthwhile(len(texts), len(columns)):
+        return parallel.decode(columns, texts, d, decoder, row_format)
+
+    return decode_lines(columns, texts, d, converters, row_format)
+
+def decode_lines(columns, texts, delimiter='\t', converters=None,
+                 row_format='dict'):
+    """
+    Decodes the text of COMPACT <DATA> elements into rows
+
+    :param columns: the column names (from <COLUMNS>)
+    :type columns: list
+    :param texts: the text of each <DATA> element
+    :type texts: list
+    :param delimiter: the delimiter (see compact_delimiter)
+    :type delimiter: str
+    :param converters: a converter per column (cast() is used by default)
+    :type converters: list
+    :param row_format: 'dict', 'lazy' or 'columnar'
+    :type row_format: str
+    :rtype: list or retsdk.results.ColumnarRows
+    """
+    width = len(columns)
+
+    if row_format == 'lazy':
+        lines = [split_compact(text, delimiter) for text in texts]
+        if converters is None:
+            converters = [CastMemo().__getitem__ for column in columns]
+        layout = LazyColumns(columns, converters)
+        return [LazyRow(layout, line) if len(line) == width else None
+                for line in lines]
+
+    # Values are decoded a column at a time (then zipped into rows)
+    values = split_columns(texts, width, delimiter)
+    if values is not None:
+        decoded = ColumnarRows(columns)
+        decoded.data = decode_columns(values, converters)
+        decoded.length = len(texts)
+    else:
+        # Some rows don't line up with the columns, so each is split alone
+        lines = [split_compact(text, delimiter) for text in texts]
+        decoded = compact_columns(columns, lines, converters)
+
+    if row_format == 'columnar':
+        return decoded
 
-            rows.append(mapped_row)
+    if decoded.data:
+        rows = [dict(zip(columns, values)) for values in zip(*decoded.data)]
+    else:
+        rows = [{} for i in range(decoded.length)]
+
+    if decoded.mismatched:
+        # Rows that can't be mapped (column mismatch) are left as None
+        rows = iter(rows)
+        rows = [next(rows) if len(line) == width else None for line in lines]
+    return rows
+
+def extract_columns(xml, decoder=None):
+    """
+    Processes the delimited rows of data into a ColumnarRows
+
+    :param xml: the XML returned by a RETS server as a response
+    :type xml: xml.etree.ElementTree.Element
+    :param decoder: decodes values by field (cast() is used by default)
+    :type decoder: retsdk.decoders.TableDecoder
+    :rtype: retsdk.results.ColumnarRows
+    :return: the rows of RETS data, stored by column
+    """
+    return extract_values(xml, decoder, row_format='columnar')
+
+def compact_columns(columns, lines, converters=None):
+    """
+    Builds a ColumnarRows from split COMPACT lines, a column at a time
+
+    :param columns: the column names
+    :type columns: list
+    :param lines: the split DATA lines
+    :type lines: list
+    :param converters: a converter per column (cast() is used by default)
+    :type converters: list
+    :rtype: retsdk.results.ColumnarRows
+    """
+    rows = ColumnarRows(columns)
+    valid = [line for line in lines if len(line) == len(columns)]
+
+    if valid:
+        rows.data = decode_columns(zip(*valid), converters)
+
+    rows.length = len(valid)
+    rows.mismatched = len(lines) - len(valid)
     return rows
 
+def split_columns(texts, width, delimiter='\t'):
+    """
+    Splits fully delimited COMPACT lines straight into columns
+
+    Every line is split with a single str.split(), and each column is a
+    slice of the result, so no list is made per line. Lines are joined with
+    NUL characters (which XML can't contain) to check that each of them has
+    exactly width values.
+
+    :param texts: the text of each <DATA> element
+    :type texts: list
+    :param width: the number of columns
+    :type width: int
+    :param delimiter: the delimiter (see compact_delimiter)
+    :type delimiter: str
+    :rtype: list
+    :return: the values of each column, or None if any line doesn't have
+             a leading and trailing delimiter and width values
+    """
+    if not texts or not width:
+        return None
+
+    joined = '\0'.join(texts)
+    if joined.count('\0') != len(texts) - 1:
+        return None
+
+    step = width + 1
+    values = joined.split(delimiter)
+    # Between each line's values there should be exactly one '\0' value
+    if len(values) != len(texts) * step + 1 or values[0] != '' or \
+            values[-1] != '' or \
+            values[step:-1:step].count('\0') != len(texts) - 1:
+        return None
+
+    return [values[i:-1:step] for i in range(1, step)]
+
+def decode_columns(values, converters=None):
+    """
+    Decodes the values of each column with its converter
+
+    :param values: the values of each column
+    :type values: iterable
+    :param converters: a converter per column (cast_column() is used by
+                       default)
+    :type converters: list
+    :rtype: list
+    """
+    if converters is None:
+        return [cast_column(column) for column in values]
+    return [list(map(convert, column))
+            for convert, column in zip(converters, values)]
+
+# The shape cast() decodes as a datetime, one value (or none) per line
+DATETIME_LINES = re.compile(r'(?:(?:.{4}-.{2}-.{2}T.{2}:.{5,})?\n)*')
+
+def cast_column(values):
+    """
+    cast()s a column of values at once, with the same results
+
+    Columns of integers, decimals or datetimes, and columns that cast()
+    leaves as strings (text, numbers with leading zeros, plain dates), are
+    recognized with a few checks over the whole column (empty values are
+    allowed). They are then converted with int(), float() or
+    fromisoformat() directly, or kept as they are, which is several times
+    faster than cast()ing each value. Any other column (or one with a
+    value that doesn't fit) goes through a CastMemo, so values that repeat
+    are only cast once.
+
+    :param values: the values of a column
+    :type values: sequence
+    :rtype: list
+    """
+    filled = list(filter(None, values))
+    if not filled:
+        return [None] * len(values)
+
+    text = ''.join(filled)
+    firsts = ''.join(map(itemgetter(0), filled))
+    try:
+        if text.isdecimal():
+            if '0' not in firsts:
+                return fill_column(values, filled, int)
+            elif firsts.count('0') == len(firsts) and \
+                    min(map(len, filled)) > 1:
+                # Numbers with leading zeros (like zip codes) stay strings
+                return keep_column(values, filled)
+        elif firsts.isalpha():
+            # Text (which can't be a number or a datetime)
+            return keep_column(values, filled)
+        elif is_decimal_column(filled, text):
+            floats = fill_column(values, filled, float)
+            if '0' in firsts and any(number is not None and
+                                     number.is_integer()
+                                     for number in floats):
+                # Whole numbers with leading zeros are left as strings
+                floats = [cast(value) if value[:1] == '0' and
+                          number.is_integer() else number
+                          for value, number in zip(values, floats)]
+            return floats
+        elif firsts.isdecimal():
+            size = len(filled[0])
+            if len(text) == size * len(filled) and \
+                    max(map(len, filled)) == size and 4 < size < 19 and \
+                    text[4::size].count('-') == len(filled):
+                # Plain dates (YYYY-MM-DD) stay strings
+                return keep_column(values, filled)
+            elif is_datetime_column(values, filled, text):
+                if 'Z' not in text and 'z' not in text:
+                    try:
+                        return fill_column(values, filled,
+                                           datetime.fromisoformat)
+                    except ValueError:
+                        pass
+                return fill_column(values, filled, unrets_date)
+    except ValueError:
+        pass
+
+    return list(map(CastMemo().__getitem__, values))
+
+def is_decimal_column(filled, text):
+    """
+    Returns True if every (non-empty) value is digits with one '.'
+
+    :param filled: the non-empty values of a column
+    :type filled: list
+    :param text: the values, joined
+    :type text: str
+    :rtype: bool
+    """
+    digits = text.replace('.', '')
+    # float() raises for a value with more than one '.'
+    return len(text) - len(digits) == len(filled) and digits.isdecimal()
+
+def is_datetime_column(values, filled, text):
+    """
+    Returns True if every (non-empty) value has the shape of a datetime
+
+    That is, the shape cast() decodes as a datetime: at least 19
+    characters, with '-' at the 5th and 8th, 'T' at the 11th and ':' at the
+    14th. Values of one length are checked with a slice per position.
+
+    :param values: the values of a column
+    :type values: sequence
+    :param filled: the non-empty values
+    :type filled: list
+    :param text: the non-empty values, joined
+    :type text: str
+    :rtype: bool
+    """
+    size = len(filled[0])
+    count = len(filled)
+    if size < 19:
+        return False
+    if len(text) == size * count and max(map(len, filled)) == size:
+        return text[4::size].count('-') == count and \
+            text[7::size].count('-') == count and \
+            text[10::size].count('T') == count and \
+            text[13::size].count(':') == count
+    return DATETIME_LINES.fullmatch('\n'.join(values) + '\n') is not None
+
+def fill_column(values, filled, convert):
+    """
+    Converts the non-empty values of a column (empty values become None)
+    """
+    if len(filled) == len(values):
+        return list(map(convert, values))
+    return [convert(value) if value else None for value in values]
+
+def keep_column(values, filled):
+    """
+    Returns the values of a column as they are (empty values become None)
+    """
+    if len(filled) == len(values):
+        return list(values)
+    return [value or None for value in values]
+
+class CastMemo(dict):
+    """
+    Remembers what cast() made of each value it was given
+
+    cast() only depends on the value (and returns immutable values), so
+    its results can be shared. At most maxsize values are remembered, so
+    columns of unique values (like IDs) can't make it grow without bound.
+    """
+    def __init__(self, maxsize=16384):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __missing__(self, value):
+        result = cast(value)
+        if len(self) < self.maxsize:
+            self[value] = result
+        return result
+
+def compact_delimiter(xml):
+    """
+    Returns the delimiter of a COMPACT body
+
+    :param xml: the element holding the COLUMNS and DATA elements
+    :type xml: xml.etree.ElementTree.Element
+    :rtype: str
+    :return: the character given by <DELIMITER value="hh"/> (a hex ASCII
+             code), or a tab if there is no (valid) DELIMITER element
+    """
+    element = xml.find('DELIMITER')
+    if element is not None:
+        try:
+            return chr(int(element.get('value', ''), 16))
+        except ValueError:
+            pass
+    return '\t'
+
+def split_compact(text, delimiter='\t'):
+    """
+    Splits one COMPACT COLUMNS or DATA line on its delimiter
+
+    :param text: a line of delimited RETS data
+    :type text: str
+    :param delimiter: the delimiter (see compact_delimiter)
+    :type delimiter: str
+    :rtype: list
+    """
+    if text[:1] == delimiter and text[-1:] == delimiter:
+        # Fully delimited values
+        return text.split(delimiter)[1:-1]
+    # No leading/trailing delimiter
+    return text.strip().split(delimiter)
+
 def split_line(xml_line_text):
     """
     Returns a list of values, given a row of delimited RETS response data
@@ -111,28 +727,34 @@ def split_line(xml_line_text):
             # No leading/trailing delimiter
             return text.strip().split(delimiter)
 
-    if '\x09' in xml_line_text:
-        # Search Transactions
-        return handle_delimiter(xml_line_text, '\x09')
-    elif '\t' in xml_line_text:
-        # Metadata Transactions
+    if '\t' in xml_line_text:
+        # Search and Metadata Transactions
         return handle_delimiter(xml_line_text, '\t')
     elif '\n' in xml_line_text.strip():
         # Login/Logout Transactions
         return handle_delimiter(xml_line_text, '\n')
     return  [xml_line_text.strip()]
 
-def map_fields(columns, line):
+def map_fields(columns, line, converters=None):
     """
     Returns a dictionary with fields matched to column names
 
+    Values are cast() unless a list of converters (one per column, as made
+    by TableDecoder.compile) is given.
+
     :param columns: a list of column header/name values
     :type columns: list
     :param line: a row of data values matching columns
     :type line: list
+    :param converters: functions that decode the values of each column
+    :type converters: list
     :rtype: dict
     :return: a dictionary mapping columns to line values
     """
+    if converters is not None:
+        return {name: convert(value) for name, convert, value
+                in zip(columns, converters, line)}
+
     row = {}
     for i, field_value in enumerate(line):
         name = columns[i]
@@ -210,64 +832,113 @@ def cast(value):
 
     Integers with leading zeroes are also returned as strings.
 
+    ISO 8601 datetimes (with or without fractional seconds) are returned as
+    datetimes, while plain dates (YYYY-MM-DD) are left as strings.
+
     :param value: a value returned by a RETS server
     :type value: str
-    :rtype: int, float, str, or none
+    :rtype: int, float, str, datetime or none
     :return: the original value as a native Python type
     """
-    if is_numeric(value):
-        if value.lstrip('-').replace('.', '', 1).isdigit():
-            # Cases where value is numeric without special characters
-            if value == '0':
-                # Actual Integer zero
-                return int(value)
-            elif value == '0.0' or value == '0.00':
-                # Actual Decimal zero
-                return float(value)
-            if value[0] == '0':
-                if not float(value).is_integer():
-                    # Decimals with a leading zero (<1)
-                    return float(value)
-                else:
-                    # Numeric strings with leading zeros (like zip code)
-                    return str(value)
-            elif '.' in value:
-                # Decimals
+    # The cheap digit check goes first: is_numeric() raises and catches a
+    # ValueError for every non-numeric value, which is slow
+    if value.lstrip('-').replace('.', '', 1).isdigit() and is_numeric(value):
+        # Cases where value is numeric without special characters
+        if value == '0':
+            # Actual Integer zero
+            return int(value)
+        elif value == '0.0' or value == '0.00':
+            # Actual Decimal zero
+            return float(value)
+        if value[0] == '0':
+            if not float(value).is_integer():
+                # Decimals with a leading zero (<1)
                 return float(value)
             else:
-                # Integers
-                return int(value)
+                # Numeric strings with leading zeros (like zip code)
+                return str(value)
+        elif '.' in value:
+            # Decimals
+            return float(value)
         else:
-            # value is numeric WITH special chars (like '2e100')
+            # Integers
+            return int(value)
+    elif len(value) >= 19 and value[4] == '-' and \
+        value[7] == '-' and value[10] == 'T' and value[13] == ':':
+        # Datetimes in ISO 8601 format (with or without fractional seconds)
+        try:
+            return unrets_date(value)
+        except ValueError:
             return str(value)
-    elif len(value) == 23 and value[4] == '-' and \
-        value[7] == '-' and value[10] == 'T':
-        # Dates in ISO 8601 format
-        return unrets_date(value)
     elif value == '':
         return None
     else:
+        # Includes values that are numeric WITH special chars (like '2e100')
         return str(value)
 
+@lru_cache(maxsize=16384)
 def unrets_date(rets_date):
     """
     Converts a RETS date (ISO 8601 format) into a Python datetime
 
+    Accepts every shape RETS servers send: plain dates (YYYY-MM-DD), and
+    datetimes with a 'T' or a space before the time, with any number of
+    fractional digits (or none) and an optional 'Z'. datetime.fromisoformat()
+    does the parsing (it is far faster than strptime), and the results for
+    the latest few thousand distinct values are cached, since timestamps
+    often repeat within a response.
+
     :param rets_date: a RETS/ISO 8601 date
     :type rets_date: str
     :rtype: datetime.datetime
     :return: rets_date as a Python datetime
     """
-    # For datetimes with microseconds
-    return datetime.strptime(rets_date, '%Y-%m-%dT%H:%M:%S.%f')
+    value = rets_date.strip()
+    if value.endswith(('Z', 'z')):
+        # UTC designator (RETS datetimes are read as naive)
+        value = value[:-1]
+
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+
+    if len(value) > 19 and value[19] == '.':
+        # fromisoformat() (before Python 3.11) wants 3 or 6 fraction digits
+        rest = value[20:].lstrip('0123456789')
+        fraction = value[20:len(value) - len(rest)]
+        value = value[:20] + fraction[:6].ljust(6, '0') + rest
+    return datetime.fromisoformat(value)
+
+def unrets_dates(rets_dates):
+    """
+    Converts a batch of RETS dates into Python datetimes
+
+    :param rets_dates: RETS/ISO 8601 dates (empty values become None)
+    :type rets_dates: iterable
+    :rtype: list
+    """
+    return [unrets_date(value) if value else None for value in rets_dates]
 
 def rets_date(py_date):
     """
     Converts a Python datetime into a RETS (ISO 8601 format) date
 
-    :param py_date: a Python datetime
+    :param py_date: a Python datetime (or date)
     :type pydate: date
     :rtype: str
     :return: py_date as a string in ISO 8601 format (no microseconds)
     """
-    return py_date.replace(microsecond=0).isoformat()
+    if not isinstance(py_date, datetime):
+        return py_date.isoformat()
+    return py_date.isoformat(timespec='seconds')
+
+def rets_dates(py_dates):
+    """
+    Converts a batch of Python datetimes (or dates) into RETS dates
+
+    :param py_dates: Python datetimes (None values become '')
+    :type py_dates: iterable
+    :rtype: list
+    """
+    return ['' if value is None else rets_date(value) for value in py_dates]
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+from retsdk.async_client import AsyncRETSConnection
+from retsdk.client import RETSConnection
+from tests.utils import LOGIN_URL, LOGIN_ROWS, search_page
+
+
+class TestAsyncRETSConnection(unittest.TestCase):
+    """
+    Tests the asyncio client wrapper
+    """
+    def setUp(self):
+        login_response = {'ok': True, 'rows': LOGIN_ROWS}
+        patcher = mock.patch.object(RETSConnection, '_RETSConnection__login',
+                                    return_value=login_response)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def slow_get_data(self, *args, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return search_page([{'sysid': 1}])
+
+    async def run_searches(self, max_outstanding):
+        rets = AsyncRETSConnection(username='joe', password='joe123',
+                                   login_url=LOGIN_URL,
+                                   max_outstanding=max_outstanding)
+        await rets.login()
+        rets.connection.get_data = self.slow_get_data
+        searches = [
+            rets.get_data('Property', 'Listing', '(sysid=0+)', ['sysid'])
+            for i in range(6)
+        ]
+        return rets, await asyncio.gather(*searches)
+
+    def test_login_loads_account_info(self):
+        rets, responses = asyncio.run(self.run_searches(1))
+        self.assertEqual(rets.search_url,
+                         'https://rets.somemls.com/rets/Search.ashx')
+
+    def test_responses_match_sync_client(self):
+        rets, responses = asyncio.run(self.run_searches(2))
+        self.assertEqual(responses, [search_page([{'sysid': 1}])] * 6)
+
+    def test_outstanding_limit(self):
+        asyncio.run(self.run_searches(2))
+        self.assertEqual(self.peak, 2)
+
+    def test_methods_are_not_forwarded(self):
+        rets, responses = asyncio.run(self.run_searches(1))
+        self.assertEqual(rets.metadata_version, '1.00.00001')
+        rets.connection.refresh = lambda: None
+        with self.assertRaises(AttributeError):
+            rets.refresh
+
+    def test_scheduler_limit(self):
+        rets, responses = asyncio.run(self.run_searches(3))
+        self.assertEqual(rets.connection.scheduler.max_outstanding, 3)
+
+    def test_async_iteration(self):
+        async def collect():
+            rets = AsyncRETSConnection(username='joe', password='joe123',
+                                       login_url=LOGIN_URL)
+            await rets.login()
+            rets.connection.get_all_data = lambda *args, **kwargs: (
+                {'sysid': i} for i in range(250)
+            )
+            return [row async for row in rets.get_all_data(
+                'Property', 'Listing', '(sysid=0+)', ['sysid']
+            )]
+
+        rows = asyncio.run(collect())
+        self.assertEqual(rows, [{'sysid': i} for i in range(250)])
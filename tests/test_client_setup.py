@@ -1,6 +1,8 @@
 import unittest
+import urllib.request as request
 from retsdk.client import RETSConnection
 from retsdk.exceptions import AuthenticationError
+from tests.utils import offline_connection
 
 
 class TestRETSConnection(unittest.TestCase):
@@ -38,3 +40,21 @@ class TestRETSConnection(unittest.TestCase):
                 login_url=self.url,
                 auth_type='oauth'
             )
+
+
+class TestIndependentConnections(unittest.TestCase):
+    """
+    Tests that each RETSConnection keeps its own session state
+    """
+    def setUp(self):
+        self.global_opener = request._opener
+        self.first = offline_connection()
+        self.second = offline_connection(auth_type='basic')
+
+    def test_global_opener_untouched(self):
+        self.assertIs(request._opener, self.global_opener)
+
+    def test_separate_sessions(self):
+        self.assertIsNot(self.first.opener, self.second.opener)
+        self.assertIsNot(self.first.cookiejar, self.second.cookiejar)
+        self.assertIsNot(self.first.pool, self.second.pool)
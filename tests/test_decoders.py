@@ -0,0 +1,114 @@
+import unittest
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from retsdk.decoders import MetadataDecoder, TableDecoder, field_converter, \
+    lookup_table
+from retsdk.utilities import parse_response
+
+
+TABLE_ROWS = [
+    {'SystemName': 'MLSNumber', 'DataType': 'Character',
+     'Interpretation': None},
+    {'SystemName': 'Zip', 'DataType': 'Character', 'Interpretation': None},
+    {'SystemName': 'Price', 'DataType': 'Int', 'Interpretation': 'Number'},
+    {'SystemName': 'Acres', 'DataType': 'Decimal',
+     'Interpretation': 'Number', 'Precision': 2},
+    {'SystemName': 'ListDate', 'DataType': 'Date', 'Interpretation': None},
+    {'SystemName': 'Modified', 'DataType': 'DateTime',
+     'Interpretation': None},
+    {'SystemName': 'Waterfront', 'DataType': 'Boolean',
+     'Interpretation': None},
+    {'SystemName': 'Features', 'DataType': 'Character',
+     'Interpretation': 'LookupMulti'},
+]
+
+SEARCH_RESPONSE = (
+    '<RETS ReplyCode="0" ReplyText="Operation Success.">'
+    '<DELIMITER value="09"/>'
+    '<COLUMNS>\tMLSNumber\tZip\tPrice\tAcres\tListDate\tModified'
+    '\tWaterfront\tFeatures\tUnknown\t</COLUMNS>'
+    '<DATA>\t00123\t02882\t250000\t1\t2019-03-01\t2019-03-02T10:11:12'
+    '\t1\tPool,Deck\t7\t</DATA>'
+    '<DATA>\tMLS9\t\t\t0.50000001\t\t2019-03-02T10:11:12.5\t0\t\t\t</DATA>'
+    '</RETS>'
+)
+
+
+class TestTableDecoder(unittest.TestCase):
+    """
+    Tests metadata-driven decoding of Search values
+    """
+    def setUp(self):
+        xml = ET.fromstring(SEARCH_RESPONSE)
+        self.rows = parse_response(xml, TableDecoder(TABLE_ROWS))['rows']
+
+    def test_types_follow_metadata(self):
+        row = self.rows[0]
+        self.assertEqual(row['MLSNumber'], '00123')
+        self.assertEqual(row['Zip'], '02882')
+        self.assertEqual(row['Price'], 250000)
+        self.assertIs(type(row['Acres']), float)
+        self.assertEqual(row['ListDate'], date(2019, 3, 1))
+        self.assertEqual(row['Modified'], datetime(2019, 3, 2, 10, 11, 12))
+        self.assertIs(row['Waterfront'], True)
+        self.assertEqual(row['Features'], ['Pool', 'Deck'])
+
+    def test_empty_values(self):
+        row = self.rows[1]
+        for name in ('Zip', 'Price', 'ListDate', 'Features'):
+            self.assertIsNone(row[name])
+        self.assertIs(row['Waterfront'], False)
+
+    def test_decimal_precision(self):
+        self.assertEqual(self.rows[1]['Acres'], 0.5)
+        convert = field_converter({'DataType': 'Decimal', 'Precision': '3'})
+        self.assertEqual(convert('1.23456'), 1.235)
+        convert = field_converter({'DataType': 'Decimal', 'Precision': None})
+        self.assertEqual(convert('1.23456'), 1.23456)
+
+    def test_unknown_fields_are_cast(self):
+        self.assertEqual(self.rows[0]['Unknown'], 7)
+        self.assertIsNone(self.rows[1]['Unknown'])
+
+    def test_mismatched_values_are_cast(self):
+        decoder = TableDecoder(TABLE_ROWS)
+        price = decoder.compile(['Price'])[0]
+        self.assertEqual(price('2.5'), 2.5)
+
+    def test_lookup_codes_are_kept_as_sent(self):
+        xml = ET.fromstring(
+            '<RETS ReplyCode="0" ReplyText="Operation Success.">'
+            '<METADATA-LOOKUP_TYPE Resource="Property" Lookup="Baths">'
+            '<COLUMNS>\tMetadataEntryID\tValue\tLongValue\t</COLUMNS>'
+            '<DATA>\t1\t0.50\tHalf\t</DATA>'
+            '<DATA>\t2\t007\t\t</DATA>'
+            '</METADATA-LOOKUP_TYPE></RETS>'
+        )
+        rows = parse_response(xml, MetadataDecoder())['rows']
+        self.assertEqual(rows[0]['MetadataEntryID'], 1)
+        lookup = lookup_table(rows)
+        self.assertEqual(lookup, {'0.50': 'Half', '007': '007'})
+
+        field = {'SystemName': 'Baths', 'DataType': 'Character',
+                 'Interpretation': 'Lookup', 'LookupName': 'Baths'}
+        self.assertEqual(field_converter(field, lookup)('0.50'), 'Half')
+
+    def test_lookup_codes_are_expanded(self):
+        lookup = {'PL': 'Pool', 'DK': 'Deck'}
+        features = field_converter(TABLE_ROWS[-1], lookup)
+        self.assertEqual(features('PL,DK,XX'), ['Pool', 'Deck', 'XX'])
+        self.assertIsNone(features(''))
+
+        fields = [{'SystemName': 'Features', 'DataType': 'Character',
+                   'Interpretation': 'LookupMulti', 'LookupName': 'Feat'}]
+        asked = []
+
+        def lookups(name):
+            asked.append(name)
+            return lookup
+
+        decoder = TableDecoder(fields, lookups)
+        self.assertEqual(asked, [])
+        decoder.compile(['Features'])
+        decoder.compile(['Features'])
+        self.assertEqual(asked, ['Feat'])
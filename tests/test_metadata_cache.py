@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from retsdk.cache import MetadataCache
+from tests.utils import offline_connection, search_page
+
+
+SERVER = 'joe@https://rets.somemls.com'
+
+
+class TestMetadataCache(unittest.TestCase):
+    """
+    Tests storage and invalidation of cached metadata responses
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'metadata.db')
+        self.response = search_page([{'SystemName': 'ListPrice'}])
+
+    def test_round_trip(self):
+        cache = MetadataCache(self.path)
+        cache.set(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.0',
+                  self.response)
+        self.assertEqual(
+            cache.get(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.0'),
+            self.response
+        )
+
+    def test_copies_are_returned(self):
+        cache = MetadataCache()
+        cache.set(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.0',
+                  self.response)
+        self.response['rows'].append({'SystemName': 'Status'})
+        cached = cache.get(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.0')
+        cached['rows'][0]['SystemName'] = 'Changed'
+
+        cached = cache.get(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.0')
+        self.assertEqual(cached['rows'], [{'SystemName': 'ListPrice'}])
+
+    def test_persistence(self):
+        MetadataCache(self.path).set(SERVER, 'METADATA-TABLE',
+                                     'Property:Listing', '1.0', self.response)
+        cache = MetadataCache(self.path)
+        self.assertEqual(
+            cache.get(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.0'),
+            self.response
+        )
+
+    def test_version_change(self):
+        cache = MetadataCache(self.path)
+        cache.set(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.0',
+                  self.response)
+        self.assertIsNone(
+            cache.get(SERVER, 'METADATA-TABLE', 'Property:Listing', '1.1')
+        )
+
+        cache.invalidate(SERVER, '1.1')
+        self.assertIsNone(
+            MetadataCache(self.path).get(SERVER, 'METADATA-TABLE',
+                                         'Property:Listing', '1.0')
+        )
+
+    def test_memory_only(self):
+        cache = MetadataCache(maxsize=2)
+        for class_name in ('A', 'B', 'C'):
+            cache.set(SERVER, 'METADATA-TABLE', class_name, '1.0',
+                      self.response)
+        self.assertIsNone(cache.get(SERVER, 'METADATA-TABLE', 'A', '1.0'))
+        self.assertIsNotNone(cache.get(SERVER, 'METADATA-TABLE', 'C', '1.0'))
+
+
+class TestCachedMetadataRequests(unittest.TestCase):
+    """
+    Tests that RETSConnection serves repeated metadata requests from cache
+    """
+    def test_table_metadata_is_cached(self):
+        rets = offline_connection(metadata_cache=MetadataCache())
+        response = search_page([{'SystemName': 'ListPrice'}])
+
+        with mock.patch.object(rets, '_RETSConnection__make_request',
+                               return_value=(True, response)) as request:
+            for i in range(3):
+                rets.get_table_metadata('Property', 'Listing')
+            rets.get_table_metadata('Property', 'Rental')
+
+        self.assertEqual(request.call_count, 2)
+
+    def test_metadata_version_is_not_a_url(self):
+        rets = offline_connection()
+        self.assertEqual(rets.metadata_version, '1.00.00001')
@@ -0,0 +1,89 @@
+import socket
+import unittest
+from retsdk.client import RETSConnection
+from retsdk.metrics import MetricsCollector, StatsDExporter
+from retsdk.mockserver import MockRETSServer
+
+
+class TestMetricsCollector(unittest.TestCase):
+    """
+    Tests the in-memory aggregation of MetricsCollector
+    """
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        for value in range(1, 101):
+            self.metrics.observe('Search', 'ttfb', value)
+        self.metrics.increment('Search', 'retries', 2)
+
+    def test_percentiles(self):
+        self.assertEqual(self.metrics.percentile('Search', 'ttfb', 50), 51)
+        self.assertEqual(self.metrics.percentile('Search', 'ttfb', 99), 99)
+        self.assertIsNone(self.metrics.percentile('Search', 'bytes', 50))
+
+    def test_summary(self):
+        summary = self.metrics.summary()['Search']
+        self.assertEqual(summary['retries'], 2)
+        self.assertEqual(summary['ttfb']['count'], 100)
+        self.assertEqual(summary['ttfb']['mean'], 50.5)
+        self.assertEqual(summary['ttfb']['max'], 100)
+
+    def test_prometheus(self):
+        text = self.metrics.to_prometheus()
+        self.assertIn('retsdk_retries_total{transaction="Search"} 2', text)
+        self.assertIn('retsdk_ttfb{transaction="Search",quantile="0.5"} 51',
+                      text)
+        self.assertIn('retsdk_ttfb_count{transaction="Search"} 100', text)
+
+    def test_statsd(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(2)
+        exporter = StatsDExporter(port=receiver.getsockname()[1])
+
+        MetricsCollector([exporter]).observe('Search', 'parse_time', 0.25)
+        self.assertEqual(receiver.recv(1024),
+                         b'retsdk.Search.parse_time:250|ms')
+        receiver.close()
+
+
+class TestConnectionMetrics(unittest.TestCase):
+    """
+    Tests the measurements RETSConnection records against a MockRETSServer
+    """
+    def setUp(self):
+        self.server = MockRETSServer(listings=30)
+        self.server.start()
+        self.metrics = MetricsCollector()
+        self.rets = RETSConnection(self.server.username,
+                                   self.server.password,
+                                   self.server.login_url,
+                                   metrics=self.metrics)
+
+    def tearDown(self):
+        self.rets.logout()
+        self.server.stop()
+
+    def test_search(self):
+        self.rets.get_data('Property', 'Listing', '(ListingID=*)',
+                           ['ListingID'])
+        search = self.metrics.summary()['Search']
+        self.assertEqual(search['requests'], 1)
+        self.assertEqual(search['rows']['sum'], 30)
+        for name in ('ttfb', 'download_time', 'bytes', 'parse_time',
+                     'decode_time', 'queue_time'):
+            self.assertIn(name, search)
+
+    def test_new_connection_timings(self):
+        self.rets.pool.clear()
+        self.rets.get_count('Property', 'Listing', '(ListingID=*)')
+        search = self.metrics.summary()['Search']
+        self.assertEqual(search['dns_time']['count'], 1)
+        self.assertEqual(search['connect_time']['count'], 1)
+
+    def test_retries(self):
+        self.server.inject('truncate')
+        self.rets.get_data('Property', 'Listing', '(ListingID=*)',
+                           ['ListingID'])
+        self.assertEqual(self.metrics.count('Search', 'retries'), 1)
+        self.assertEqual(self.metrics.count('Search', 'errors'), 1)
+        self.assertEqual(self.metrics.count('Search', 'requests'), 1)
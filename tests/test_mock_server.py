@@ -0,0 +1,201 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from retsdk.async_client import AsyncRETSConnection
+from retsdk.client import RETSConnection
+from retsdk.exceptions import RequestError
+from retsdk.mockserver import MockRETSServer, matches
+from retsdk.scheduler import RequestScheduler
+
+
+class TestMockServer(unittest.TestCase):
+    """
+    Runs RETSConnection end to end against a MockRETSServer
+    """
+    def setUp(self):
+        self.server = MockRETSServer(listings=250, max_rows=100,
+                                     photos_per_listing=2, photo_size=500)
+        self.server.start()
+        self.rets = RETSConnection(self.server.username,
+                                   self.server.password,
+                                   self.server.login_url)
+
+    def tearDown(self):
+        self.rets.logout()
+        self.server.stop()
+
+    def test_login(self):
+        self.assertEqual(self.rets.metadata_version, '1.00.00001')
+        self.assertEqual(self.rets.search_url,
+                         self.server.base_url + '/rets/Search')
+
+    def test_bad_password(self):
+        with self.assertRaises(RequestError):
+            RETSConnection(self.server.username, 'wrong',
+                           self.server.login_url)
+
+    def test_typed_search(self):
+        response = self.rets.get_data('Property', 'Listing',
+                                      '(ListingID=L0000001)',
+                                      ['ListingID', 'ListPrice'],
+                                      typed=True)
+        self.assertTrue(response['ok'])
+        self.assertEqual(response['record_count'], '1')
+        self.assertIsInstance(response['rows'][0]['ListPrice'], int)
+
+    def test_compact_lookups(self):
+        query = '(ListingID=L0000001-L0000020)'
+        decoded = self.rets.get_data('Property', 'Listing', query,
+                                     ['ListingID', 'Status'])
+        codes = self.rets.get_data('Property', 'Listing', query,
+                                   ['ListingID', 'Status'],
+                                   data_format='COMPACT')
+        expanded = self.rets.get_data('Property', 'Listing', query,
+                                      ['ListingID', 'Status'],
+                                      data_format='COMPACT', typed=True)
+        self.assertTrue(set(r['Status'] for r in codes['rows']) <= {'A', 'P',
+                                                                    'S'})
+        self.assertEqual(expanded['rows'], decoded['rows'])
+        # The lookup is downloaded once and reused
+        self.rets.get_data('Property', 'Listing', query, ['Status'],
+                           data_format='COMPACT', typed=True)
+        self.assertEqual(self.server.requests['GetMetadata'], 2)
+
+    def test_streamed_lookups_one_at_a_time(self):
+        # Lookups must be fetched before the Search takes the only slot
+        rets = RETSConnection(self.server.username, self.server.password,
+                              self.server.login_url,
+                              scheduler=RequestScheduler(max_outstanding=1))
+        rows = []
+        thread = threading.Thread(target=lambda: rows.extend(
+            rets.get_data_iter('Property', 'Listing',
+                               '(ListingID=L0000001-L0000020)',
+                               ['ListingID', 'Status'],
+                               data_format='COMPACT', typed=True)
+        ), daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(rows), 20)
+        self.assertTrue(set(r['Status'] for r in rows) <= {'Active',
+                                                           'Pending', 'Sold'})
+        rets.logout()
+
+    def test_nested_transaction_while_streaming(self):
+        # The thread streaming the Search holds the only slot
+        rets = RETSConnection(self.server.username, self.server.password,
+                              self.server.login_url,
+                              scheduler=RequestScheduler(max_outstanding=1))
+        counts = []
+
+        def sync():
+            for row in rets.get_data_iter('Property', 'Listing',
+                                          '(ListingID=L0000001-L0000003)',
+                                          ['ListingID']):
+                counts.append(rets.get_count(
+                    'Property', 'Listing',
+                    '(ListingID=%s)' % row['ListingID']))
+
+        thread = threading.Thread(target=sync, daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(counts, ['1', '1', '1'])
+        rets.logout()
+
+    def test_async_nested_transaction_while_streaming(self):
+        async def sync():
+            rets = AsyncRETSConnection(username=self.server.username,
+                                       password=self.server.password,
+                                       login_url=self.server.login_url)
+            await rets.login()
+            counts = []
+            async for row in rets.get_data_iter(
+                    'Property', 'Listing', '(ListingID=L0000001-L0000003)',
+                    ['ListingID']):
+                counts.append(await rets.get_count(
+                    'Property', 'Listing',
+                    '(ListingID=%s)' % row['ListingID']))
+            await rets.logout()
+            return counts
+
+        counts = asyncio.run(asyncio.wait_for(sync(), 10))
+        self.assertEqual(counts, ['1', '1', '1'])
+
+    def test_paging(self):
+        rows = list(self.rets.get_all_data('Property', 'Listing',
+                                           '(ListingID=*)', ['ListingID']))
+        self.assertEqual(len(rows), 250)
+        self.assertEqual(self.server.requests['Search'], 3)
+
+    def test_count(self):
+        count = self.rets.get_count('Property', 'Listing',
+                                    '(ListingID=L0000001-L0000010)')
+        self.assertEqual(count, '10')
+
+    def test_truncated_response_is_retried(self):
+        self.server.inject('truncate')
+        response = self.rets.get_data('Property', 'Listing', '(ListingID=*)',
+                                      ['ListingID'], limit=50)
+        self.assertEqual(len(response['rows']), 50)
+        self.assertEqual(self.server.requests['Search'], 2)
+
+    def test_truncated_stream(self):
+        # Uncompressed, so that rows are handed out before the cut
+        self.server.compression = False
+        self.server.inject('truncate')
+        with self.assertRaises(RequestError):
+            list(self.rets.get_data_iter('Property', 'Listing',
+                                         '(ListingID=*)', ['ListingID']))
+
+    def test_compressed_responses(self):
+        rows = list(self.rets.get_data_iter('Property', 'Listing',
+                                            '(ListingID=*)', ['ListingID'],
+                                            limit=100))
+        self.assertEqual(len(rows), 100)
+        self.assertGreater(self.server.compressed, 0)
+
+    def test_server_error(self):
+        self.server.inject('error')
+        with self.assertRaises(RequestError):
+            self.rets.get_count('Property', 'Listing', '(ListingID=*)')
+
+    def test_objects(self):
+        objects = list(self.rets.get_objects('Property', 'Photo',
+                                             ['L0000001', 'L0000002']))
+        self.assertEqual(len(objects), 4)
+        self.assertEqual(objects[0]['content_id'], 'L0000001')
+        self.assertEqual(len(objects[0]['object_data']), 500)
+
+    def test_object_etag(self):
+        path = os.path.join(tempfile.mkdtemp(), 'photo.jpg')
+        first = self.rets.get_object('Property', 'Photo', 'L0000001', 1,
+                                     path=path, write=True)
+        again = self.rets.get_object('Property', 'Photo', 'L0000001', 1,
+                                     path=path, write=True,
+                                     etag=first['etag'])
+        self.assertEqual(first['size'], 500)
+        self.assertTrue(again['not_modified'])
+
+
+class TestQueryMatching(unittest.TestCase):
+    """
+    Tests the mock server's DMQL subset
+    """
+    listing = {'ListingID': 'L0000005', 'ListPrice': '250000',
+               'ModificationTimestamp': '2019-03-01T12:00:00.000'}
+
+    def test_ranges(self):
+        self.assertTrue(matches(self.listing, '(ListPrice=200000+)'))
+        self.assertFalse(matches(self.listing, '(ListPrice=100000-)'))
+        self.assertTrue(matches(
+            self.listing,
+            '(ModificationTimestamp=2019-03-01T00:00:00.000-'
+            '2019-03-02T00:00:00.000)'
+        ))
+
+    def test_and(self):
+        self.assertFalse(matches(self.listing,
+                                 '(ListingID=*),(ListPrice=1000|2000)'))
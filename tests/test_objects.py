@@ -0,0 +1,198 @@
+import os
+import tempfile
+import unittest
+from http.client import IncompleteRead
+from unittest import mock
+from tests.utils import offline_connection, FakeResponse, multipart_body
+
+
+PHOTO_ONE = b'\xff\xd8first photo\r\n--not-a-boundary\r\n\xff\xd9'
+PHOTO_TWO = b'\xff\xd8second photo\xff\xd9'
+NOT_FOUND = (b'<RETS ReplyCode="20403" '
+             b'ReplyText="No Object Found"></RETS>')
+
+
+class TestBatchGetObject(unittest.TestCase):
+    """
+    Tests multipart getObject handling with RETSConnection.get_objects
+    """
+    def setUp(self):
+        self.rets = offline_connection()
+        body = multipart_body([
+            ({'Content-Type': 'image/jpeg', 'Content-ID': '123',
+              'Object-ID': '1'}, PHOTO_ONE),
+            ({'Content-Type': 'image/jpeg', 'Content-ID': '123',
+              'Object-ID': '2'}, PHOTO_TWO),
+            ({'Content-Type': 'text/xml', 'Content-ID': '456',
+              'Object-ID': '1'}, NOT_FOUND),
+        ])
+        self.response = FakeResponse(body, {
+            'Content-Type': 'multipart/parallel; boundary="simple-boundary"'
+        })
+
+    def get_objects(self, obj_ids, **kwargs):
+        with mock.patch.object(self.rets, '_RETSConnection__open',
+                               return_value=self.response) as rets_open:
+            objects = list(self.rets.get_objects('Property', 'Photo',
+                                                 obj_ids, **kwargs))
+        return objects, rets_open.call_args[0][0]
+
+    def test_ids_are_batched(self):
+        objects, rets_request = self.get_objects({'123': [], '456': [1, 2]})
+        self.assertIn('Id=123%3A%2A%2C456%3A1%3A2', rets_request.full_url)
+
+    def test_parts(self):
+        objects, rets_request = self.get_objects(['123', '456'])
+        self.assertEqual(len(objects), 3)
+        self.assertEqual(objects[0]['object_data'], PHOTO_ONE)
+        self.assertEqual(objects[1]['object_data'], PHOTO_TWO)
+        self.assertEqual(objects[1]['object_id'], '2')
+        self.assertFalse(objects[2]['ok'])
+        self.assertEqual(objects[2]['content_id'], '456')
+
+    def test_write_to_directory(self):
+        with tempfile.TemporaryDirectory() as path:
+            objects, rets_request = self.get_objects(['123'], path=path,
+                                                     chunk_size=8)
+            self.assertNotIn('object_data', objects[0])
+            self.assertEqual(objects[0]['path'],
+                             os.path.join(path, '123-1.jpg'))
+            with open(objects[0]['path'], 'rb') as f:
+                self.assertEqual(f.read(), PHOTO_ONE)
+
+
+class TruncatedResponse(FakeResponse):
+    def read(self, size=-1):
+        data = super().read(size)
+        if not data:
+            raise IncompleteRead(b'')
+        return data
+
+
+class TestStreamingGetObject(unittest.TestCase):
+    """
+    Tests writing getObject responses straight to disk
+    """
+    def setUp(self):
+        self.rets = offline_connection()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'photo.jpg')
+
+    def get_object(self, *responses):
+        with mock.patch.object(self.rets, '_RETSConnection__open',
+                               side_effect=responses):
+            return self.rets.get_object('Property', 'Photo', '123',
+                                        order_no=1, path=self.path,
+                                        write=True)
+
+    def test_object_is_written(self):
+        response = self.get_object(
+            FakeResponse(PHOTO_ONE, {'Content-Type': 'image/jpeg'})
+        )
+        self.assertNotIn('object_data', response)
+        self.assertEqual(response['size'], len(PHOTO_ONE))
+        self.assertEqual(response['content_type'], 'image/jpeg')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), PHOTO_ONE)
+
+    def test_interrupted_download_leaves_no_file(self):
+        response = self.get_object(
+            TruncatedResponse(PHOTO_ONE, {'Content-Type': 'image/jpeg'}),
+            FakeResponse(PHOTO_TWO, {'Content-Type': 'image/jpeg'}),
+        )
+        self.assertEqual(os.listdir(self.directory.name), ['photo.jpg'])
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), PHOTO_TWO)
+
+
+class TestBulkDownload(unittest.TestCase):
+    """
+    Tests the threaded bulk object downloader
+    """
+    def setUp(self):
+        self.rets = offline_connection()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def fake_open(self, rets_request):
+        if 'If-none-match' in rets_request.headers:
+            return FakeResponse(b'', {}, code=304)
+        if '999' in rets_request.full_url:
+            return FakeResponse(NOT_FOUND, {'Content-Type': 'text/xml'})
+        return FakeResponse(PHOTO_ONE, {'Content-Type': 'image/jpeg',
+                                        'ETag': '"v1"'})
+
+    def download(self, jobs, **kwargs):
+        with mock.patch.object(self.rets, '_RETSConnection__open',
+                               side_effect=self.fake_open):
+            return self.rets.download_objects(jobs, **kwargs)
+
+    def test_summary(self):
+        with open(self.path('existing.jpg'), 'wb') as f:
+            f.write(PHOTO_TWO)
+        with open(self.path('etag.jpg'), 'wb') as f:
+            f.write(PHOTO_TWO)
+
+        jobs = [('Property', 'Photo', str(i), 1, self.path(str(i)))
+                for i in range(10)]
+        jobs.append(('Property', 'Photo', '999', 1, self.path('missing')))
+        jobs.append(('Property', 'Photo', '1', 1, self.path('existing.jpg')))
+        jobs.append(('Property', 'Photo', '1', 1, self.path('etag.jpg'),
+                     '"v1"'))
+
+        summary = self.download(iter(jobs), max_workers=3)
+        self.assertEqual(summary['succeeded'], 10)
+        self.assertEqual(summary['skipped'], 2)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(summary['bytes'], 10 * len(PHOTO_ONE))
+        self.assertEqual(summary['etags'][self.path('0')], '"v1"')
+        self.assertEqual(summary['sizes'][self.path('0')], len(PHOTO_ONE))
+        # Unchanged objects keep their ETag
+        self.assertEqual(summary['etags'][self.path('etag.jpg')], '"v1"')
+        self.assertEqual(summary['sizes'][self.path('etag.jpg')],
+                         len(PHOTO_TWO))
+        self.assertNotIn(self.path('existing.jpg'), summary['etags'])
+
+    def test_wrong_size_is_downloaded_again(self):
+        for name in ('partial.jpg', 'partial_etag.jpg', 'whole.jpg'):
+            with open(self.path(name), 'wb') as f:
+                f.write(PHOTO_ONE[:len(PHOTO_ONE) // 2])
+        size = len(PHOTO_ONE) // 2
+        jobs = [('Property', 'Photo', '1', 1, self.path('partial.jpg'),
+                 None, len(PHOTO_ONE)),
+                ('Property', 'Photo', '1', 1, self.path('partial_etag.jpg'),
+                 '"v1"', len(PHOTO_ONE)),
+                ('Property', 'Photo', '1', 1, self.path('whole.jpg'),
+                 None, size)]
+
+        summary = self.download(jobs)
+        self.assertEqual(summary['succeeded'], 2)
+        self.assertEqual(summary['skipped'], 1)
+        for name in ('partial.jpg', 'partial_etag.jpg'):
+            with open(self.path(name), 'rb') as f:
+                self.assertEqual(f.read(), PHOTO_ONE)
+
+    def test_overwrite_existing(self):
+        with open(self.path('existing.jpg'), 'wb') as f:
+            f.write(PHOTO_TWO)
+        jobs = [('Property', 'Photo', '1', 1, self.path('existing.jpg'))]
+
+        summary = self.download(jobs, skip_existing=False)
+        self.assertEqual(summary['succeeded'], 1)
+        with open(self.path('existing.jpg'), 'rb') as f:
+            self.assertEqual(f.read(), PHOTO_ONE)
+
+    def test_bad_path_is_counted(self):
+        jobs = [('Property', 'Photo', '1', 1, self.path('good.jpg')),
+                ('Property', 'Photo', '2', 1, self.path('nowhere/bad.jpg')),
+                ('Property', 'Photo', '999', 1, self.path('missing'))]
+
+        summary = self.download(jobs)
+        self.assertEqual(summary['succeeded'], 1)
+        self.assertEqual(summary['failed'], 2)
+        self.assertEqual(sorted(job[2] for job, message
+                                in summary['errors']), ['2', '999'])
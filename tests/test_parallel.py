@@ -0,0 +1,68 @@
+import unittest
+import xml.etree.ElementTree as ET
+from retsdk.decoders import TableDecoder
+from retsdk.parallel import ParallelDecoder
+from retsdk.utilities import parse_response
+
+
+TABLE_ROWS = [
+    {'SystemName': 'ListingID', 'DataType': 'Character',
+     'Interpretation': None},
+    {'SystemName': 'Status', 'DataType': 'Character',
+     'Interpretation': 'Lookup', 'LookupName': 'Status'},
+    {'SystemName': 'Price', 'DataType': 'Int', 'Interpretation': None},
+]
+
+
+def search_response(rows):
+    data = ''.join(
+        '<DATA>\tL{0}\t{1}\t{2}\t</DATA>'.format(i, 'AP'[i % 2], i * 1000)
+        if i % 97 else '<DATA>\tL{0}\tbad\t</DATA>'.format(i)
+        for i in range(rows)
+    )
+    return ET.fromstring(
+        '<RETS ReplyCode="0" ReplyText="Operation Success.">'
+        '<DELIMITER value="09"/>'
+        '<COLUMNS>\tListingID\tStatus\tPrice\t</COLUMNS>{0}'
+        '</RETS>'.format(data)
+    )
+
+
+class TestParallelDecoder(unittest.TestCase):
+    """
+    Tests that decoding in worker processes matches decoding in-process
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.parallel = ParallelDecoder(max_workers=2, min_values=300)
+        cls.xml = search_response(1000)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parallel.shutdown()
+
+    def decoder(self):
+        return TableDecoder(TABLE_ROWS, {'Status': {'A': 'Active',
+                                                    'P': 'Pending'}}.get)
+
+    def test_rows_in_order(self):
+        for decoder in (None, self.decoder()):
+            expected = parse_response(self.xml, decoder)['rows']
+            rows = parse_response(self.xml, decoder,
+                                  parallel=self.parallel)['rows']
+            self.assertEqual(rows, expected)
+        self.assertEqual(rows[1]['Status'], 'Pending')
+        self.assertIsNone(rows[97])
+
+    def test_columnar(self):
+        expected = parse_response(self.xml, row_format='columnar')['rows']
+        rows = parse_response(self.xml, row_format='columnar',
+                              parallel=self.parallel)['rows']
+        self.assertEqual(rows.to_dicts(), expected.to_dicts())
+        self.assertEqual(rows.mismatched, expected.mismatched)
+
+    def test_thresholds(self):
+        self.assertFalse(self.parallel.worthwhile(50, 3))
+        self.assertTrue(self.parallel.worthwhile(100, 3))
+        self.assertFalse(ParallelDecoder(max_workers=1).worthwhile(10 ** 6,
+                                                                   10))
@@ -1,7 +1,11 @@
+import io
 import os
 import unittest
 import xml.etree.ElementTree as ET
-from retsdk.utilities import parse_response
+from unittest import mock
+from retsdk.utilities import (parse_response, iter_response, iter_multipart,
+                              is_xml)
+from tests.utils import multipart_body, offline_connection, FakeResponse
 
 
 TEST_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -123,3 +127,119 @@ class TestSearchResponseWithAdditionalRows(unittest.TestCase):
         The response dict's 'more_rows' val should be True
         """
         self.assertTrue(self.response_dict['more_rows'])
+
+
+class TestStreamingSearchResponse(unittest.TestCase):
+    """
+    Tests incremental (streamed) handling of search transactions
+    """
+    def setUp(self):
+        self.response_dict = {}
+        path = os.path.join(TEST_DIR, 'search_response_maxrows.xml')
+        with open(path, 'rb') as f:
+            self.rows = list(
+                iter_response(f, self.response_dict, chunk_size=64)
+            )
+        self.parsed = parse_response(ET.parse(path).getroot())
+
+    def test_rows_match_parse_response(self):
+        """
+        Streamed rows should be identical to the buffered response rows
+        """
+        self.assertEqual(self.rows, self.parsed['rows'])
+
+    def test_response_info(self):
+        """
+        The response dict should be filled in while the rows are streamed
+        """
+        for key in ('reply_code', 'reply_text', 'ok', 'record_count',
+                    'more_rows'):
+            self.assertEqual(self.response_dict[key], self.parsed[key])
+
+
+class TestCompactDelimiter(unittest.TestCase):
+    """
+    Tests that COMPACT rows are split on the DELIMITER the server gives
+    """
+    body = ('<RETS ReplyCode="0" ReplyText="Operation Success.">'
+            '<DELIMITER value="7C"/>'
+            '<COLUMNS>|ListingID|Remarks|ListPrice|</COLUMNS>'
+            '<DATA>|L1|Pool\tand deck|250000|</DATA>'
+            '<DATA>|L2||0|</DATA>'
+            '<DATA>|L3|Too|many|values|</DATA>'
+            '</RETS>')
+    expected = [{'ListingID': 'L1', 'Remarks': 'Pool\tand deck',
+                 'ListPrice': 250000},
+                {'ListingID': 'L2', 'Remarks': None, 'ListPrice': 0},
+                None]
+
+    def test_parse_response(self):
+        response = parse_response(ET.fromstring(self.body))
+        self.assertEqual(response['rows'], self.expected)
+
+    def test_columnar(self):
+        response = parse_response(ET.fromstring(self.body),
+                                  row_format='columnar')
+        self.assertEqual(response['rows'].to_dicts(), self.expected[:2])
+        self.assertEqual(response['rows'].mismatched, 1)
+
+    def test_iter_response(self):
+        rows = list(iter_response(io.BytesIO(self.body.encode('utf-8')),
+                                  chunk_size=16))
+        self.assertEqual(rows, self.expected)
+
+
+class TestMultipartResponse(unittest.TestCase):
+    """
+    Tests incremental handling of multipart getObject responses
+    """
+    def setUp(self):
+        self.bodies = [b'one\r\ntwo\n', b'', b'x' * 100]
+        parts = [({'Object-ID': str(i)}, body)
+                 for i, body in enumerate(self.bodies)]
+        self.source = io.BytesIO(multipart_body(parts))
+
+    def test_parts_are_split_on_boundaries(self):
+        parts = [(headers['Object-ID'], b''.join(chunks))
+                 for headers, chunks in iter_multipart(
+                     self.source, 'simple-boundary', chunk_size=7)]
+        self.assertEqual(parts, [('0', self.bodies[0]), ('1', b''),
+                                 ('2', self.bodies[2])])
+
+    def test_unread_parts_are_skipped(self):
+        ids = [headers['Object-ID']
+               for headers, chunks in iter_multipart(self.source,
+                                                     'simple-boundary')]
+        self.assertEqual(ids, ['0', '1', '2'])
+
+
+class TestContentTypes(unittest.TestCase):
+    """
+    Tests that XML is recognized however the server labels it
+    """
+    body = ('<RETS ReplyCode="0" ReplyText="Operation Success.">'
+            '<COLUMNS>\tCity\t</COLUMNS><DATA>\tMontréal\t</DATA></RETS>')
+
+    def get_data(self, body, content_type):
+        rets = offline_connection()
+        response = FakeResponse(body, {'Content-Type': content_type})
+        with mock.patch.object(rets, '_RETSConnection__open',
+                               return_value=response):
+            return rets.get_data('Property', 'Listing', '(City=*)', ['City'])
+
+    def test_variants(self):
+        for content_type in ('text/xml', 'TEXT/XML; charset="UTF-8"',
+                             'application/xml', 'text/plain'):
+            response = self.get_data(self.body.encode('utf-8'), content_type)
+            self.assertEqual(response['rows'][0]['City'], 'Montréal')
+
+    def test_header_charset(self):
+        response = self.get_data(self.body.encode('latin-1'),
+                                 'text/xml; charset=ISO-8859-1')
+        self.assertEqual(response['rows'][0]['City'], 'Montréal')
+
+    def test_is_xml(self):
+        self.assertTrue(is_xml('application/rets+xml'))
+        self.assertTrue(is_xml('text/html', b'\n <RETS/>'))
+        self.assertFalse(is_xml('text/plain', b'not xml'))
+        self.assertFalse(is_xml('image/jpeg', b'<'))
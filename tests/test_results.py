@@ -0,0 +1,94 @@
+import unittest
+import xml.etree.ElementTree as ET
+from array import array
+from retsdk.results import ColumnarRows
+from retsdk.utilities import parse_response
+
+
+SEARCH_RESPONSE = (
+    '<RETS ReplyCode="0" ReplyText="Operation Success.">'
+    '<COLUMNS>\tMLSNumber\tPrice\tAcres\t</COLUMNS>'
+    '<DATA>\tMLS1\t250000\t1.5\t</DATA>'
+    '<DATA>\tMLS2\t199000\t0.25\t</DATA>'
+    '<DATA>\tMLS3\t\t</DATA>'
+    '</RETS>'
+)
+
+
+class TestColumnarRows(unittest.TestCase):
+    """
+    Tests the column-oriented Search result type
+    """
+    def setUp(self):
+        xml = ET.fromstring(SEARCH_RESPONSE)
+        self.response = parse_response(xml, row_format='columnar')
+        self.rows = self.response['rows']
+
+    def test_rows_match_dict_format(self):
+        dict_response = parse_response(ET.fromstring(SEARCH_RESPONSE))
+        expected = [row for row in dict_response['rows'] if row]
+        self.assertEqual(self.rows.to_dicts(), expected)
+        self.assertEqual([dict(row) for row in self.rows], expected)
+
+    def test_record_count(self):
+        self.assertEqual(self.response['record_count'], 2)
+        self.assertEqual(self.rows.mismatched, 1)
+
+    def test_row_view(self):
+        row = self.rows[-1]
+        self.assertEqual(row['MLSNumber'], 'MLS2')
+        self.assertEqual(len(row), 3)
+        self.assertEqual(list(row), ['MLSNumber', 'Price', 'Acres'])
+        with self.assertRaises(AttributeError):
+            row.extra = True
+
+    def test_tuples(self):
+        self.assertEqual(self.rows.to_tuples(),
+                         [('MLS1', 250000, 1.5), ('MLS2', 199000, 0.25)])
+
+    def test_compact(self):
+        self.rows.compact()
+        self.assertIsInstance(self.rows.column('Price'), array)
+        self.assertIsInstance(self.rows.column('Acres'), array)
+        self.assertIsInstance(self.rows.column('MLSNumber'), list)
+        self.assertEqual(self.rows[0]['Price'], 250000)
+
+    def test_bad_row_format(self):
+        with self.assertRaises(ValueError):
+            parse_response(ET.fromstring(SEARCH_RESPONSE), row_format='xml')
+
+
+class TestLazyRows(unittest.TestCase):
+    """
+    Tests rows that decode their values on first access
+    """
+    def setUp(self):
+        xml = ET.fromstring(SEARCH_RESPONSE)
+        self.rows = parse_response(xml, row_format='lazy')['rows']
+
+    def test_rows_match_dict_format(self):
+        expected = parse_response(ET.fromstring(SEARCH_RESPONSE))['rows']
+        self.assertEqual(self.rows[2], None)
+        self.assertEqual([row.materialize() if row else row
+                          for row in self.rows], expected)
+        self.assertEqual(self.rows[0], expected[0])
+
+    def test_decoded_on_access(self):
+        row = self.rows[1]
+        self.assertEqual(row.decoded, {})
+        self.assertEqual(row['Price'], 199000)
+        self.assertEqual(row.decoded, {1: 199000})
+        self.assertIs(row['Acres'], row['Acres'])
+
+    def test_mapping(self):
+        row = self.rows[0]
+        self.assertEqual(len(row), 3)
+        self.assertEqual(list(row), ['MLSNumber', 'Price', 'Acres'])
+        self.assertIn('Price', row)
+        self.assertNotIn('Bedrooms', row)
+        self.assertIsNone(row.get('Bedrooms'))
+        self.assertEqual(dict(row.items())['Acres'], 1.5)
+        with self.assertRaises(KeyError):
+            row['Bedrooms']
+        with self.assertRaises(AttributeError):
+            row.extra = True
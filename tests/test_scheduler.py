@@ -0,0 +1,128 @@
+import threading
+import time
+import unittest
+from email.utils import formatdate
+from retsdk.client import RETSConnection
+from retsdk.exceptions import RequestError
+from retsdk.mockserver import MockRETSServer
+from retsdk.scheduler import RequestScheduler, retry_after_seconds
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """
+    Tests the pacing and backoff decisions of RequestScheduler
+    """
+    def test_backoff_grows_with_jitter(self):
+        scheduler = RequestScheduler(base_delay=1, max_delay=10)
+        for attempt, ceiling in [(0, 1), (1, 2), (2, 4), (5, 10)]:
+            delay = scheduler.backoff('Search', attempt)
+            self.assertTrue(ceiling / 2 <= delay <= ceiling)
+
+    def test_retry_after_wins(self):
+        scheduler = RequestScheduler(base_delay=30)
+        self.assertEqual(scheduler.backoff('Search', 4, retry_after=2), 2)
+
+    def test_pause_is_shared(self):
+        scheduler = RequestScheduler()
+        scheduler.backoff('Search', 0, retry_after=0.2)
+        start = time.monotonic()
+        with scheduler.slot('GetObject'):
+            pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_limit_adapts(self):
+        scheduler = RequestScheduler(max_outstanding=8, increase_after=2)
+        scheduler.backoff('Search', 0, retry_after=0)
+        self.assertEqual(scheduler.limit, 4)
+        for i in range(4):
+            with scheduler.slot('Search'):
+                pass
+        self.assertEqual(scheduler.limit, 6)
+
+    def test_budget(self):
+        scheduler = RequestScheduler(budgets={'Search': 1})
+        scheduler.acquire('Search')
+        acquired = threading.Event()
+
+        def search():
+            with scheduler.slot('Search'):
+                acquired.set()
+
+        thread = threading.Thread(target=search)
+        thread.start()
+        with scheduler.slot('GetObject'):
+            # Other transaction types aren't held back
+            self.assertFalse(acquired.wait(0.1))
+        scheduler.release('Search')
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+    def test_nested_slots(self):
+        scheduler = RequestScheduler(max_outstanding=1)
+        acquired = threading.Event()
+
+        def search():
+            with scheduler.slot('Search'):
+                acquired.set()
+
+        with scheduler.slot('Search'):
+            # The thread holding the only slot can still send (ex. from a
+            # get_data_iter loop), but other threads wait
+            with scheduler.slot('GetMetadata'):
+                thread = threading.Thread(target=search)
+                thread.start()
+                self.assertFalse(acquired.wait(0.1))
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+        self.assertEqual(scheduler.holders, {})
+
+    def test_rate(self):
+        scheduler = RequestScheduler(rate=20, burst=1)
+        start = time.monotonic()
+        for i in range(3):
+            with scheduler.slot('Search'):
+                pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_after_seconds('5'), 5)
+        self.assertIsNone(retry_after_seconds('soon'))
+        later = retry_after_seconds(formatdate(time.time() + 30,
+                                               usegmt=True))
+        self.assertTrue(25 < later <= 30)
+
+
+class TestRateLimitRetries(unittest.TestCase):
+    """
+    Tests RETSConnection's rate limit handling against a MockRETSServer
+    """
+    def setUp(self):
+        self.server = MockRETSServer(listings=20, retry_after=0)
+        self.server.start()
+        self.rets = RETSConnection(
+            self.server.username, self.server.password,
+            self.server.login_url,
+            scheduler=RequestScheduler(base_delay=0.01)
+        )
+
+    def tearDown(self):
+        self.rets.logout()
+        self.server.stop()
+
+    def test_rate_limit_reply(self):
+        self.server.inject('rate_limit', 2)
+        count = self.rets.get_count('Property', 'Listing', '(ListingID=*)')
+        self.assertEqual(count, '20')
+        self.assertEqual(self.server.requests['Search'], 3)
+
+    def test_busy(self):
+        self.server.inject('busy')
+        response = self.rets.get_object('Property', 'Photo', 'L0000001', 1)
+        self.assertTrue(response['ok'])
+        self.assertEqual(self.server.requests['GetObject'], 2)
+
+    def test_out_of_retries(self):
+        self.rets.scheduler.max_retries['Search'] = 2
+        self.server.inject('rate_limit', 2)
+        with self.assertRaises(RequestError):
+            self.rets.get_count('Property', 'Listing', '(ListingID=*)')
@@ -0,0 +1,51 @@
+import unittest
+from retsdk.client import RETSConnection
+from retsdk.mockserver import MockRETSServer
+
+
+class TestMetadataLoader(unittest.TestCase):
+    """
+    Tests loading a whole Schema from a MockRETSServer
+    """
+    def load(self, bulk_metadata):
+        server = MockRETSServer(listings=10, bulk_metadata=bulk_metadata)
+        with server:
+            rets = RETSConnection(server.username, server.password,
+                                  server.login_url)
+            schema = rets.get_schema()
+            rets.logout()
+        return schema, server.requests.get('GetMetadata', 0)
+
+    def check(self, schema):
+        self.assertEqual(list(schema.resources), ['Property'])
+        self.assertEqual(list(schema.classes['Property']), ['Listing'])
+        self.assertEqual(len(schema.fields('Property', 'Listing')), 7)
+        self.assertEqual(schema.lookup('Property', 'Status'),
+                         {'A': 'Active', 'P': 'Pending', 'S': 'Sold'})
+
+    def test_one_transaction(self):
+        schema, requests = self.load(bulk_metadata=True)
+        self.check(schema)
+        self.assertEqual(schema.system['Version'], '1.00.00001')
+        self.assertEqual(requests, 1)
+
+    def test_fallbacks(self):
+        schema, requests = self.load(bulk_metadata=False)
+        self.check(schema)
+        # SYSTEM, then a round of ID=*, then a class, a table and a lookup
+        self.assertEqual(requests, 8)
+
+    def test_field_index(self):
+        schema = self.load(bulk_metadata=True)[0]
+        for name in ('ListPrice', 'List Price'):
+            field = schema.field('Property', 'Listing', name)
+            self.assertEqual(field['SystemName'], 'ListPrice')
+        with self.assertRaises(KeyError):
+            schema.field('Property', 'Listing', 'Bedrooms')
+
+    def test_decoder(self):
+        schema = self.load(bulk_metadata=True)[0]
+        decoder = schema.decoder('Property', 'Listing', lookups=True)
+        status, price = decoder.compile(['Status', 'ListPrice'])
+        self.assertEqual(status('P'), 'Pending')
+        self.assertEqual(price('250000'), 250000)
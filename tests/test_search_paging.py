@@ -0,0 +1,49 @@
+import unittest
+from unittest import mock
+from retsdk.exceptions import ResponseError
+from tests.utils import offline_connection, search_page
+
+
+class TestSearchPaging(unittest.TestCase):
+    """
+    Tests MAXROWS-driven paging with RETSConnection.get_all_data
+    """
+    def setUp(self):
+        self.rets = offline_connection()
+        self.pages = [
+            search_page([{'sysid': 1}, {'sysid': 2}], more_rows=True),
+            search_page([{'sysid': 3}, {'sysid': 4}], more_rows=True),
+            search_page([{'sysid': 5}]),
+        ]
+
+    def fetch_all(self, **kwargs):
+        with mock.patch.object(self.rets, 'get_data',
+                               side_effect=self.pages) as get_data:
+            rows = list(self.rets.get_all_data(
+                'Property', 'Listing', '(sysid=0+)', ['sysid'], **kwargs
+            ))
+        return rows, get_data
+
+    def test_all_pages_are_yielded(self):
+        rows, get_data = self.fetch_all(page_size=2)
+        self.assertEqual([r['sysid'] for r in rows], [1, 2, 3, 4, 5])
+        self.assertEqual(get_data.call_count, 3)
+
+    def test_offsets_advance(self):
+        rows, get_data = self.fetch_all(page_size=2)
+        offsets = [c[1]['offset'] for c in get_data.call_args_list]
+        self.assertEqual(offsets, [1, 3, 5])
+
+    def test_prefetch(self):
+        rows, get_data = self.fetch_all(page_size=2, prefetch=True)
+        self.assertEqual([r['sysid'] for r in rows], [1, 2, 3, 4, 5])
+
+    def test_no_records_found(self):
+        self.pages = [search_page([], reply_code='20201')]
+        rows, get_data = self.fetch_all()
+        self.assertEqual(rows, [])
+
+    def test_error_reply(self):
+        self.pages = [search_page([], reply_code='20206')]
+        with self.assertRaises(ResponseError):
+            self.fetch_all()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime
+from retsdk.client import RETSConnection
+from retsdk.mockserver import MockRETSServer
+from retsdk.sharding import ShardedSearch, numbering
+
+
+class TestShardedSearch(unittest.TestCase):
+    """
+    Tests ShardedSearch against a MockRETSServer
+    """
+    def setUp(self):
+        self.server = MockRETSServer(listings=300, max_rows=50)
+        self.server.start()
+        self.rets = RETSConnection(self.server.username,
+                                   self.server.password,
+                                   self.server.login_url, pool_size=4)
+
+    def tearDown(self):
+        self.rets.logout()
+        self.server.stop()
+
+    def test_key_shards(self):
+        search = ShardedSearch(self.rets, 'Property', 'Listing', '',
+                               ['ListPrice'], 'ListingID', 'L0000001',
+                               'L0000300', max_rows=50)
+        shards = search.plan()
+        self.assertTrue(all(count <= 50 for low, high, count in shards))
+        self.assertEqual(sum(count for low, high, count in shards), 300)
+
+        rows = list(search)
+        self.assertEqual(len(set(row['ListingID'] for row in rows)), 300)
+
+    def test_timestamp_shards(self):
+        rows = list(self.rets.get_sharded_data(
+            'Property', 'Listing', '(ListPrice=500000+)', ['ListPrice'],
+            'ModificationTimestamp', datetime(2019, 1, 1),
+            datetime(2020, 12, 31), max_rows=50
+        ))
+        expected = [l for l in self.server.listings
+                    if int(l['ListPrice']) >= 500000]
+        self.assertEqual(len(rows), len(expected))
+        self.assertEqual(len(set(row['ListingID'] for row in rows)),
+                         len(expected))
+
+    def test_unmapped_rows_pass_through(self):
+        # A tab in a value shifts the row's columns, so it can't be mapped
+        self.server.listings[10]['ListPrice'] = '1\t000'
+        rows = list(self.rets.get_sharded_data(
+            'Property', 'Listing', '', ['ListPrice'], 'ListingID',
+            'L0000001', 'L0000300', max_rows=50
+        ))
+        self.assertEqual(rows.count(None), 1)
+        self.assertEqual(len(set(row['ListingID'] for row in rows if row)),
+                         299)
+
+
+class TestNumbering(unittest.TestCase):
+    """
+    Tests how shard ranges are numbered
+    """
+    def test_prefixed_ids(self):
+        to_number, to_value = numbering('L0000001', 'L0000300')
+        self.assertEqual(to_number('L0000150'), 150)
+        self.assertEqual(to_value(150), 'L0000150')
+
+    def test_datetimes(self):
+        low = datetime(2019, 1, 1)
+        to_number, to_value = numbering(low, datetime(2019, 1, 2))
+        self.assertEqual(to_number(datetime(2019, 1, 1, 0, 0, 1)), 1000)
+        self.assertEqual(to_value(1500), '2019-01-01T00:00:01.500')
+
+    def test_unsplittable(self):
+        with self.assertRaises(ValueError):
+            numbering('abc', 'xyz')
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from retsdk.client import RETSConnection
+from retsdk.mockserver import MockRETSServer
+from retsdk.sinks import CSVSink, JSONLinesSink, SQLiteSink
+
+
+ROWS = [
+    {'ListingID': 'L1', 'ListPrice': 250000, 'Features': ['Pool', 'Deck'],
+     'Modified': datetime(2019, 3, 2, 10, 11, 12)},
+    None,
+    {'ListingID': 'L2', 'ListPrice': None, 'Features': None,
+     'Modified': datetime(2019, 3, 3)},
+    {'ListingID': 'L1', 'ListPrice': 240000, 'Features': None,
+     'Modified': datetime(2019, 3, 4)},
+]
+
+
+class TestSinks(unittest.TestCase):
+    """
+    Tests writing rows in batches to each kind of sink
+    """
+    def test_csv(self):
+        out = io.StringIO()
+        with CSVSink(out, batch_size=2) as sink:
+            sink.write_all(ROWS)
+        lines = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(lines[0], ['ListingID', 'ListPrice', 'Features',
+                                    'Modified'])
+        self.assertEqual(lines[1], ['L1', '250000', 'Pool,Deck',
+                                    '2019-03-02T10:11:12'])
+        self.assertEqual(lines[2], ['L2', '', '', '2019-03-03T00:00:00'])
+        self.assertEqual(sink.stats()['rows'], 3)
+        self.assertEqual(sink.stats()['skipped'], 1)
+        self.assertEqual(sink.stats()['batches'], 2)
+
+    def test_json_lines(self):
+        out = io.StringIO()
+        with JSONLinesSink(out) as sink:
+            sink.write_all(ROWS)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['Features'], ['Pool', 'Deck'])
+        self.assertEqual(rows[0]['Modified'], '2019-03-02T10:11:12')
+
+    def test_sqlite_upserts(self):
+        db = sqlite3.connect(':memory:')
+        with SQLiteSink(db, 'listings', batch_size=2) as sink:
+            sink.write_all(ROWS)
+        rows = db.execute('SELECT ListingID, ListPrice FROM listings '
+                          'ORDER BY ListingID').fetchall()
+        self.assertEqual(rows, [('L1', 240000), ('L2', None)])
+
+
+class TestExport(unittest.TestCase):
+    """
+    Tests streaming a paged Search from a MockRETSServer into a sink
+    """
+    def test_export_data(self):
+        with MockRETSServer(listings=230, max_rows=100) as server:
+            rets = RETSConnection(server.username, server.password,
+                                  server.login_url)
+            path = os.path.join(tempfile.mkdtemp(), 'listings.csv')
+            stats = rets.export_data('Property', 'Listing', '(ListingID=*)',
+                                     ['ListingID', 'ListPrice'],
+                                     CSVSink(path, batch_size=50))
+            rets.logout()
+
+        self.assertEqual(stats['rows'], 230)
+        self.assertEqual(stats['batches'], 5)
+        self.assertGreater(stats['bytes'], 0)
+        with open(path, newline='') as f:
+            lines = list(csv.reader(f))
+        self.assertEqual(lines[0], ['ListingID', 'ListPrice'])
+        self.assertEqual(len(lines), 231)
+        self.assertEqual(server.requests['Search'], 3)
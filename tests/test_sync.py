@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from retsdk.client import RETSConnection
+from retsdk.mockserver import MockRETSServer
+from retsdk.sync import IncrementalSync, SyncState
+
+
+class TestIncrementalSync(unittest.TestCase):
+    """
+    Tests IncrementalSync against a MockRETSServer
+    """
+    def setUp(self):
+        self.server = MockRETSServer(listings=120, max_rows=50)
+        self.server.start()
+        self.rets = RETSConnection(self.server.username,
+                                   self.server.password,
+                                   self.server.login_url)
+        self.path = os.path.join(tempfile.mkdtemp(), 'sync.db')
+        self.records = {}
+
+    def tearDown(self):
+        self.rets.logout()
+        self.server.stop()
+
+    def upsert(self, rows):
+        for row in rows:
+            self.records[row['ListingID']] = row
+
+    def delete(self, keys):
+        for key in keys:
+            del self.records[key]
+
+    def sync(self):
+        sync = IncrementalSync(self.rets, SyncState(self.path),
+                               fields=['ListPrice'])
+        return sync.run(self.upsert, self.delete)
+
+    def test_first_run_pulls_everything(self):
+        summary = self.sync()
+        self.assertEqual(summary['upserted'], 120)
+        self.assertEqual(len(self.records), 120)
+        latest = max(l['ModificationTimestamp'] for l in self.server.listings)
+        self.assertEqual(summary['high_water'],
+                         datetime.fromisoformat(latest))
+
+    def test_delta(self):
+        self.sync()
+        listing = self.server.listings[7]
+        listing['ModificationTimestamp'] = '2030-01-01T00:00:00.000'
+        listing['ListPrice'] = '1000'
+
+        summary = self.sync()
+        # The record at the old high-water mark is pulled again too
+        self.assertEqual(summary['upserted'], 2)
+        self.assertEqual(self.records[listing['ListingID']]['ListPrice'], 1000)
+        self.assertEqual(summary['high_water'], datetime(2030, 1, 1))
+
+    def test_deletions(self):
+        self.sync()
+        removed = self.server.listings.pop(3)
+
+        summary = self.sync()
+        self.assertEqual(summary['deleted'], 1)
+        self.assertNotIn(removed['ListingID'], self.records)
+        self.assertEqual(len(self.records), 119)
+
+    def test_unmapped_rows_are_skipped(self):
+        # A tab in a value shifts the row's columns, so it can't be mapped
+        self.server.listings[5]['ListPrice'] = '1\t000'
+        summary = self.sync()
+        self.assertEqual(summary['upserted'], 119)
+        self.assertEqual(summary['skipped'], 1)
+        self.assertIsNone(summary['high_water'])
+        self.assertNotIn(self.server.listings[5]['ListingID'], self.records)
+
+        # Once it can be read, the skipped record is pulled next time
+        self.server.listings[5]['ListPrice'] = '1000'
+        summary = self.sync()
+        self.assertEqual(summary['skipped'], 0)
+        self.assertIn(self.server.listings[5]['ListingID'], self.records)
+        self.assertIsNotNone(summary['high_water'])
+
+        self.server.listings[9]['ListingID'] += '\tX'
+        self.server.listings.pop(3)
+        summary = self.sync()
+        # The unreadable key could be any record, so none are deleted
+        self.assertEqual(summary['deleted'], 0)
+        self.assertGreaterEqual(summary['skipped'], 1)
+
+    def test_query(self):
+        state = SyncState()
+        sync = IncrementalSync(self.rets, state)
+        self.assertEqual(sync.query(), '(ListingID=*)')
+        state.set_high_water('Property', 'Listing',
+                             datetime(2019, 5, 1, 12, 30, 15, 250000))
+        self.assertEqual(sync.query(),
+                         '(ModificationTimestamp=2019-05-01T12:30:15+)')
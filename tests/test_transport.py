@@ -0,0 +1,120 @@
+import gzip
+import io
+import threading
+import unittest
+import zlib
+from http.client import IncompleteRead
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from retsdk.client import RETSConnection
+from retsdk.transport import DecompressedResponse
+
+
+LOGIN_BODY = (
+    b'<RETS ReplyCode="0" ReplyText="Operation Success.">'
+    b'<RETS-RESPONSE>\nMetadataVersion=1.00.00001\n'
+    b'Search=/rets/Search\nGetMetadata=/rets/GetMetadata\n'
+    b'Logout=/rets/Logout\n</RETS-RESPONSE></RETS>'
+)
+
+METADATA_BODY = (
+    b'<RETS ReplyCode="0" ReplyText="Operation Success.">'
+    b'<METADATA-RESOURCE><COLUMNS>\tResourceID\t</COLUMNS>'
+    b'<DATA>\tProperty\t</DATA></METADATA-RESOURCE></RETS>'
+)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.client_ports.add(self.client_address[1])
+        if 'Authorization' not in self.headers:
+            self.server.challenges += 1
+            self.send_response(401)
+            self.send_header(
+                'WWW-Authenticate',
+                'Digest realm="rets", nonce="abc123", qop="auth"'
+            )
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = LOGIN_BODY if 'Login' in self.path else METADATA_BODY
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml;charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestKeepAliveTransport(unittest.TestCase):
+    """
+    Tests connection reuse and digest challenge caching
+    """
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.server.client_ports = set()
+        self.server.challenges = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        login_url = 'http://127.0.0.1:{0}/rets/Login'.format(
+            self.server.server_address[1]
+        )
+        self.rets = RETSConnection(username='joe', password='joe123',
+                                   login_url=login_url)
+
+    def tearDown(self):
+        self.rets.pool.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_is_reused(self):
+        for i in range(5):
+            response = self.rets.get_resource_metadata()
+            self.assertTrue(response['ok'])
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_digest_challenge_is_cached(self):
+        for i in range(5):
+            self.rets.get_resource_metadata()
+        self.assertEqual(self.server.challenges, 1)
+
+
+class TestDecompression(unittest.TestCase):
+    """
+    Tests incremental decompression of gzip/deflate response bodies
+    """
+    body = (b'<RETS ReplyCode="0" ReplyText="OK">' +
+            b'<DATA>\tx\t</DATA>' * 500 + b'</RETS>')
+
+    def decompress(self, data, encoding):
+        response = io.BytesIO(data)
+        response.headers = {'Content-Encoding': encoding}
+        return DecompressedResponse(response, encoding)
+
+    def test_gzip(self):
+        r = self.decompress(gzip.compress(self.body), 'gzip')
+        self.assertEqual(r.read(100), self.body[:100])
+        self.assertEqual(r.read(), self.body[100:])
+
+    def test_deflate(self):
+        self.assertEqual(self.decompress(zlib.compress(self.body),
+                                         'deflate').read(), self.body)
+        raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        data = raw.compress(self.body) + raw.flush()
+        self.assertEqual(self.decompress(data, 'deflate').read(), self.body)
+
+    def test_truncated(self):
+        data = gzip.compress(self.body)
+        r = self.decompress(data[:len(data) // 2], 'gzip')
+        with self.assertRaises(IncompleteRead):
+            r.read()
+
+    def test_attributes_pass_through(self):
+        r = self.decompress(gzip.compress(self.body), 'gzip')
+        self.assertEqual(r.headers['Content-Encoding'], 'gzip')
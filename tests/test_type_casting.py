@@ -1,6 +1,7 @@
 import unittest
-from datetime import datetime
-from retsdk.utilities import cast
+from datetime import date, datetime
+from retsdk.utilities import (cast, cast_column, unrets_date, rets_date,
+                              rets_dates)
 
 
 class TestRETSDataTypeCasting(unittest.TestCase):
@@ -38,3 +39,68 @@ class TestRETSDataTypeCasting(unittest.TestCase):
     def test_empty_string(self):
         empty_string = ''
         self.assertIsNone(cast(empty_string))
+
+
+class TestRETSDates(unittest.TestCase):
+    """
+    Tests for decoding and encoding RETS (ISO 8601) dates
+    """
+    def test_date_shapes(self):
+        expected = {
+            '2018-01-02': datetime(2018, 1, 2),
+            '2018-01-02T03:04:05': datetime(2018, 1, 2, 3, 4, 5),
+            '2018-01-02 03:04:05': datetime(2018, 1, 2, 3, 4, 5),
+            '2018-01-02T03:04:05Z': datetime(2018, 1, 2, 3, 4, 5),
+            '2018-01-02T03:04:05.4': datetime(2018, 1, 2, 3, 4, 5, 400000),
+            '2018-01-02T03:04:05.004': datetime(2018, 1, 2, 3, 4, 5, 4000),
+            '2018-01-02T03:04:05.1234567': datetime(2018, 1, 2, 3, 4, 5,
+                                                    123456),
+        }
+        for value, result in expected.items():
+            self.assertEqual(unrets_date(value), result)
+
+    def test_cast_without_milliseconds(self):
+        self.assertEqual(cast('2018-01-02T03:04:05'),
+                         datetime(2018, 1, 2, 3, 4, 5))
+        self.assertEqual(cast('2018-01-02T03:04: not a time'),
+                         '2018-01-02T03:04: not a time')
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            unrets_date('2018-13-45')
+
+    def test_encoding(self):
+        self.assertEqual(rets_date(datetime(2018, 1, 2, 3, 4, 5, 600)),
+                         '2018-01-02T03:04:05')
+        self.assertEqual(rets_dates([datetime(2018, 1, 2), None,
+                                     date(2018, 1, 3)]),
+                         ['2018-01-02T00:00:00', '', '2018-01-03'])
+
+
+class TestColumnCasting(unittest.TestCase):
+    """
+    Tests that cast_column gives exactly what cast gives for each value
+    """
+    COLUMNS = [
+        ['12', '3400', '', '7'],
+        ['12', '0', '034'],
+        ['02882', '00501', ''],
+        ['2.56', '', '10.0', '.5'],
+        ['0.56', '0.0', '0.00', '0.000', '01.0', '3.00'],
+        ['1.2.3', '4.5'],
+        ['Active', '', 'Sold', 'Pool,Deck'],
+        ['2019-03-02', '2019-03-03', ''],
+        ['2019-03-02T10:11:12', '', '2019-03-02T10:11:12.5Z'],
+        ['2019-03-02T10:11:12.000', '2019-13-02T10:11:12.000'],
+        ['2019-03-02T10:11:12', '2019-03-02 10:11:12', 'MLS1'],
+        ['Y', 'N', '1', '0', '-5', '2e100', ''],
+        ['', '', ''],
+    ]
+
+    def test_same_as_cast(self):
+        for values in self.COLUMNS:
+            expected = [cast(value) for value in values]
+            result = cast_column(values)
+            self.assertEqual(result, expected)
+            self.assertEqual([type(value) for value in result],
+                             [type(value) for value in expected])
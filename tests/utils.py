@@ -0,0 +1,70 @@
+import io
+from http.client import parse_headers
+from unittest import mock
+from retsdk.client import RETSConnection
+
+
+LOGIN_URL = 'https://rets.somemls.com/rets/Login.ashx'
+
+LOGIN_ROWS = [
+    {'MetadataVersion': '1.00.00001'},
+    {'MetadataTimestamp': '2013-03-27T14:31:31Z'},
+    {'Login': '/rets/Login.ashx'},
+    {'Logout': '/rets/Logout.ashx'},
+    {'Search': '/rets/Search.ashx'},
+    {'GetMetadata': '/rets/GetMetadata.ashx'},
+    {'GetObject': '/rets/GetObject.ashx'},
+]
+
+
+def offline_connection(**kwargs):
+    """
+    Returns a RETSConnection that was set up without contacting a server
+    """
+    login_response = {'ok': True, 'rows': LOGIN_ROWS}
+    with mock.patch.object(RETSConnection, '_RETSConnection__login',
+                           return_value=login_response):
+        return RETSConnection(username='joe', password='joe123',
+                              login_url=LOGIN_URL, **kwargs)
+
+
+def search_page(rows, more_rows=False, reply_code='0'):
+    """
+    Returns a get_data-style response dictionary for a page of rows
+    """
+    return {
+        'ok': reply_code == '0',
+        'reply_code': reply_code,
+        'reply_text': 'Operation Success.',
+        'record_count': len(rows),
+        'more_rows': more_rows,
+        'rows': rows,
+    }
+
+
+class FakeResponse(io.BytesIO):
+    """
+    A stand-in for an unread http.client.HTTPResponse
+    """
+    def __init__(self, body, headers, code=200):
+        super().__init__(body)
+        self.code = code
+        header_lines = ''.join(
+            '{0}: {1}\r\n'.format(k, v) for k, v in headers.items()
+        )
+        self.headers = parse_headers(
+            io.BytesIO(header_lines.encode('ascii') + b'\r\n')
+        )
+
+
+def multipart_body(parts, boundary='simple-boundary'):
+    """
+    Builds a multipart body from a list of (headers, body) tuples
+    """
+    body = b'preamble\r\n'
+    for headers, part_body in parts:
+        body += b'--' + boundary.encode('ascii') + b'\r\n'
+        for key, val in headers.items():
+            body += '{0}: {1}\r\n'.format(key, val).encode('ascii')
+        body += b'\r\n' + part_body + b'\r\n'
+    return body + b'--' + boundary.encode('ascii') + b'--\r\n'